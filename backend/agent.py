@@ -1,34 +1,50 @@
-from voice import (
-    analyze_scene_with_gemini,
-    fetch_static_satellite_image,
-    fetch_street_view_image,
-    generate_positioning_guidance,
-)
 import asyncio
+import functools
 import json
 import logging
 import os
 import sys
-from dotenv import load_dotenv
+from typing import Optional
 
+from dotenv import load_dotenv
 from livekit import agents, rtc
 from livekit.agents import (
+    Agent,
     AgentServer,
     AgentSession,
-    Agent,
     RoomInputOptions,
-    function_tool,
     RunContext,
+    function_tool,
 )
+from livekit.agents.utils.hw import get_cpu_monitor
 from livekit.plugins import silero
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
+import scene_intel
+from briefing_queue import BriefingQueue
+from incident_store import create_incident_store
+from model_router import model_router
+from profiling import start_profile, stop_profile
+from session_cache import SessionToolCache
+from tts_cache import TTSAudioCache, say_cached
+from worker_load import CPUSampler, LoopLagMonitor, compute_load, read_reported_lag
 
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("vectr-agent")
 
+# Agent models come from the routing table (VECTR_MODEL_ROUTES) at startup.
+TTS_MODEL = model_router.route("agent_tts")
+TTS_VOICE_ID = TTS_MODEL.split(":", 1)[1]
+STANDBY_MESSAGE = "VECTR online. Standing by for incident details."
+
+# Fixed and verbatim utterances skip the LLM and replay cached audio.
+tts_cache = TTSAudioCache(
+    max_bytes=int(os.environ.get("VECTR_TTS_CACHE_MAX_MB", "64")) * 1024 * 1024,
+    disk_dir=os.environ.get("VECTR_TTS_CACHE_DIR"),
+)
+
 
 class VECTRAgent(Agent):
     """
@@ -36,8 +52,11 @@ class VECTRAgent(Agent):
     Provides hands-free guidance to EMT crews while they drive to scenes.
     """
 
-    def __init__(self, incident_data: dict = None):
+    def __init__(
+        self, incident_data: dict = None, tool_cache: Optional[SessionToolCache] = None
+    ):
         self.incident_data = incident_data or {}
+        self.tool_cache = tool_cache or SessionToolCache()
 
         address_instruction = ""
         if self.incident_data.get("address"):
@@ -79,14 +98,17 @@ Keep responses under 30 seconds of speech. Be direct and actionable.""",
         Get tactical scene analysis from satellite imagery.
         Call this when you need approach routes, parking, or hazard information.
         """
+        cached = self.tool_cache.get("scene_analysis", lat, lng)
+        if cached is not None:
+            return cached
         logger.info(f"Fetching scene analysis for {address}")
         try:
-            satellite_bytes = fetch_static_satellite_image(lat, lng)
-            analysis = analyze_scene_with_gemini(address, lat, lng, satellite_bytes)
-            return analysis
+            analysis = await scene_intel.get_scene_analysis(address, lat, lng)
         except Exception as e:
             logger.error(f"Scene analysis failed: {e}")
             return f"Unable to analyze scene: {str(e)}"
+        self.tool_cache.put("scene_analysis", lat, lng, analysis)
+        return analysis
 
     @function_tool()
     async def get_positioning_guidance(
@@ -96,20 +118,102 @@ Keep responses under 30 seconds of speech. Be direct and actionable.""",
         Get ambulance positioning guidance from street view imagery.
         Call this when you need specific parking position, stretcher path, or egress strategy.
         """
+        cached = self.tool_cache.get("positioning_guidance", lat, lng)
+        if cached is not None:
+            return cached
         logger.info(f"Fetching positioning guidance for {address}")
         try:
-            street_view_bytes = fetch_street_view_image(lat, lng)
-            guidance = generate_positioning_guidance(
-                address, lat, lng, street_view_bytes
-            )
-            return guidance
+            guidance = await scene_intel.get_positioning_guidance(address, lat, lng)
         except Exception as e:
             logger.error(f"Positioning guidance failed: {e}")
             return f"Street view unavailable: {str(e)}"
+        self.tool_cache.put("positioning_guidance", lat, lng, guidance)
+        return guidance
+
+
+# Placeholders the incident pipeline stores when an analysis failed
+# (see run_scene_analysis / run_positioning_guidance in voice.py).
+UNAVAILABLE_PREFIXES = (
+    "Scene analysis unavailable",
+    "Positioning guidance unavailable",
+)
+
+
+@functools.cache
+def shared_incident_store():
+    """
+    The API's incident store if it is shared across processes, else None.
+    Opened lazily so each job process gets its own SQLite connection.
+    """
+    store = create_incident_store()
+    if not store.shared:
+        return None
+    # Tool misses then reuse imagery and analyses cached by the API.
+    scene_intel.scene_cache.enable_store(store)
+    return store
 
 
+async def seed_tool_cache(tool_cache: SessionToolCache, incident_data: dict) -> int:
+    """
+    Warm the session's tool cache with the incident pipeline's full-length
+    intel; room metadata only carries compressed, truncated copies.
+    """
+    incident_id = incident_data.get("incident_id")
+    if not incident_id:
+        return 0
+    try:
+        store = await asyncio.to_thread(shared_incident_store)
+        if store is None:
+            return 0
+        report = await asyncio.to_thread(store.get_report, incident_id)
+    except Exception as e:
+        logger.warning(f"Could not load intel for incident {incident_id}: {e}")
+        return 0
+    if report is None:
+        return 0
+    seeded = 0
+    for tool, text in (
+        ("scene_analysis", report.scene_analysis),
+        ("positioning_guidance", report.positioning_guidance),
+    ):
+        if text and not text.startswith(UNAVAILABLE_PREFIXES):
+            tool_cache.put(tool, report.lat, report.lng, text)
+            seeded += 1
+    return seeded
+
+
+# Worker capacity: new rooms go to another worker once any of these is
+# exhausted (see worker_load.compute_load).
+MAX_SESSIONS_PER_WORKER = int(os.environ.get("VECTR_WORKER_MAX_SESSIONS", "25"))
+LOOP_LAG_BUDGET = float(os.environ.get("VECTR_LOOP_LAG_BUDGET_MS", "100")) / 1000
+LOOP_STALL_THRESHOLD = (
+    float(os.environ.get("VECTR_LOOP_STALL_THRESHOLD_MS", "50")) / 1000
+)
+
+cpu_sampler = CPUSampler(get_cpu_monitor())
+
+
+def worker_load(server: AgentServer) -> float:
+    """Load reported to LiveKit for routing; runs in an executor thread."""
+    return compute_load(
+        active_sessions=len(server.active_jobs),
+        max_sessions=MAX_SESSIONS_PER_WORKER,
+        lag=read_reported_lag(),
+        lag_budget=LOOP_LAG_BUDGET,
+        cpu=cpu_sampler.value,
+    )
+
+
+server_options = {}
+if "VECTR_WORKER_LOAD_THRESHOLD" in os.environ:
+    server_options["load_threshold"] = float(os.environ["VECTR_WORKER_LOAD_THRESHOLD"])
+if "VECTR_WORKER_IDLE_PROCESSES" in os.environ:
+    server_options["num_idle_processes"] = int(
+        os.environ["VECTR_WORKER_IDLE_PROCESSES"]
+    )
+
 # Create the agent server
-server = AgentServer()
+server = AgentServer(load_fnc=worker_load, **server_options)
 
 
 @server.rtc_session()
@@ -131,12 +235,31 @@ async def vectr_session(ctx: agents.JobContext):
         except json.JSONDecodeError:
             logger.warning("Could not parse room metadata")
 
+    lag_monitor = LoopLagMonitor(stall_threshold=LOOP_STALL_THRESHOLD)
+    lag_monitor.start()
+    ctx.add_shutdown_callback(lag_monitor.aclose)
+
+    # Opt-in per room (metadata "profile": true) or for every session.
+    if incident_data.get("profile") or os.environ.get("VECTR_AGENT_PROFILE"):
+        profiler = start_profile(f"session-{ctx.room.name}")
+        if profiler is not None:
+
+            async def finish_profile():
+                await asyncio.to_thread(stop_profile, profiler)
+
+            ctx.add_shutdown_callback(finish_profile)
+
+    tool_cache = SessionToolCache()
+    seeded = await seed_tool_cache(tool_cache, incident_data)
+    if seeded:
+        logger.info(f"Seeded {seeded} tool results for {ctx.room.name}")
+
     # Create the agent session using LiveKit Inference
     # These model strings route through LiveKit Cloud - NO external API keys needed!
     session = AgentSession(
-        stt="assemblyai/universal-streaming:en",  # LiveKit Inference STT
-        llm="openai/gpt-5.2-chat-latest",  # LiveKit Inference LLM
-        tts="cartesia/sonic-3:9626c31c-bec5-4cca-baa8-f8ba9e84c8bc",  # LiveKit Inference TTS
+        stt=model_router.route("agent_stt"),  # LiveKit Inference STT
+        llm=model_router.route("agent_llm"),  # LiveKit Inference LLM
+        tts=TTS_MODEL,  # LiveKit Inference TTS
         vad=silero.VAD.load(),  # Local VAD
         turn_detection=MultilingualModel(),  # LiveKit turn detection
     )
@@ -144,7 +267,7 @@ async def vectr_session(ctx: agents.JobContext):
     # Start the session with our custom agent
     await session.start(
         room=ctx.room,
-        agent=VECTRAgent(incident_data=incident_data),
+        agent=VECTRAgent(incident_data=incident_data, tool_cache=tool_cache),
     )
 
     # Generate initial greeting
@@ -157,38 +280,33 @@ async def vectr_session(ctx: agents.JobContext):
 {incident_data.get("positioning_guidance", "Positioning data loading.")}
 
 Ask me about approach routes, staging, or hazards."""
+        await session.generate_reply(instructions=initial_message)
     else:
-        # No incident data yet
-        initial_message = "VECTR online. Standing by for incident details."
+        # No incident data yet - fixed phrase, no need for the LLM
+        await say_cached(session, tts_cache, STANDBY_MESSAGE, TTS_VOICE_ID)
+
+    # Dispatcher packets are spoken one at a time, in priority order, with
+    # bursts of scene updates merged into a single announcement.
+    async def speak(instructions: str):
+        return session.generate_reply(instructions=instructions)
 
-    await session.generate_reply(instructions=initial_message)
+    async def say(text: str):
+        return await say_cached(session, tts_cache, text, TTS_VOICE_ID)
+
+    briefings = BriefingQueue(
+        speak,
+        maxsize=int(os.environ.get("VECTR_BRIEFING_QUEUE_SIZE", "16")),
+        say=say,
+    )
+    briefings.start()
+    ctx.add_shutdown_callback(briefings.aclose)
 
     # Handle incoming data messages (for scene updates from dispatcher)
     @ctx.room.on("data_received")
     def on_data_received(packet: rtc.DataPacket):
         try:
             payload = json.loads(packet.data.decode())
-
-            if payload.get("type") == "tactical_briefing":
-                # Dispatcher sent a briefing to speak
-                briefing = payload.get("briefing", "")
-                if briefing:
-                    asyncio.create_task(
-                        session.generate_reply(
-                            instructions=f"Say this tactical briefing: {briefing}"
-                        )
-                    )
-
-            elif payload.get("type") == "scene_update":
-                # New scene data available
-                scene_data = payload.get("data", {})
-                summary = scene_data.get("summary", "New scene information available.")
-                asyncio.create_task(
-                    session.generate_reply(
-                        instructions=f"Announce this update from dispatch: {summary}"
-                    )
-                )
-
+            briefings.put_packet(payload)
         except Exception as e:
             logger.error(f"Error processing data packet: {e}")
 
@@ -0,0 +1,179 @@
+"""
+Per-session queue for dispatcher packets the agent has to speak.
+
+Packets are spoken one at a time in priority order. Consecutive scene updates
+that have not been spoken yet are merged into a single announcement, and an
+urgent briefing interrupts whatever lower-priority speech is playing.
+"""
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import logging
+from collections.abc import Awaitable
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger("vectr-agent")
+
+PRIORITY_URGENT = 0
+PRIORITY_BRIEFING = 1
+PRIORITY_UPDATE = 2
+
+KIND_BRIEFING = "tactical_briefing"
+KIND_UPDATE = "scene_update"
+
+
+class BriefingItem:
+    def __init__(
+        self, kind: str, text: str, priority: int, seq: int, verbatim: bool = False
+    ):
+        self.kind = kind
+        self.texts = [text]
+        self.priority = priority
+        self.seq = seq
+        self.verbatim = verbatim
+
+    def __lt__(self, other: "BriefingItem") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    @property
+    def instructions(self) -> str:
+        if self.kind == KIND_BRIEFING:
+            return f"Say this tactical briefing: {self.texts[0]}"
+        if len(self.texts) == 1:
+            return f"Announce this update from dispatch: {self.texts[0]}"
+        updates = "\n".join(f"- {text}" for text in self.texts)
+        return (
+            "Announce these updates from dispatch as one short combined update, "
+            f"most important first:\n{updates}"
+        )
+
+
+class BriefingQueue:
+    """
+    Bounded, prioritized, coalescing speech queue.
+
+    `speak` receives LLM instructions for one item and resolves to an
+    awaitable speech handle with an `interrupt()` method (wrapping
+    AgentSession.generate_reply). `say`, if given, is used the same way for
+    verbatim briefings, which are spoken as-is without the LLM.
+    """
+
+    def __init__(
+        self,
+        speak: Callable[[str], Awaitable[Any]],
+        maxsize: int = 16,
+        say: Optional[Callable[[str], Awaitable[Any]]] = None,
+    ):
+        self._speak = speak
+        self._say = say
+        self.maxsize = maxsize
+        self._pending: list[BriefingItem] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._current: Optional[BriefingItem] = None
+        self._current_handle: Any = None
+        self._task: Optional[asyncio.Task] = None
+        self.dropped = 0
+        self.coalesced = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="vectr-briefing-queue")
+
+    def put_packet(self, payload: dict) -> bool:
+        """Enqueue a decoded data packet; returns False if it is not speakable."""
+        kind = payload.get("type")
+        if kind == KIND_BRIEFING:
+            briefing = payload.get("briefing", "")
+            if not briefing:
+                return False
+            urgent = payload.get("urgent") or payload.get("priority") == "urgent"
+            self.put(
+                KIND_BRIEFING,
+                briefing,
+                PRIORITY_URGENT if urgent else PRIORITY_BRIEFING,
+                verbatim=bool(payload.get("verbatim")),
+            )
+            return True
+        if kind == KIND_UPDATE:
+            scene_data = payload.get("data", {})
+            summary = scene_data.get("summary", "New scene information available.")
+            self.put(KIND_UPDATE, summary, PRIORITY_UPDATE)
+            return True
+        return False
+
+    def put(self, kind: str, text: str, priority: int, verbatim: bool = False) -> None:
+        if kind == KIND_UPDATE:
+            for item in self._pending:
+                if item.kind == KIND_UPDATE:
+                    item.texts.append(text)
+                    self.coalesced += 1
+                    return
+
+        if len(self._pending) >= self.maxsize:
+            # Shed the least important, most recent item to make room.
+            victim = max(self._pending)
+            if victim.priority < priority:
+                self.dropped += 1
+                logger.warning(f"Briefing queue full, dropping {kind}")
+                return
+            self._pending.remove(victim)
+            heapq.heapify(self._pending)
+            self.dropped += 1
+            logger.warning(f"Briefing queue full, dropping queued {victim.kind}")
+
+        heapq.heappush(
+            self._pending,
+            BriefingItem(kind, text, priority, next(self._seq), verbatim=verbatim),
+        )
+        self._wakeup.set()
+
+        if (
+            priority == PRIORITY_URGENT
+            and self._current is not None
+            and self._current.priority > priority
+            and self._current_handle is not None
+        ):
+            logger.info("Urgent briefing interrupting current announcement")
+            try:
+                self._current_handle.interrupt(force=True)
+            except Exception as e:
+                logger.warning(f"Could not interrupt speech: {e}")
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def aclose(self) -> None:
+        self._pending.clear()
+        if self._current_handle is not None:
+            with contextlib.suppress(Exception):
+                self._current_handle.interrupt(force=True)
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            while not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+
+            item = heapq.heappop(self._pending)
+            self._current = item
+            try:
+                if item.verbatim and self._say is not None:
+                    self._current_handle = await self._say(item.texts[0])
+                else:
+                    self._current_handle = await self._speak(item.instructions)
+                await self._current_handle
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error speaking {item.kind}: {e}")
+            finally:
+                self._current = None
+                self._current_handle = None
@@ -0,0 +1,260 @@
+"""
+Incident-scoped EMS report state and incremental patching.
+
+The Tactical Scene Report is kept per incident as numbered sections. When
+caller notes change, only the new note lines and the prior sections are sent
+to Gemini, which returns just the sections that need to change; the rest of
+the report is reused as-is.
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from pydantic import BaseModel
+
+from model_router import model_router
+from scene_intel import GEMINI_API_KEY, UpstreamError, gemini_client
+
+REPORT_SECTIONS = {
+    "1": "SITUATION / CHIEF COMPLAINT",
+    "2": "PATIENT DETAILS",
+    "3": "ACCESS & STAGING",
+    "4": "HAZARDS & SCENE SAFETY",
+    "5": "MECHANISM / HISTORY",
+    "6": "DISPATCH INFO",
+}
+
+# "1. SITUATION", "**2. PATIENT DETAILS**", "### 3) ACCESS & STAGING: ..."
+# Anchored on each title's first word so numbered list items in a section
+# body ("1. Left leg") are not taken for headers.
+SECTION_KEYWORDS = {
+    number: title.split()[0] for number, title in REPORT_SECTIONS.items()
+}
+SECTION_HEADER = re.compile(
+    r"^[\s#*]*([1-6])[.)][\s*#]*("
+    + "|".join(re.escape(keyword) for keyword in SECTION_KEYWORDS.values())
+    + r")\b(.*)$",
+    re.IGNORECASE,
+)
+
+
+class IncidentReport(BaseModel):
+    incident_id: str
+    address: str
+    lat: float = 0.0
+    lng: float = 0.0
+    caller_notes: str = ""
+    scene_analysis: str = ""
+    positioning_guidance: str = ""
+    preamble: str = ""
+    sections: dict[str, str] = {}
+    version: int = 1
+    updated_at: float = 0.0
+
+    @property
+    def text(self) -> str:
+        return render_report(self.preamble, self.sections)
+
+
+def split_report_sections(report: str) -> tuple[str, dict[str, str]]:
+    """Split a report into (preamble, {section number: body})."""
+    preamble: list[str] = []
+    sections: dict[str, list[str]] = {}
+    current: Optional[list[str]] = None
+    for line in report.splitlines():
+        match = SECTION_HEADER.match(line)
+        if (
+            match
+            and match.group(2).upper() == SECTION_KEYWORDS[match.group(1)]
+            and match.group(1) not in sections
+        ):
+            current = sections.setdefault(match.group(1), [])
+            header = match.group(3).strip("*# ")
+            if ":" in header:
+                inline = header.split(":", 1)[1].strip("*# ")
+                if inline:
+                    current.append(inline)
+            continue
+        (current if current is not None else preamble).append(line)
+    return (
+        "\n".join(preamble).strip(),
+        {number: "\n".join(lines).strip() for number, lines in sections.items()},
+    )
+
+
+def render_report(preamble: str, sections: dict[str, str]) -> str:
+    parts = [preamble] if preamble else []
+    for number in sorted(sections):
+        title = REPORT_SECTIONS.get(number, f"SECTION {number}")
+        parts.append(f"{number}. {title}\n{sections[number]}")
+    return "\n\n".join(parts)
+
+
+def notes_delta(previous: str, current: str) -> str:
+    """Caller-note lines that are new in `current`."""
+    if current.startswith(previous):
+        return current[len(previous) :].strip()
+    seen = {line.strip() for line in previous.splitlines()}
+    return "\n".join(
+        line
+        for line in current.splitlines()
+        if line.strip() and line.strip() not in seen
+    ).strip()
+
+
+def patch_report_sections(
+    report: IncidentReport, delta: str, premise_notes: str = ""
+) -> dict[str, str]:
+    """
+    Ask Gemini which report sections the new caller information changes.
+    Returns {section number: full new body} for changed sections only.
+    """
+    if not GEMINI_API_KEY:
+        raise UpstreamError(status_code=500, detail="GEMINI_API_KEY is not configured")
+
+    client = gemini_client(GEMINI_API_KEY)
+    current = {
+        number: {"title": REPORT_SECTIONS.get(number, ""), "text": text}
+        for number, text in sorted(report.sections.items())
+    }
+    prompt = (
+        "You are an EMS Incident Commander maintaining a 'Tactical Scene Report' "
+        f"for crews responding to {report.address}.\n\n"
+        f"CURRENT REPORT SECTIONS (JSON):\n{json.dumps(current, indent=1)}\n\n"
+        f"PRIOR PREMISE NOTES (from earlier calls to this address):\n"
+        f"{premise_notes or 'None on file.'}\n\n"
+        f"NEW CALLER NOTES / DISPATCH INFO:\n{delta}\n\n"
+        "Update only the sections the new information changes, keeping any "
+        "premise hazards and access details they carry. Respond ONLY with "
+        "a JSON object mapping each changed section number to its complete new "
+        'text, e.g. {"2": "..."}. Return {} if nothing changes. Keep the '
+        "telegraphic, radio read-back style. No markdown, no explanation."
+    )
+
+    model = model_router.route("report_patch", len(prompt.encode()))
+    try:
+        with model_router.timed(model):
+            response = client.models.generate_content(
+                model=model,
+                contents=prompt,
+            )
+    except Exception as exc:
+        raise UpstreamError(status_code=502, detail="Error calling Gemini API") from exc
+
+    text = (getattr(response, "text", None) or "").strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1].rsplit("```", 1)[0]
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as exc:
+        raise UpstreamError(
+            status_code=502, detail="Invalid report patch from Gemini API"
+        ) from exc
+    if not isinstance(data, dict):
+        raise UpstreamError(
+            status_code=502, detail="Invalid report patch from Gemini API"
+        )
+
+    return {
+        str(number): str(body).strip()
+        for number, body in data.items()
+        if str(number) in REPORT_SECTIONS
+        and str(body).strip()
+        and str(body).strip() != report.sections.get(str(number))
+    }
+
+
+def changed_sections(before: dict[str, str], after: dict[str, str]) -> dict[str, str]:
+    return {
+        number: text for number, text in after.items() if before.get(number) != text
+    }
+
+
+def describe_changes(changes: dict[str, str], limit: int = 1000) -> str:
+    """Short spoken summary of changed sections for a scene_update packet."""
+    lines = [
+        f"{REPORT_SECTIONS.get(number, f'Section {number}')}: {text}"
+        for number, text in sorted(changes.items())
+    ]
+    return ("Report update. " + " ".join(lines))[:limit]
+
+
+class ReportStore:
+    """
+    Incident report state with one lock per incident. With a backend (an
+    incident store) attached, reports are read from and written through to
+    it so every worker process sees the latest version.
+    """
+
+    def __init__(self, max_entries: int = 256, backend=None):
+        self.max_entries = max_entries
+        self.backend = backend
+        self._reports: OrderedDict[str, IncidentReport] = OrderedDict()
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    def get(self, incident_id: str) -> Optional[IncidentReport]:
+        if self.backend is not None:
+            return self.backend.get_report(incident_id)
+        report = self._reports.get(incident_id)
+        if report is not None:
+            self._reports.move_to_end(incident_id)
+        return report
+
+    def put(self, report: IncidentReport) -> None:
+        report.updated_at = time.time()
+        if self.backend is not None:
+            self.backend.save_report(report)
+            return
+        self._reports[report.incident_id] = report
+        self._reports.move_to_end(report.incident_id)
+        while len(self._reports) > self.max_entries:
+            evicted, _ = self._reports.popitem(last=False)
+            self._locks.pop(evicted, None)
+
+    def update(self, incident_id: str, update) -> Optional[IncidentReport]:
+        """
+        Atomic read-modify-write across workers. `update` gets the stored
+        report (or None) and returns the report to write, or None to skip.
+        Keep it quick: with a shared backend it runs inside a write transaction.
+        """
+
+        def stamped(current: Optional[IncidentReport]) -> Optional[IncidentReport]:
+            report = update(current)
+            if report is not None:
+                report.updated_at = time.time()
+            return report
+
+        if self.backend is not None:
+            return self.backend.update_report(incident_id, stamped)
+        report = update(self._reports.get(incident_id))
+        if report is not None:
+            self.put(report)
+        return report
+
+    def swap(self, expected: IncidentReport, report: IncidentReport) -> bool:
+        """Write `report` only if the stored report is still `expected`."""
+        return (
+            self.update(
+                expected.incident_id,
+                lambda current: (
+                    report
+                    if current is not None and current.updated_at == expected.updated_at
+                    else None
+                ),
+            )
+            is not None
+        )
+
+    def lock(self, incident_id: str) -> asyncio.Lock:
+        """Serializes updates within this process; `swap` guards across workers."""
+        return self._locks.setdefault(incident_id, asyncio.Lock())
+
+
+report_store = ReportStore(
+    max_entries=int(os.environ.get("VECTR_REPORT_STORE_MAX_ENTRIES", "256"))
+)
@@ -0,0 +1,335 @@
+"""
+Incident and scene-intel store shared by API worker processes.
+
+Holds each incident's report state, its pipeline stage results, scene cache
+entries and premise notes, indexed by incident id, geocell and address. The in-memory backend
+serves a single process; the SQLite backend (VECTR_INCIDENT_STORE=sqlite)
+runs in WAL mode so several uvicorn workers on one box can share one file.
+
+Calls are synchronous: SQLite transactions here are short, local and far
+cheaper than a thread hop.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional
+
+from ems_reports import IncidentReport
+from scene_cache import geocell
+
+logger = logging.getLogger("vectr-incident-store")
+
+# Receives the stored report (None if missing) and returns the report to
+# write, or None to leave the row untouched.
+ReportUpdate = Callable[[Optional[IncidentReport]], Optional[IncidentReport]]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS incidents (
+    incident_id TEXT PRIMARY KEY,
+    geocell TEXT NOT NULL,
+    report TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS incidents_geocell ON incidents (geocell);
+
+CREATE TABLE IF NOT EXISTS stage_results (
+    incident_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (incident_id, stage)
+);
+
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    geocell TEXT,
+    value BLOB NOT NULL,
+    stored_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_entries_geocell ON cache_entries (geocell);
+
+CREATE TABLE IF NOT EXISTS premise_notes (
+    identity TEXT PRIMARY KEY,
+    address_key TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    note TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS premise_notes_address ON premise_notes (address_key);
+
+CREATE TABLE IF NOT EXISTS premise_locations (
+    cell TEXT NOT NULL,
+    address_key TEXT NOT NULL,
+    PRIMARY KEY (cell, address_key)
+);
+"""
+
+
+class InMemoryIncidentStore:
+    """Incident store living in the current process."""
+
+    shared = False
+
+    def __init__(self, max_incidents: int = 1024):
+        self.max_incidents = max_incidents
+        self._reports: OrderedDict[str, IncidentReport] = OrderedDict()
+        self._stages: dict[str, dict[str, str]] = {}
+        self._cache: dict[str, tuple[float, bytes]] = {}
+
+    def save_report(self, report: IncidentReport) -> None:
+        self._reports[report.incident_id] = report.model_copy(deep=True)
+        self._reports.move_to_end(report.incident_id)
+        while len(self._reports) > self.max_incidents:
+            evicted, _ = self._reports.popitem(last=False)
+            self._stages.pop(evicted, None)
+
+    def get_report(self, incident_id: str) -> Optional[IncidentReport]:
+        report = self._reports.get(incident_id)
+        return report.model_copy(deep=True) if report else None
+
+    def update_report(
+        self, incident_id: str, update: ReportUpdate
+    ) -> Optional[IncidentReport]:
+        report = update(self.get_report(incident_id))
+        if report is not None:
+            self.save_report(report)
+        return report
+
+    def reports_in_cell(self, cell: str) -> list[IncidentReport]:
+        return [
+            report.model_copy(deep=True)
+            for report in self._reports.values()
+            if geocell(report.lat, report.lng) == cell
+        ]
+
+    def save_stage(self, incident_id: str, stage: str, value: str) -> None:
+        self._stages.setdefault(incident_id, {})[stage] = value
+
+    def get_stages(self, incident_id: str) -> dict[str, str]:
+        return dict(self._stages.get(incident_id, {}))
+
+    def cache_get(self, key: str) -> Optional[bytes]:
+        entry = self._cache.get(key)
+        return entry[1] if entry else None
+
+    def cache_set(
+        self, key: str, cell: Optional[str], stored_at: float, value: bytes
+    ) -> None:
+        self._cache[key] = (stored_at, value)
+
+    def purge_cache(self, older_than: float) -> int:
+        expired = [
+            k for k, (stored_at, _) in self._cache.items() if stored_at < older_than
+        ]
+        for key in expired:
+            del self._cache[key]
+        return len(expired)
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteIncidentStore:
+    """SQLite (WAL) incident store shared by processes on one host."""
+
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; sqlite3 connections are not thread-safe."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def save_report(self, report: IncidentReport) -> None:
+        with self._connect() as conn:
+            self._write_report(conn, report)
+
+    def _write_report(self, conn: sqlite3.Connection, report: IncidentReport) -> None:
+        now = time.time()
+        conn.execute(
+            """
+            INSERT INTO incidents (incident_id, geocell, report, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (incident_id) DO UPDATE SET
+                geocell = excluded.geocell,
+                report = excluded.report,
+                updated_at = excluded.updated_at
+            """,
+            (
+                report.incident_id,
+                geocell(report.lat, report.lng),
+                report.model_dump_json(),
+                now,
+                now,
+            ),
+        )
+
+    def get_report(self, incident_id: str) -> Optional[IncidentReport]:
+        row = (
+            self._connect()
+            .execute(
+                "SELECT report FROM incidents WHERE incident_id = ?", (incident_id,)
+            )
+            .fetchone()
+        )
+        return IncidentReport.model_validate_json(row[0]) if row else None
+
+    def update_report(
+        self, incident_id: str, update: ReportUpdate
+    ) -> Optional[IncidentReport]:
+        """Read, update and write a report in one write transaction."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            report = update(self.get_report(incident_id))
+            if report is not None:
+                self._write_report(conn, report)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return report
+
+    def reports_in_cell(self, cell: str) -> list[IncidentReport]:
+        rows = (
+            self._connect()
+            .execute(
+                "SELECT report FROM incidents WHERE geocell = ? ORDER BY updated_at DESC",
+                (cell,),
+            )
+            .fetchall()
+        )
+        return [IncidentReport.model_validate_json(row[0]) for row in rows]
+
+    def save_stage(self, incident_id: str, stage: str, value: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO stage_results (incident_id, stage, value, updated_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                (incident_id, stage, value, time.time()),
+            )
+
+    def get_stages(self, incident_id: str) -> dict[str, str]:
+        rows = (
+            self._connect()
+            .execute(
+                "SELECT stage, value FROM stage_results WHERE incident_id = ?",
+                (incident_id,),
+            )
+            .fetchall()
+        )
+        return dict(rows)
+
+    def cache_get(self, key: str) -> Optional[bytes]:
+        """An entry encoded by scene_cache.encode_entry; decoding is the caller's."""
+        row = (
+            self._connect()
+            .execute("SELECT value FROM cache_entries WHERE key = ?", (key,))
+            .fetchone()
+        )
+        return row[0] if row else None
+
+    def cache_set(
+        self, key: str, cell: Optional[str], stored_at: float, value: bytes
+    ) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO cache_entries (key, geocell, value, stored_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                (key, cell, value, stored_at),
+            )
+
+    def purge_cache(self, older_than: float) -> int:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM cache_entries WHERE stored_at < ?", (older_than,)
+            )
+        return cursor.rowcount
+
+    def add_note(
+        self, identity: str, address_key: str, created_at: float, note: str
+    ) -> bool:
+        """Store a premise note (JSON); False if `identity` is already stored."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """
+                INSERT OR IGNORE INTO premise_notes
+                    (identity, address_key, created_at, note)
+                VALUES (?, ?, ?, ?)
+                """,
+                (identity, address_key, created_at, note),
+            )
+        return cursor.rowcount == 1
+
+    def notes_for(self, address_key: str) -> list[str]:
+        rows = (
+            self._connect()
+            .execute(
+                """
+                SELECT note FROM premise_notes WHERE address_key = ?
+                ORDER BY created_at DESC
+                """,
+                (address_key,),
+            )
+            .fetchall()
+        )
+        return [row[0] for row in rows]
+
+    def count_notes(self) -> int:
+        return (
+            self._connect().execute("SELECT COUNT(*) FROM premise_notes").fetchone()[0]
+        )
+
+    def locate_address(self, address_key: str, cell: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO premise_locations (cell, address_key) VALUES (?, ?)",
+                (cell, address_key),
+            )
+
+    def address_keys_in(self, cell: str) -> list[str]:
+        rows = (
+            self._connect()
+            .execute(
+                "SELECT address_key FROM premise_locations WHERE cell = ?", (cell,)
+            )
+            .fetchall()
+        )
+        return [row[0] for row in rows]
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def create_incident_store():
+    """Build the incident store selected by VECTR_INCIDENT_STORE."""
+    backend = os.environ.get("VECTR_INCIDENT_STORE", "memory").lower()
+    if backend == "sqlite":
+        path = os.environ.get("VECTR_INCIDENT_DB", ".vectr/incidents.db")
+        return SQLiteIncidentStore(path)
+    if backend != "memory":
+        raise RuntimeError(f"Unknown VECTR_INCIDENT_STORE: {backend}")
+    return InMemoryIncidentStore()
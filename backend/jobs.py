@@ -0,0 +1,315 @@
+"""
+Background job queue for long-running incident pipelines.
+
+Jobs are executed by a bounded pool of asyncio workers inside the API process.
+Job state and progress events go through a pluggable backend: an in-memory
+backend for single-node use, or a Redis-compatible backend (Redis, Valkey,
+KeyDB, ...) selected with VECTR_JOB_BACKEND=redis.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import time
+import uuid
+from collections.abc import AsyncIterator, Awaitable
+from typing import Any, Callable, Optional
+
+from pydantic import BaseModel
+
+logger = logging.getLogger("vectr-jobs")
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+TERMINAL_STATES = (JOB_SUCCEEDED, JOB_FAILED)
+
+STAGE_PENDING = "pending"
+STAGE_RUNNING = "running"
+STAGE_DONE = "done"
+STAGE_FAILED = "failed"
+
+
+class JobStage(BaseModel):
+    status: str = STAGE_PENDING
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+
+class Job(BaseModel):
+    job_id: str
+    kind: str
+    status: str = JOB_QUEUED
+    stages: dict[str, JobStage] = {}
+    result: dict[str, Any] = {}
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
+
+
+class QueueFullError(Exception):
+    """Raised when the queue cannot accept another job."""
+
+
+class InMemoryJobBackend:
+    """Job store and event bus living in the current process."""
+
+    def __init__(self, ttl_seconds: float = 3600):
+        self.ttl_seconds = ttl_seconds
+        self._jobs: dict[str, Job] = {}
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+
+    async def save(self, job: Job) -> None:
+        self._jobs[job.job_id] = job.model_copy(deep=True)
+        self._expire()
+
+    async def load(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        return job.model_copy(deep=True) if job else None
+
+    async def publish(self, job_id: str, event: dict) -> None:
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait(event)
+
+    async def subscribe(self, job_id: str) -> AsyncIterator[dict]:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[job_id]
+
+    async def aclose(self) -> None:
+        self._subscribers.clear()
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.status in TERMINAL_STATES and job.updated_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+class RedisJobBackend:
+    """
+    Job store and event bus backed by a Redis-compatible server.
+    Lets several API processes share job status and SSE streams.
+    """
+
+    def __init__(self, url: str, ttl_seconds: float = 3600, prefix: str = "vectr:job"):
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError as exc:
+            raise RuntimeError(
+                "VECTR_JOB_BACKEND=redis requires the 'redis' package"
+            ) from exc
+
+        self.ttl_seconds = int(ttl_seconds)
+        self.prefix = prefix
+        self._redis = redis_asyncio.from_url(url)
+
+    def _key(self, job_id: str) -> str:
+        return f"{self.prefix}:{job_id}"
+
+    async def save(self, job: Job) -> None:
+        await self._redis.set(
+            self._key(job.job_id), job.model_dump_json(), ex=self.ttl_seconds
+        )
+
+    async def load(self, job_id: str) -> Optional[Job]:
+        raw = await self._redis.get(self._key(job_id))
+        return Job.model_validate_json(raw) if raw else None
+
+    async def publish(self, job_id: str, event: dict) -> None:
+        await self._redis.publish(f"{self._key(job_id)}:events", json.dumps(event))
+
+    async def subscribe(self, job_id: str) -> AsyncIterator[dict]:
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(f"{self._key(job_id)}:events")
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    yield json.loads(message["data"])
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+
+    async def aclose(self) -> None:
+        await self._redis.aclose()
+
+
+def create_job_backend():
+    """Build the job backend selected by VECTR_JOB_BACKEND."""
+    backend = os.environ.get("VECTR_JOB_BACKEND", "memory").lower()
+    ttl = float(os.environ.get("VECTR_JOB_TTL_SECONDS", "3600"))
+    if backend == "redis":
+        url = os.environ.get("VECTR_REDIS_URL", "redis://localhost:6379/0")
+        return RedisJobBackend(url, ttl_seconds=ttl)
+    if backend != "memory":
+        raise RuntimeError(f"Unknown VECTR_JOB_BACKEND: {backend}")
+    return InMemoryJobBackend(ttl_seconds=ttl)
+
+
+class JobContext:
+    """Handed to job runners to report per-stage progress."""
+
+    def __init__(self, queue: "JobQueue", job: Job):
+        self._queue = queue
+        self.job = job
+
+    @contextlib.asynccontextmanager
+    async def stage(self, name: str):
+        stage = self.job.stages.setdefault(name, JobStage())
+        stage.status = STAGE_RUNNING
+        stage.started_at = time.time()
+        await self._queue._update(self.job, {"stage": name, "status": STAGE_RUNNING})
+        try:
+            yield stage
+        except Exception as exc:
+            stage.status = STAGE_FAILED
+            stage.error = str(exc)
+            stage.finished_at = time.time()
+            await self._queue._update(
+                self.job, {"stage": name, "status": STAGE_FAILED, "error": str(exc)}
+            )
+            raise
+        stage.status = STAGE_DONE
+        stage.finished_at = time.time()
+        await self._queue._update(self.job, {"stage": name, "status": STAGE_DONE})
+
+    def set_result(self, **values: Any) -> None:
+        self.job.result.update(values)
+
+
+JobRunner = Callable[[JobContext], Awaitable[None]]
+
+
+class JobQueue:
+    """
+    Bounded queue drained by a fixed number of worker tasks.
+    Submissions beyond max_pending are rejected instead of piling up.
+    """
+
+    def __init__(self, backend, workers: int = 4, max_pending: int = 100):
+        self.backend = backend
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"vectr-job-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.backend.aclose()
+
+    async def submit(
+        self, kind: str, runner: JobRunner, stages: tuple[str, ...] = ()
+    ) -> Job:
+        if self._queue.full():
+            raise QueueFullError("Job queue is full")
+
+        now = time.time()
+        job = Job(
+            job_id=uuid.uuid4().hex,
+            kind=kind,
+            stages={name: JobStage() for name in stages},
+            created_at=now,
+            updated_at=now,
+        )
+        await self.backend.save(job)
+        self._queue.put_nowait((job, runner))
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await self.backend.load(job_id)
+
+    async def events(
+        self, job_id: str, heartbeat_seconds: float = 15.0
+    ) -> AsyncIterator[dict]:
+        """
+        Yield a snapshot of the job followed by live updates,
+        ending once the job reaches a terminal state.
+        """
+        subscription = self.backend.subscribe(job_id)
+        # Prime the subscription before reading the snapshot so no update is lost.
+        next_event = asyncio.ensure_future(subscription.__anext__())
+        await asyncio.sleep(0)
+        try:
+            job = await self.backend.load(job_id)
+            if job is None:
+                return
+            yield {"type": "snapshot", "job": job.model_dump()}
+            if job.status in TERMINAL_STATES:
+                return
+
+            while True:
+                done, _ = await asyncio.wait({next_event}, timeout=heartbeat_seconds)
+                if not done:
+                    # Re-check the stored state in case an update slipped past
+                    # the subscription (e.g. published before it was live).
+                    job = await self.backend.load(job_id)
+                    if job is None or job.status in TERMINAL_STATES:
+                        if job is not None:
+                            yield {"type": "snapshot", "job": job.model_dump()}
+                        return
+                    yield {"type": "heartbeat", "job_id": job_id}
+                    continue
+
+                event = next_event.result()
+                yield event
+                if event.get("job_status") in TERMINAL_STATES:
+                    return
+                next_event = asyncio.ensure_future(subscription.__anext__())
+        finally:
+            next_event.cancel()
+            with contextlib.suppress(BaseException):
+                await next_event
+            await subscription.aclose()
+
+    async def _update(self, job: Job, event: dict) -> None:
+        job.updated_at = time.time()
+        await self.backend.save(job)
+        await self.backend.publish(
+            job.job_id,
+            {"type": "update", "job_id": job.job_id, "job_status": job.status, **event},
+        )
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job, runner = await self._queue.get()
+            try:
+                job.status = JOB_RUNNING
+                await self._update(job, {})
+                await runner(JobContext(self, job))
+                job.status = JOB_SUCCEEDED
+                await self._update(job, {"result": job.result})
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.exception(f"Job {job.job_id} failed")
+                job.status = JOB_FAILED
+                job.error = str(exc)
+                await self._update(job, {"error": str(exc)})
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,514 @@
+"""
+Latency load test for the voice agent with simulated crews.
+
+Runs N concurrent VECTRAgent sessions in one process against stubbed
+STT/LLM/TTS and stubbed scene tools. Each simulated crew asks scripted
+questions (some of which make the LLM call the scene tools) while dispatcher
+data packets arrive through the same BriefingQueue the worker uses, and the
+run reports:
+
+- turn latency: end of crew speech to the agent's first audio frame
+- tool-call latency: tool call emitted to its result reaching the LLM
+- event-loop lag, sampled the way the worker's LoopLagMonitor does
+- memory per session: RSS growth over the run divided by sessions
+
+Stub latencies stand in for the upstream services, so what varies with N is
+the worker's own overhead. All sessions share one event loop, which is
+stricter than production's process per job: a pass here is a safe bound.
+Exits non-zero when an SLO is breached.
+
+STT is modelled as a fixed finalization delay before each crew turn; the
+session is driven with text, so no audio input path is exercised.
+
+Usage:
+    python loadtest.py --sessions 25 --turns 6
+    python loadtest.py --sessions 50 --turn-p95-ms 1200 --json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import math
+import random
+import sys
+import time
+from typing import Optional
+
+import psutil
+from livekit.agents import AgentSession, llm, tts, utils
+from livekit.agents.llm import ChatChunk, ChoiceDelta, FunctionToolCall
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS
+from livekit.agents.voice import io
+from pydantic import BaseModel
+
+import scene_intel
+from agent import VECTRAgent
+from briefing_queue import BriefingQueue
+from session_cache import SessionToolCache
+from worker_load import LoopLagMonitor
+
+logger = logging.getLogger("vectr-loadtest")
+
+INCIDENT = {
+    "incident_id": "loadtest",
+    "address": "123 Oak Street",
+    "lat": 37.7749,
+    "lng": -122.4194,
+}
+
+CREW_SCRIPT = (
+    "Where do we park the rig?",
+    "What's the best approach route?",
+    "Any hazards on scene?",
+    "Copy. Where's the stretcher path to the entrance?",
+    "Say again where we park.",
+    "Anything new from dispatch?",
+)
+
+DISPATCH_PACKETS = (
+    {"type": "scene_update", "data": {"summary": "Caller reports patient on floor."}},
+    {"type": "tactical_briefing", "briefing": "Engine 7 on scene, staging north."},
+    {"type": "scene_update", "data": {"summary": "Gate code 4411, dog secured."}},
+)
+
+# Which scripted questions make the stub LLM call which tool.
+TOOL_KEYWORDS = {
+    "get_positioning_guidance": ("park", "stretcher", "position"),
+    "get_scene_analysis": ("approach", "hazard", "route"),
+}
+
+SAMPLE_RATE = 24000
+
+
+class LoadConfig(BaseModel):
+    sessions: int = 10
+    turns: int = 6
+    stt_delay: float = 0.15
+    llm_ttft: float = 0.35
+    token_interval: float = 0.02
+    answer_words: int = 25
+    tts_ttfb: float = 0.15
+    tool_latency: float = 1.5
+    think_time: float = 1.0
+    packet_every: int = 2
+    warm: bool = True
+    seed: int = 7
+
+
+class LatencySLO(BaseModel):
+    turn_p95_ms: float = 2000
+    tool_p95_ms: float = 2500
+    loop_lag_p95_ms: float = 50
+    loop_lag_max_ms: float = 250
+    memory_per_session_mb: float = 20
+
+
+class LoadReport(BaseModel):
+    config: LoadConfig
+    slo: LatencySLO
+    turns: int
+    turn_ms: dict[str, float]
+    tool_calls: int
+    tool_ms: dict[str, float]
+    loop_lag_ms: dict[str, float]
+    loop_stalls: int
+    memory_per_session_mb: float
+    packets_dropped: int
+    errors: int
+    breaches: list[str]
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    """p50/p95/p99/max of samples in seconds, reported in milliseconds."""
+    return {
+        "p50": round(percentile(samples, 50) * 1000, 1),
+        "p95": round(percentile(samples, 95) * 1000, 1),
+        "p99": round(percentile(samples, 99) * 1000, 1),
+        "max": round(max(samples, default=0.0) * 1000, 1),
+    }
+
+
+class LoadStats:
+    def __init__(self):
+        self.turns: list[float] = []
+        self.tools: list[float] = []
+        self.errors = 0
+        self.packets_dropped = 0
+
+
+class StubLLMStream(llm.LLMStream):
+    async def _run(self) -> None:
+        stub: StubLLM = self._llm
+        now = time.perf_counter()
+        for item in self.chat_ctx.items:
+            if item.type == "function_call_output":
+                started = stub.pending_tools.pop(item.call_id, None)
+                if started is not None:
+                    stub.stats.tools.append(now - started)
+
+        await asyncio.sleep(stub.config.llm_ttft)
+        last = self.chat_ctx.items[-1] if self.chat_ctx.items else None
+        tool = stub.tool_for(last)
+        if tool is not None:
+            call_id = utils.shortuuid("call_")
+            stub.pending_tools[call_id] = time.perf_counter()
+            self._event_ch.send_nowait(
+                ChatChunk(
+                    id=call_id,
+                    delta=ChoiceDelta(
+                        role="assistant",
+                        tool_calls=[
+                            FunctionToolCall(
+                                name=tool,
+                                arguments=json.dumps(stub.tool_arguments()),
+                                call_id=call_id,
+                            )
+                        ],
+                    ),
+                )
+            )
+            return
+
+        request_id = utils.shortuuid("req_")
+        for word in range(stub.config.answer_words):
+            # Short sentences, so TTS can start before the answer is complete.
+            token = "copy. " if word % 8 == 7 else "copy "
+            self._event_ch.send_nowait(
+                ChatChunk(
+                    id=request_id,
+                    delta=ChoiceDelta(role="assistant", content=token),
+                )
+            )
+            await asyncio.sleep(stub.config.token_interval)
+
+
+class StubLLM(llm.LLM):
+    """Scripted LLM: calls a scene tool for matching crew questions, else talks."""
+
+    def __init__(self, config: LoadConfig, stats: LoadStats, rng: random.Random):
+        super().__init__()
+        self.config = config
+        self.stats = stats
+        self.rng = rng
+        self.pending_tools: dict[str, float] = {}
+
+    def tool_for(self, item) -> Optional[str]:
+        if item is None or item.type != "message" or item.role != "user":
+            return None
+        question = (item.text_content or "").lower()
+        for tool, keywords in TOOL_KEYWORDS.items():
+            if any(keyword in question for keyword in keywords):
+                return tool
+        return None
+
+    def tool_arguments(self) -> dict:
+        # LLMs echo coordinates back rounded or jittered by a few meters.
+        return {
+            "address": INCIDENT["address"],
+            "lat": round(INCIDENT["lat"] + self.rng.uniform(-4e-5, 4e-5), 6),
+            "lng": round(INCIDENT["lng"] + self.rng.uniform(-4e-5, 4e-5), 6),
+        }
+
+    def chat(
+        self,
+        *,
+        chat_ctx,
+        tools=None,
+        conn_options=DEFAULT_API_CONNECT_OPTIONS,
+        **kwargs,
+    ) -> StubLLMStream:
+        return StubLLMStream(
+            self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options
+        )
+
+
+class StubChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter) -> None:
+        await asyncio.sleep(self._tts.ttfb)
+        output_emitter.initialize(
+            request_id=utils.shortuuid("tts_"),
+            sample_rate=SAMPLE_RATE,
+            num_channels=1,
+            mime_type="audio/pcm",
+        )
+        # ~60 ms of 16-bit silence per word.
+        words = max(1, len(self.input_text.split()))
+        output_emitter.push(b"\0\0" * int(SAMPLE_RATE * 0.06 * words))
+        output_emitter.flush()
+
+
+class StubTTS(tts.TTS):
+    def __init__(self, ttfb: float):
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=False),
+            sample_rate=SAMPLE_RATE,
+            num_channels=1,
+        )
+        self.ttfb = ttfb
+
+    def synthesize(
+        self, text: str, *, conn_options=DEFAULT_API_CONNECT_OPTIONS
+    ) -> StubChunkedStream:
+        return StubChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+
+class NullAudioOutput(io.AudioOutput):
+    """Discards audio, recording when the first frame of a turn arrives."""
+
+    def __init__(self):
+        super().__init__(
+            label="loadtest", capabilities=io.AudioOutputCapabilities(pause=True)
+        )
+        self.first_frame_at: Optional[float] = None
+        self._pushed = 0.0
+
+    async def capture_frame(self, frame) -> None:
+        await super().capture_frame(frame)
+        if self.first_frame_at is None:
+            self.first_frame_at = time.perf_counter()
+        self._pushed += frame.duration
+
+    def flush(self) -> None:
+        super().flush()
+        self.on_playback_finished(playback_position=self._pushed, interrupted=False)
+        self._pushed = 0.0
+
+    def clear_buffer(self) -> None:
+        self._pushed = 0.0
+
+
+class RecordingLagMonitor(LoopLagMonitor):
+    """LoopLagMonitor that keeps every sample and the peak RSS."""
+
+    def __init__(self, interval: float = 0.05):
+        super().__init__(interval=interval, stall_threshold=0.1, report_dir=None)
+        self.samples: list[float] = []
+        self.process = psutil.Process()
+        self.peak_rss = self.process.memory_info().rss
+
+    def record(self, lag: float) -> None:
+        super().record(lag)
+        self.samples.append(lag)
+        self.peak_rss = max(self.peak_rss, self.process.memory_info().rss)
+
+
+@contextlib.contextmanager
+def stubbed_scene_tools(latency: float):
+    """Replace the scene getters the agent tools call with fixed-latency stubs."""
+    originals = (scene_intel.get_scene_analysis, scene_intel.get_positioning_guidance)
+
+    async def scene_analysis(address, lat, lng, max_age=None) -> str:
+        await asyncio.sleep(latency)
+        return "Approach from the north on Oak. Hydrant at the corner. " * 8
+
+    async def positioning_guidance(address, lat, lng, max_age=None) -> str:
+        await asyncio.sleep(latency)
+        return "Park 20 ft past the driveway facing east. Stretcher path level. " * 8
+
+    scene_intel.get_scene_analysis = scene_analysis
+    scene_intel.get_positioning_guidance = positioning_guidance
+    try:
+        yield
+    finally:
+        scene_intel.get_scene_analysis, scene_intel.get_positioning_guidance = originals
+
+
+async def wait_until_quiet(session: AgentSession, briefings: BriefingQueue) -> None:
+    while len(briefings) or session.current_speech is not None:
+        await asyncio.sleep(0.02)
+
+
+async def run_crew(index: int, config: LoadConfig, stats: LoadStats) -> None:
+    rng = random.Random(config.seed + index)
+    stub_llm = StubLLM(config, stats, rng)
+    stub_tts = StubTTS(config.tts_ttfb)
+    tool_cache = SessionToolCache()
+    if config.warm:
+        # What seed_tool_cache loads from the shared incident store.
+        for tool in ("scene_analysis", "positioning_guidance"):
+            tool_cache.put(tool, INCIDENT["lat"], INCIDENT["lng"], f"Seeded {tool}.")
+
+    session = AgentSession(llm=stub_llm, tts=stub_tts)
+    audio = NullAudioOutput()
+    session.output.audio = audio
+    await session.start(VECTRAgent(incident_data=INCIDENT, tool_cache=tool_cache))
+
+    async def speak(instructions: str):
+        return session.generate_reply(instructions=instructions)
+
+    briefings = BriefingQueue(speak)
+    briefings.start()
+    try:
+        # Stagger crews so turns don't all land on the same tick.
+        await asyncio.sleep(rng.uniform(0, config.think_time))
+        for turn in range(config.turns):
+            await wait_until_quiet(session, briefings)
+            question = CREW_SCRIPT[turn % len(CREW_SCRIPT)]
+            audio.first_frame_at = None
+            speech_ended = time.perf_counter()
+            await asyncio.sleep(config.stt_delay)
+            try:
+                await session.run(user_input=question)
+            except Exception as e:
+                stats.errors += 1
+                logger.warning(f"Crew {index} turn {turn} failed: {e}")
+                continue
+            if audio.first_frame_at is not None:
+                stats.turns.append(audio.first_frame_at - speech_ended)
+
+            if config.packet_every and turn % config.packet_every == 0:
+                packet = DISPATCH_PACKETS[(turn // config.packet_every) % 3]
+                briefings.put_packet(packet)
+            await asyncio.sleep(config.think_time * rng.uniform(0.5, 1.5))
+    finally:
+        stats.packets_dropped += briefings.dropped
+        await briefings.aclose()
+        await session.aclose()
+        await stub_llm.aclose()
+        await stub_tts.aclose()
+
+
+async def run_load_test(
+    config: LoadConfig, slo: Optional[LatencySLO] = None
+) -> LoadReport:
+    slo = slo or LatencySLO()
+    stats = LoadStats()
+    with stubbed_scene_tools(config.tool_latency):
+        # One unmeasured session first, so lazy imports and one-time setup
+        # don't count as loop lag or per-session memory.
+        warmup = config.model_copy(update={"turns": 1, "think_time": 0.0})
+        await run_crew(-1, warmup, LoadStats())
+
+        monitor = RecordingLagMonitor()
+        baseline_rss = monitor.peak_rss
+        monitor.start()
+        try:
+            await asyncio.gather(
+                *(run_crew(index, config, stats) for index in range(config.sessions))
+            )
+        finally:
+            await monitor.aclose()
+
+    report = LoadReport(
+        config=config,
+        slo=slo,
+        turns=len(stats.turns),
+        turn_ms=summarize(stats.turns),
+        tool_calls=len(stats.tools),
+        tool_ms=summarize(stats.tools),
+        loop_lag_ms=summarize(monitor.samples),
+        loop_stalls=monitor.stalls,
+        memory_per_session_mb=round(
+            (monitor.peak_rss - baseline_rss) / config.sessions / 2**20, 2
+        ),
+        packets_dropped=stats.packets_dropped,
+        errors=stats.errors,
+        breaches=[],
+    )
+    report.breaches = check_slo(report, slo)
+    return report
+
+
+def check_slo(report: LoadReport, slo: LatencySLO) -> list[str]:
+    breaches = []
+    if report.turn_ms["p95"] > slo.turn_p95_ms:
+        breaches.append(f"turn p95 {report.turn_ms['p95']} ms > {slo.turn_p95_ms}")
+    if report.tool_ms["p95"] > slo.tool_p95_ms:
+        breaches.append(f"tool p95 {report.tool_ms['p95']} ms > {slo.tool_p95_ms}")
+    if report.loop_lag_ms["p95"] > slo.loop_lag_p95_ms:
+        breaches.append(
+            f"loop lag p95 {report.loop_lag_ms['p95']} ms > {slo.loop_lag_p95_ms}"
+        )
+    if report.loop_lag_ms["max"] > slo.loop_lag_max_ms:
+        breaches.append(
+            f"loop lag max {report.loop_lag_ms['max']} ms > {slo.loop_lag_max_ms}"
+        )
+    if report.memory_per_session_mb > slo.memory_per_session_mb:
+        breaches.append(
+            f"memory per session {report.memory_per_session_mb} MB "
+            f"> {slo.memory_per_session_mb}"
+        )
+    if report.errors:
+        breaches.append(f"{report.errors} turns failed")
+    return breaches
+
+
+def format_report(report: LoadReport) -> str:
+    lines = [
+        f"{report.config.sessions} sessions, {report.turns} turns, "
+        f"{report.tool_calls} tool calls",
+        f"turn latency ms      {report.turn_ms}",
+        f"tool-call latency ms {report.tool_ms}",
+        f"loop lag ms          {report.loop_lag_ms} ({report.loop_stalls} stalls)",
+        f"memory per session   {report.memory_per_session_mb} MB",
+        f"packets dropped      {report.packets_dropped}",
+    ]
+    if report.breaches:
+        lines.append("SLO BREACHED: " + "; ".join(report.breaches))
+    else:
+        lines.append("SLOs met")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    defaults, slo_defaults = LoadConfig(), LatencySLO()
+    parser.add_argument("--sessions", type=int, default=defaults.sessions)
+    parser.add_argument("--turns", type=int, default=defaults.turns)
+    parser.add_argument(
+        "--tool-latency",
+        type=float,
+        default=defaults.tool_latency,
+        help="Seconds a stubbed scene tool takes on a session-cache miss",
+    )
+    parser.add_argument("--llm-ttft", type=float, default=defaults.llm_ttft)
+    parser.add_argument("--tts-ttfb", type=float, default=defaults.tts_ttfb)
+    parser.add_argument("--think-time", type=float, default=defaults.think_time)
+    parser.add_argument(
+        "--cold", action="store_true", help="Don't seed the session tool caches"
+    )
+    parser.add_argument("--turn-p95-ms", type=float, default=slo_defaults.turn_p95_ms)
+    parser.add_argument("--tool-p95-ms", type=float, default=slo_defaults.tool_p95_ms)
+    parser.add_argument(
+        "--loop-lag-p95-ms", type=float, default=slo_defaults.loop_lag_p95_ms
+    )
+    parser.add_argument(
+        "--memory-per-session-mb",
+        type=float,
+        default=slo_defaults.memory_per_session_mb,
+    )
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    config = LoadConfig(
+        sessions=args.sessions,
+        turns=args.turns,
+        tool_latency=args.tool_latency,
+        llm_ttft=args.llm_ttft,
+        tts_ttfb=args.tts_ttfb,
+        think_time=args.think_time,
+        warm=not args.cold,
+    )
+    slo = LatencySLO(
+        turn_p95_ms=args.turn_p95_ms,
+        tool_p95_ms=args.tool_p95_ms,
+        loop_lag_p95_ms=args.loop_lag_p95_ms,
+        memory_per_session_mb=args.memory_per_session_mb,
+    )
+    report = asyncio.run(run_load_test(config, slo))
+    print(report.model_dump_json(indent=2) if args.json else format_report(report))
+    sys.exit(1 if report.breaches else 0)
+
+
+if __name__ == "__main__":
+    main()
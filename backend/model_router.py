@@ -0,0 +1,225 @@
+"""
+Model selection per task from a routing table.
+
+Every model call names its task and input size; urgency (a live incident vs
+a prefetch or prewarm) comes from the calling context. The first matching
+rule for the task picks a model. Call latency is recorded per model, and
+while a tier's p95 over the recent window is above its budget, calls fall
+back to the next faster tier. Once the slow tier's samples age out of the
+window it is tried again.
+
+The table is DEFAULT_ROUTES unless VECTR_MODEL_ROUTES holds a JSON table or
+the path to one:
+
+    {
+      "tiers": [{"model": "...", "p95_budget_ms": 8000}, ...],  # slowest first
+      "tasks": {"scene_analysis": [{"urgency": "prefetch", "model": "..."},
+                                   {"min_input_bytes": 400000, "model": "..."},
+                                   {"model": "..."}]}
+    }
+"""
+
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+logger = logging.getLogger("vectr-models")
+
+LIVE = "live"
+PREFETCH = "prefetch"
+
+GEMINI_FLASH = "gemini-2.5-flash"
+GEMINI_FLASH_LITE = "gemini-2.5-flash-lite"
+
+# Background work can afford the stronger model; live incidents get the
+# fastest one unless the input is large enough to need more.
+DEFAULT_ROUTES = {
+    "tiers": [
+        {"model": GEMINI_FLASH, "p95_budget_ms": 8000},
+        {"model": GEMINI_FLASH_LITE, "p95_budget_ms": 4000},
+    ],
+    "tasks": {
+        "scene_analysis": [
+            {"urgency": PREFETCH, "model": GEMINI_FLASH},
+            {"model": GEMINI_FLASH_LITE},
+        ],
+        "positioning_guidance": [
+            {"urgency": PREFETCH, "model": GEMINI_FLASH},
+            {"model": GEMINI_FLASH_LITE},
+        ],
+        # A 360-degree sweep is several images in one request.
+        "structured_positioning": [
+            {"urgency": PREFETCH, "model": GEMINI_FLASH},
+            {"min_input_bytes": 400_000, "model": GEMINI_FLASH},
+            {"model": GEMINI_FLASH_LITE},
+        ],
+        "ems_report": [
+            {"min_input_bytes": 8_000, "model": GEMINI_FLASH},
+            {"model": GEMINI_FLASH_LITE},
+        ],
+        "report_patch": [{"model": GEMINI_FLASH_LITE}],
+        "intake_report": [{"model": GEMINI_FLASH_LITE}],
+        "agent_llm": [{"model": "openai/gpt-5.2-chat-latest"}],
+        "agent_stt": [{"model": "assemblyai/universal-streaming:en"}],
+        "agent_tts": [
+            {"model": "cartesia/sonic-3:9626c31c-bec5-4cca-baa8-f8ba9e84c8bc"}
+        ],
+    },
+}
+
+current_urgency: ContextVar[str] = ContextVar("vectr_model_urgency", default=LIVE)
+
+
+@contextlib.contextmanager
+def model_urgency(urgency: str) -> Iterator[None]:
+    """Route model calls made in this context (and threads it spawns) as `urgency`."""
+    token = current_urgency.set(urgency)
+    try:
+        yield
+    finally:
+        current_urgency.reset(token)
+
+
+def load_routes(value: Optional[str]) -> dict:
+    """Parse VECTR_MODEL_ROUTES: inline JSON or a path to a JSON file."""
+    if not value:
+        return DEFAULT_ROUTES
+    if not value.lstrip().startswith("{"):
+        with open(value) as f:
+            value = f.read()
+    routes = json.loads(value)
+    for task, rules in routes.get("tasks", {}).items():
+        if not rules or any("model" not in rule for rule in rules):
+            raise ValueError(f"Every routing rule for {task} needs a model")
+    # Agent models are not tiered; keep the built-in ones unless overridden.
+    tasks = routes.setdefault("tasks", {})
+    for task in ("agent_llm", "agent_stt", "agent_tts"):
+        tasks.setdefault(task, DEFAULT_ROUTES["tasks"][task])
+    # The agent keys its TTS audio cache by the voice after the colon.
+    for rule in tasks["agent_tts"]:
+        if ":" not in rule["model"]:
+            raise ValueError(
+                f"agent_tts model {rule['model']!r} needs a ':<voice id>' suffix"
+            )
+    return routes
+
+
+class ModelRouter:
+    def __init__(
+        self,
+        routes: dict = DEFAULT_ROUTES,
+        window_seconds: float = 300,
+        min_samples: int = 10,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.tiers = [tier["model"] for tier in routes.get("tiers", [])]
+        self.budgets = {
+            tier["model"]: tier["p95_budget_ms"] / 1000
+            for tier in routes.get("tiers", [])
+        }
+        self.tasks: dict[str, list[dict]] = routes.get("tasks", {})
+        self.window_seconds = window_seconds
+        self.min_samples = min_samples
+        self.clock = clock
+        self.fallbacks = 0
+        self._latencies: dict[str, deque[tuple[float, float]]] = {}
+        self._lock = threading.Lock()
+
+    def preferred(
+        self, task: str, input_size: int = 0, urgency: Optional[str] = None
+    ) -> str:
+        """The model the table picks, before latency fallback."""
+        urgency = urgency or current_urgency.get()
+        for rule in self.tasks.get(task, ()):
+            if rule.get("urgency", urgency) != urgency:
+                continue
+            if input_size < rule.get("min_input_bytes", 0):
+                continue
+            if input_size > rule.get("max_input_bytes", input_size):
+                continue
+            return rule["model"]
+        if not self.tiers:
+            raise KeyError(f"No model route for task {task}")
+        return self.tiers[-1]
+
+    def route(
+        self, task: str, input_size: int = 0, urgency: Optional[str] = None
+    ) -> str:
+        model = self.preferred(task, input_size, urgency)
+        if model not in self.tiers:
+            return model
+        for candidate in self.tiers[self.tiers.index(model) :]:
+            if not self.over_budget(candidate):
+                if candidate != model:
+                    with self._lock:
+                        self.fallbacks += 1
+                    logger.info(
+                        f"{task}: {model} over its p95 budget, using {candidate}"
+                    )
+                return candidate
+        return self.tiers[-1]
+
+    def over_budget(self, model: str) -> bool:
+        p95 = self.p95(model)
+        return p95 is not None and p95 > self.budgets.get(model, float("inf"))
+
+    def record(self, model: str, seconds: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(model, deque(maxlen=200)).append(
+                (self.clock(), seconds)
+            )
+
+    def p95(self, model: str) -> Optional[float]:
+        """p95 latency over the window; None until there are enough samples."""
+        with self._lock:
+            return self._p95(model)
+
+    def _p95(self, model: str) -> Optional[float]:
+        """Call with the lock held; drops samples older than the window."""
+        samples = self._latencies.get(model)
+        if not samples:
+            return None
+        cutoff = self.clock() - self.window_seconds
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+        if len(samples) < self.min_samples:
+            return None
+        latencies = sorted(seconds for _, seconds in samples)
+        return latencies[int(0.95 * (len(latencies) - 1))]
+
+    @contextlib.contextmanager
+    def timed(self, model: str) -> Iterator[None]:
+        """Record how long the wrapped call took, failed calls included."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(model, time.monotonic() - started)
+
+    def stats(self) -> dict:
+        models = {}
+        with self._lock:
+            for model in set(self.tiers) | set(self._latencies):
+                p95 = self._p95(model)
+                models[model] = {
+                    "p95_ms": round(p95 * 1000) if p95 is not None else None,
+                    "budget_ms": round(self.budgets[model] * 1000)
+                    if model in self.budgets
+                    else None,
+                    "samples": len(self._latencies.get(model, ())),
+                }
+            return {"models": models, "fallbacks": self.fallbacks}
+
+
+model_router = ModelRouter(
+    load_routes(os.environ.get("VECTR_MODEL_ROUTES")),
+    window_seconds=float(os.environ.get("VECTR_MODEL_LATENCY_WINDOW_SECONDS", "300")),
+    min_samples=int(os.environ.get("VECTR_MODEL_LATENCY_MIN_SAMPLES", "10")),
+)
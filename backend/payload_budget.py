@@ -0,0 +1,214 @@
+"""
+Memory budget for large payloads: request bodies, intake audio and scene
+imagery on its way to Gemini.
+
+Every large buffer held while a request is in flight is reserved against a
+per-payload cap (VECTR_PAYLOAD_MAX_REQUEST_BYTES) and a process-wide cap
+(VECTR_PAYLOAD_MAX_GLOBAL_BYTES). Reservations that don't fit are rejected
+immediately rather than queued, so a burst of intakes gets 503s instead of
+OOM-killing the container: 413 when one payload is too large, 503 when the
+process is already holding its budget. Rejections are counted per kind.
+"""
+
+import binascii
+import json
+import logging
+import os
+import threading
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Optional
+
+logger = logging.getLogger("vectr-payloads")
+
+MAX_REQUEST_BYTES = int(
+    os.environ.get("VECTR_PAYLOAD_MAX_REQUEST_BYTES", str(16 * 1024 * 1024))
+)
+MAX_GLOBAL_BYTES = int(
+    os.environ.get("VECTR_PAYLOAD_MAX_GLOBAL_BYTES", str(128 * 1024 * 1024))
+)
+
+# Decode base64 audio in slices this large (a multiple of 4 characters).
+DECODE_CHUNK_CHARS = 256 * 1024
+
+
+class PayloadBudgetError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class PayloadBudget:
+    """
+    Byte reservations shared by the event loop and worker threads. Sizes are
+    what the caller will hold at once, not what it received on the wire.
+    """
+
+    def __init__(
+        self,
+        max_request_bytes: int = MAX_REQUEST_BYTES,
+        max_global_bytes: int = MAX_GLOBAL_BYTES,
+    ):
+        self.max_request_bytes = max_request_bytes
+        self.max_global_bytes = max_global_bytes
+        self.in_use = 0
+        self.peak = 0
+        self.admitted: Counter[str] = Counter()
+        self.rejected: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def acquire(self, nbytes: int, kind: str, total: Optional[int] = None) -> None:
+        """
+        Reserve `nbytes` or raise PayloadBudgetError. `total` is the payload's
+        full size when it is being reserved incrementally.
+        """
+        if (total if total is not None else nbytes) > self.max_request_bytes:
+            self._reject(kind, "too_large")
+            raise PayloadBudgetError(
+                413, f"{kind} payload exceeds {self.max_request_bytes} bytes"
+            )
+        with self._lock:
+            if self.in_use + nbytes > self.max_global_bytes:
+                over_budget = True
+            else:
+                over_budget = False
+                self.in_use += nbytes
+                self.peak = max(self.peak, self.in_use)
+                self.admitted[kind] += 1
+        if over_budget:
+            self._reject(kind, "over_budget")
+            raise PayloadBudgetError(503, "Server is busy with other payloads; retry")
+
+    def release(self, nbytes: int) -> None:
+        with self._lock:
+            self.in_use = max(0, self.in_use - nbytes)
+
+    @contextmanager
+    def reserve(self, nbytes: int, kind: str) -> Iterator[None]:
+        self.acquire(nbytes, kind)
+        try:
+            yield
+        finally:
+            self.release(nbytes)
+
+    def _reject(self, kind: str, reason: str) -> None:
+        self.rejected[f"{kind}:{reason}"] += 1
+        logger.warning(f"Rejected {kind} payload ({reason}); in use: {self.in_use}")
+
+    def stats(self) -> dict:
+        return {
+            "in_use": self.in_use,
+            "peak": self.peak,
+            "max_request_bytes": self.max_request_bytes,
+            "max_global_bytes": self.max_global_bytes,
+            "admitted": dict(self.admitted),
+            "rejected": dict(self.rejected),
+        }
+
+
+payload_budget = PayloadBudget()
+
+
+def encoded_size(nbytes: int) -> int:
+    """Size of `nbytes` once base64-encoded, as the Gemini request body holds it."""
+    return 4 * ((nbytes + 2) // 3)
+
+
+def decoded_size(b64: str) -> int:
+    return len(b64) * 3 // 4
+
+
+def iter_b64decode(b64: str, chunk_chars: int = DECODE_CHUNK_CHARS) -> Iterator[bytes]:
+    """
+    Decode base64 slice by slice so the full decoded payload never sits next
+    to the encoded one. Input with embedded whitespace can't be sliced on
+    4-character boundaries and is decoded in one go instead.
+    """
+    if any(c in b64 for c in " \t\r\n"):
+        yield binascii.a2b_base64(b64)
+        return
+    for start in range(0, len(b64), chunk_chars):
+        yield binascii.a2b_base64(b64[start : start + chunk_chars])
+
+
+def content_length(scope) -> Optional[int]:
+    for key, value in scope["headers"]:
+        if key == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+
+class PayloadLimitMiddleware:
+    """
+    Reserves request bodies against the budget before they are read: the
+    declared Content-Length up front, and chunked bodies as they arrive.
+    """
+
+    def __init__(self, app, budget: PayloadBudget = payload_budget):
+        self.app = app
+        self.budget = budget
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        reserved = 0
+        declared = content_length(scope)
+        if declared:
+            try:
+                self.budget.acquire(declared, "request_body")
+            except PayloadBudgetError as exc:
+                await send_rejection(send, exc)
+                return
+            reserved = declared
+
+        received = 0
+
+        async def counting_receive():
+            nonlocal received, reserved
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > reserved:
+                    try:
+                        self.budget.acquire(
+                            received - reserved, "request_body", total=received
+                        )
+                    except PayloadBudgetError as exc:
+                        # FastAPI turns anything but an HTTPException raised
+                        # while reading the body into a 400.
+                        from starlette.exceptions import HTTPException
+
+                        raise HTTPException(
+                            exc.status_code, exc.detail, rejection_headers(exc)
+                        ) from exc
+                    reserved = received
+            return message
+
+        try:
+            await self.app(scope, counting_receive, send)
+        finally:
+            self.budget.release(reserved)
+
+
+def rejection_headers(exc: PayloadBudgetError) -> dict[str, str]:
+    return {"Retry-After": "1"} if exc.status_code == 503 else {}
+
+
+async def send_rejection(send, exc: PayloadBudgetError) -> None:
+    body = json.dumps({"detail": exc.detail}).encode()
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+        *((k.lower().encode(), v.encode()) for k, v in rejection_headers(exc).items()),
+    ]
+    await send(
+        {"type": "http.response.start", "status": exc.status_code, "headers": headers}
+    )
+    await send({"type": "http.response.body", "body": body})
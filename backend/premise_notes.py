@@ -0,0 +1,247 @@
+"""
+Index of dispatcher premise notes (gate codes, dogs, stairs, ...).
+
+Notes are keyed by the same normalized address key the frontend writes to
+Firestore (see frontend/src/hooks/useNotes.js), bulk-loaded from an export
+(VECTR_NOTES_EXPORT) and updated incrementally through the API. Notes with
+coordinates are also indexed by geocell so notes filed under a slightly
+different address for the same building are found too.
+
+NotesIndex lives in one process. With a shared incident store
+(VECTR_INCIDENT_STORE=sqlite) every API worker uses a SharedNotesIndex on it,
+so a note posted to one worker is seen by all of them.
+"""
+
+import datetime
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+from scene_cache import geocell
+
+logger = logging.getLogger("vectr-notes")
+
+# ~11 m cells; lookups also check the 8 neighbouring cells.
+NOTES_GEOCELL_PRECISION = int(os.environ.get("VECTR_NOTES_GEOCELL_PRECISION", "4"))
+
+
+def normalize_address(address: Optional[str]) -> Optional[str]:
+    """Python port of normalizeAddress() in useNotes.js; keep them in sync."""
+    if not address:
+        return None
+    return re.sub(r"[^a-z0-9]+", "-", address.lower()).strip("-")
+
+
+def parse_timestamp(value: Any) -> float:
+    """Epoch seconds from a Firestore export timestamp in any common shape."""
+    if isinstance(value, (int, float)):
+        return float(value) / 1000 if value > 1e12 else float(value)
+    if isinstance(value, dict):
+        seconds = value.get("_seconds", value.get("seconds"))
+        if seconds is not None:
+            return float(seconds)
+    if isinstance(value, str):
+        try:
+            return datetime.datetime.fromisoformat(
+                value.replace("Z", "+00:00")
+            ).timestamp()
+        except ValueError:
+            pass
+    return 0.0
+
+
+class PremiseNote(BaseModel):
+    address: str
+    address_key: str
+    type: str = "general"
+    content: str
+    created_at: float = 0.0
+    created_by: str = "dispatch"
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    id: Optional[str] = None
+
+    @classmethod
+    def from_export(cls, doc: dict) -> Optional["PremiseNote"]:
+        """Build a note from a Firestore `notes` document; None if unusable."""
+        address = doc.get("address") or ""
+        key = doc.get("addressKey") or normalize_address(address)
+        content = (doc.get("content") or "").strip()
+        if not key or not content:
+            return None
+        return cls(
+            address=address,
+            address_key=key,
+            type=doc.get("type") or "general",
+            content=content,
+            created_at=parse_timestamp(doc.get("createdAt")),
+            created_by=doc.get("createdBy") or "dispatch",
+            lat=doc.get("lat"),
+            lng=doc.get("lng"),
+            id=doc.get("id"),
+        )
+
+
+def note_identity(note: PremiseNote) -> tuple:
+    """Firestore id when known, else the note's content; indexed only once."""
+    return (note.id,) if note.id else (note.address_key, note.type, note.content)
+
+
+class NotesIndex:
+    def __init__(self, precision: int = NOTES_GEOCELL_PRECISION):
+        self.precision = precision
+        self._by_key: dict[str, list[PremiseNote]] = {}
+        self._keys_by_cell: dict[str, set[str]] = {}
+        self._seen: set[tuple] = set()
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def add(self, note: PremiseNote) -> bool:
+        """Index a note; returns False if it is already indexed."""
+        if not self._insert(note):
+            return False
+        if note.lat is not None and note.lng is not None:
+            self.locate(note.address_key, note.lat, note.lng)
+        return True
+
+    def locate(self, address_key: str, lat: float, lng: float) -> None:
+        """Record where an address is, so nearby lookups can find its notes."""
+        self._locate_cell(address_key, geocell(lat, lng, self.precision))
+
+    def _insert(self, note: PremiseNote) -> bool:
+        identity = note_identity(note)
+        if identity in self._seen:
+            return False
+        self._seen.add(identity)
+        notes = self._by_key.setdefault(note.address_key, [])
+        notes.append(note)
+        notes.sort(key=lambda n: n.created_at, reverse=True)
+        return True
+
+    def _locate_cell(self, address_key: str, cell: str) -> None:
+        self._keys_by_cell.setdefault(cell, set()).add(address_key)
+
+    def _notes_for(self, address_key: str) -> list[PremiseNote]:
+        """Notes for one address, newest first."""
+        return list(self._by_key.get(address_key, []))
+
+    def _keys_in_cell(self, cell: str) -> set[str]:
+        return self._keys_by_cell.get(cell, set())
+
+    def load_export(self, path: str) -> int:
+        """Load a JSON array or NDJSON export of Firestore note documents."""
+        with open(path) as f:
+            text = f.read()
+        stripped = text.lstrip()
+        if stripped.startswith("["):
+            docs = json.loads(stripped)
+        else:
+            docs = [json.loads(line) for line in text.splitlines() if line.strip()]
+        added = 0
+        for doc in docs:
+            note = PremiseNote.from_export(doc)
+            if note is not None and self.add(note):
+                added += 1
+        return added
+
+    def _nearby_keys(self, lat: float, lng: float) -> set[str]:
+        step = 10**-self.precision
+        keys: set[str] = set()
+        for dlat in (-step, 0, step):
+            for dlng in (-step, 0, step):
+                keys |= self._keys_in_cell(
+                    geocell(lat + dlat, lng + dlng, self.precision)
+                )
+        return keys
+
+    def lookup(
+        self,
+        address: str,
+        lat: Optional[float] = None,
+        lng: Optional[float] = None,
+        limit: int = 10,
+    ) -> list[PremiseNote]:
+        """Notes for this address first, then for nearby addresses; newest first."""
+        key = normalize_address(address)
+        notes = self._notes_for(key) if key else []
+        if lat is not None and lng is not None:
+            nearby: list[PremiseNote] = []
+            for other in self._nearby_keys(lat, lng) - {key}:
+                nearby.extend(self._notes_for(other))
+            nearby.sort(key=lambda n: n.created_at, reverse=True)
+            notes.extend(nearby)
+        return notes[:limit]
+
+    def prompt_block(
+        self,
+        address: str,
+        lat: Optional[float] = None,
+        lng: Optional[float] = None,
+        limit: int = 10,
+    ) -> str:
+        """Premise notes formatted for the report prompt; empty if none."""
+        key = normalize_address(address)
+        lines = []
+        for note in self.lookup(address, lat, lng, limit):
+            where = "" if note.address_key == key else f" (at {note.address})"
+            when = (
+                time.strftime("%Y-%m-%d", time.gmtime(note.created_at))
+                if note.created_at
+                else "undated"
+            )
+            lines.append(f"- [{note.type}, {when}]{where} {note.content}")
+        return "\n".join(lines)
+
+
+class SharedNotesIndex(NotesIndex):
+    """Notes kept in a shared incident store, visible to every worker."""
+
+    def __init__(self, store, precision: int = NOTES_GEOCELL_PRECISION):
+        super().__init__(precision)
+        self.store = store
+
+    def __len__(self) -> int:
+        return self.store.count_notes()
+
+    def _insert(self, note: PremiseNote) -> bool:
+        return self.store.add_note(
+            json.dumps(note_identity(note)),
+            note.address_key,
+            note.created_at,
+            note.model_dump_json(),
+        )
+
+    def _locate_cell(self, address_key: str, cell: str) -> None:
+        self.store.locate_address(address_key, cell)
+
+    def _notes_for(self, address_key: str) -> list[PremiseNote]:
+        return [
+            PremiseNote.model_validate_json(note)
+            for note in self.store.notes_for(address_key)
+        ]
+
+    def _keys_in_cell(self, cell: str) -> set[str]:
+        return set(self.store.address_keys_in(cell))
+
+
+def create_notes_index(store=None) -> NotesIndex:
+    """
+    Build the index, on `store` when it is shared across workers, and
+    bulk-load VECTR_NOTES_EXPORT when set.
+    """
+    index = (
+        SharedNotesIndex(store) if store is not None and store.shared else NotesIndex()
+    )
+    path = os.environ.get("VECTR_NOTES_EXPORT")
+    if path:
+        try:
+            logger.info(f"Loaded {index.load_export(path)} premise notes from {path}")
+        except Exception as e:
+            logger.warning(f"Could not load premise notes from {path}: {e}")
+    return index
@@ -0,0 +1,228 @@
+"""
+Bulk pre-warm of scene intelligence for high-frequency addresses.
+
+Computes imagery and Gemini scene analyses for every row of a CSV and stores
+them in the shared on-disk scene cache, so the API serves them instantly at
+dispatch time. Point the API at the same directory via VECTR_SCENE_CACHE_DIR.
+
+CSV columns: address, lat, lng. Rows without coordinates are geocoded.
+Use the address exactly as the dispatcher UI submits it (the Places
+formatted address), since analyses are cached per address.
+
+With VECTR_INCIDENT_STORE=sqlite, results go to the shared incident store
+(VECTR_INCIDENT_DB) instead of the cache directory.
+
+Usage:
+    python prewarm.py hot_addresses.csv --cache-dir .scene-cache
+    python prewarm.py hot_addresses.csv --refresh-interval 3600
+"""
+
+import argparse
+import asyncio
+import csv
+import logging
+import os
+import time
+from typing import Optional
+
+import requests
+
+from incident_store import create_incident_store
+from model_router import PREFETCH, model_urgency
+from scene_cache import geocell
+from scene_intel import (
+    DEFAULT_PREFETCH_TARGETS,
+    GOOGLE_MAPS_API_KEY,
+    PREFETCH_GETTERS,
+    PREFETCH_TARGETS,
+    scene_cache,
+)
+
+logger = logging.getLogger("vectr-prewarm")
+
+
+class RatePacer:
+    """
+    Spaces upstream work to a fixed rate and backs off when a quota is hit.
+    """
+
+    def __init__(self, rate_per_second: float):
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def backoff(self, seconds: float) -> None:
+        self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+
+def is_quota_error(exc: BaseException) -> bool:
+    """Best-effort detection of upstream rate limiting anywhere in the cause chain."""
+    while exc is not None:
+        text = str(exc)
+        if "429" in text or "RESOURCE_EXHAUSTED" in text or "quota" in text.lower():
+            return True
+        exc = exc.__cause__
+    return False
+
+
+def geocode_address(address: str) -> tuple[float, float]:
+    if not GOOGLE_MAPS_API_KEY:
+        raise RuntimeError("GOOGLE_MAPS_API_KEY is required to geocode addresses")
+    response = requests.get(
+        "https://maps.googleapis.com/maps/api/geocode/json",
+        params={"address": address, "key": GOOGLE_MAPS_API_KEY},
+        timeout=30,
+    )
+    response.raise_for_status()
+    results = response.json().get("results") or []
+    if not results:
+        raise RuntimeError(f"No geocoding result for {address!r}")
+    location = results[0]["geometry"]["location"]
+    return location["lat"], location["lng"]
+
+
+def load_locations(path: str) -> list[dict]:
+    locations = []
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            address = (row.get("address") or "").strip()
+            lat, lng = (row.get("lat") or "").strip(), (row.get("lng") or "").strip()
+            if lat and lng:
+                locations.append(
+                    {"address": address, "lat": float(lat), "lng": float(lng)}
+                )
+                continue
+            if not address:
+                continue
+            try:
+                lat_value, lng_value = geocode_address(address)
+            except Exception as e:
+                logger.warning(f"Skipping {address!r}: {e}")
+                continue
+            locations.append({"address": address, "lat": lat_value, "lng": lng_value})
+    return locations
+
+
+async def warm_target(
+    location: dict,
+    target: str,
+    pacer: RatePacer,
+    max_age: float,
+    retries: int = 3,
+) -> str:
+    address, lat, lng = location["address"], location["lat"], location["lng"]
+    if scene_cache.get((target, geocell(lat, lng), address), max_age) is not None:
+        return "fresh"
+
+    for attempt in range(retries + 1):
+        await pacer.wait()
+        try:
+            with model_urgency(PREFETCH):
+                await PREFETCH_GETTERS[target](address, lat, lng, max_age=max_age)
+            return "warmed"
+        except Exception as e:
+            if not is_quota_error(e) or attempt == retries:
+                logger.warning(f"{target} failed for {address!r}: {e}")
+                return "failed"
+            backoff = 2 ** (attempt + 1)
+            logger.info(f"Quota hit on {target}, backing off {backoff}s")
+            pacer.backoff(backoff)
+    return "failed"
+
+
+async def prewarm(
+    locations: list[dict],
+    targets: list[str],
+    concurrency: int = 4,
+    rate_per_second: float = 2.0,
+    max_age: float = 24 * 3600,
+) -> dict[str, int]:
+    """Warm every (location, target) pair; returns counts per outcome."""
+    pacer = RatePacer(rate_per_second)
+    slots = asyncio.Semaphore(concurrency)
+    summary = {"fresh": 0, "warmed": 0, "failed": 0}
+
+    async def run(location: dict, target: str) -> None:
+        async with slots:
+            outcome = await warm_target(location, target, pacer, max_age)
+        summary[outcome] += 1
+
+    await asyncio.gather(
+        *(run(location, target) for location in locations for target in targets)
+    )
+    return summary
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("csv_path", help="CSV with address, lat, lng columns")
+    parser.add_argument(
+        "--cache-dir",
+        default=os.environ.get("VECTR_SCENE_CACHE_DIR", ".scene-cache"),
+        help="Shared scene cache directory (same as the API's VECTR_SCENE_CACHE_DIR)",
+    )
+    parser.add_argument(
+        "--targets",
+        nargs="+",
+        choices=PREFETCH_TARGETS,
+        default=list(DEFAULT_PREFETCH_TARGETS),
+    )
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--rate", type=float, default=2.0, help="Upstream analyses started per second"
+    )
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=24 * 3600,
+        help="Recompute entries older than this many seconds",
+    )
+    parser.add_argument(
+        "--refresh-interval",
+        type=float,
+        default=0,
+        help="Keep running and re-check every N seconds (0 = run once)",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    # Set before enabling the store, which purges entries past the TTL.
+    if args.max_age > scene_cache.disk_ttl_seconds:
+        scene_cache.disk_ttl_seconds = args.max_age
+    store = create_incident_store()
+    if store.shared:
+        scene_cache.enable_store(store)
+    else:
+        scene_cache.enable_disk(args.cache_dir)
+
+    while True:
+        locations = load_locations(args.csv_path)
+        started = time.monotonic()
+        summary = asyncio.run(
+            prewarm(
+                locations,
+                args.targets,
+                concurrency=args.concurrency,
+                rate_per_second=args.rate,
+                max_age=args.max_age,
+            )
+        )
+        logger.info(
+            f"Prewarmed {len(locations)} locations in "
+            f"{time.monotonic() - started:.1f}s: {summary}"
+        )
+        if args.refresh_interval <= 0:
+            break
+        time.sleep(args.refresh_interval)
+
+
+if __name__ == "__main__":
+    main()
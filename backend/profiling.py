@@ -0,0 +1,247 @@
+"""
+Opt-in sampling profiler for API requests and agent sessions.
+
+A background thread samples every thread's Python stack at a fixed interval
+and aggregates them into folded stacks ("frame;frame;frame count"), the
+input format of flamegraph.pl, speedscope and inferno. Three profiles are
+written per run:
+
+- wall: every sample
+- cpu: samples where the thread used CPU since the previous sample
+- blocking: event-loop thread samples taken while the loop missed its
+  heartbeat, i.e. the stacks that were blocking it
+
+Nothing runs unless a profile is started, so the disabled cost is a header
+check per request. Only one profile runs per process at a time.
+"""
+
+import asyncio
+import hmac
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger("vectr-profiling")
+
+PROFILE_DIR = os.environ.get("VECTR_PROFILE_DIR", ".vectr/profiles")
+PROFILE_INTERVAL = float(os.environ.get("VECTR_PROFILE_INTERVAL_MS", "5")) / 1000
+PROFILE_MAX_SECONDS = float(os.environ.get("VECTR_PROFILE_MAX_SECONDS", "120"))
+BLOCK_THRESHOLD = float(os.environ.get("VECTR_PROFILE_BLOCK_MS", "50")) / 1000
+
+PROFILE_HEADER = "x-vectr-profile"
+PROFILE_ID_HEADER = "x-vectr-profile-id"
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return (
+        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+
+
+def fold_stack(frame, root: str) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    labels.append(root)
+    return ";".join(reversed(labels)).replace("\n", " ")
+
+
+def thread_cpu_time(ident: int) -> Optional[float]:
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError):
+        return None
+
+
+class SamplingProfiler:
+    def __init__(
+        self,
+        label: str,
+        out_dir: str = PROFILE_DIR,
+        interval: float = PROFILE_INTERVAL,
+        max_seconds: float = PROFILE_MAX_SECONDS,
+        block_threshold: float = BLOCK_THRESHOLD,
+    ):
+        self.label = label
+        self.out_dir = Path(out_dir)
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.block_threshold = block_threshold
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", label).strip("-")
+        self.profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}"
+        self.wall: Counter[str] = Counter()
+        self.cpu: Counter[str] = Counter()
+        self.blocking: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_ident: Optional[int] = None
+        self._last_beat = 0.0
+        self._cpu_times: dict[int, float] = {}
+
+    def start(self) -> None:
+        """Start sampling; call from the event-loop thread to track blocking."""
+        try:
+            self._loop = asyncio.get_running_loop()
+            self._loop_ident = threading.get_ident()
+            self._beat()
+        except RuntimeError:
+            self._loop = None
+        self._thread = threading.Thread(
+            target=self._run, name="vectr-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def _beat(self) -> None:
+        self._last_beat = time.monotonic()
+        if not self._stop.is_set() and self._loop is not None:
+            self._loop.call_later(self.block_threshold / 2, self._beat)
+
+    def _run(self) -> None:
+        deadline = time.monotonic() + self.max_seconds
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            if time.monotonic() > deadline:
+                logger.warning(f"Profile {self.profile_id} hit its time cap")
+                break
+            self._sample(own_ident)
+
+    def _sample(self, own_ident: int) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        blocked = (
+            self._loop is not None
+            and time.monotonic() - self._last_beat > self.block_threshold
+        )
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            stack = fold_stack(frame, names.get(ident, f"thread-{ident}"))
+            self.wall[stack] += 1
+            cpu_time = thread_cpu_time(ident)
+            if cpu_time is not None:
+                if cpu_time > self._cpu_times.get(ident, cpu_time):
+                    self.cpu[stack] += 1
+                self._cpu_times[ident] = cpu_time
+            if blocked and ident == self._loop_ident:
+                self.blocking[stack] += 1
+
+    def stop(self) -> dict[str, str]:
+        """Stop sampling and write the folded profiles; returns kind -> path."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        paths = {}
+        for kind, counts in (
+            ("wall", self.wall),
+            ("cpu", self.cpu),
+            ("blocking", self.blocking),
+        ):
+            if not counts:
+                continue
+            path = self.out_dir / f"{self.profile_id}.{kind}.folded"
+            path.write_text(
+                "".join(f"{stack} {count}\n" for stack, count in counts.items())
+            )
+            paths[kind] = str(path)
+        logger.info(f"Profile {self.profile_id} written: {sorted(paths)}")
+        return paths
+
+
+_active: Optional[SamplingProfiler] = None
+_active_lock = threading.Lock()
+
+
+def start_profile(label: str, **kwargs) -> Optional[SamplingProfiler]:
+    """Start a profile unless one is already running in this process."""
+    global _active
+    with _active_lock:
+        if _active is not None:
+            return None
+        _active = SamplingProfiler(label, **kwargs)
+    _active.start()
+    return _active
+
+
+def stop_profile(profiler: SamplingProfiler) -> dict[str, str]:
+    global _active
+    try:
+        return profiler.stop()
+    finally:
+        with _active_lock:
+            if _active is profiler:
+                _active = None
+
+
+def active_profile() -> Optional[SamplingProfiler]:
+    return _active
+
+
+def token_matches(token: Optional[str], presented: Optional[str]) -> bool:
+    return (
+        bool(token) and presented is not None and hmac.compare_digest(token, presented)
+    )
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a request when it carries `X-Vectr-Profile: <token>` matching
+    VECTR_PROFILE_TOKEN. The profile id is returned in X-Vectr-Profile-Id.
+    Admin endpoints use the same header for authorization and manage
+    profiles themselves, so they are never profiled.
+    """
+
+    def __init__(
+        self,
+        app,
+        token: Optional[str] = None,
+        out_dir: str = PROFILE_DIR,
+        exempt_prefix: str = "/admin/",
+    ):
+        self.app = app
+        self.token = token
+        self.out_dir = out_dir
+        self.exempt_prefix = exempt_prefix
+        self._header = PROFILE_HEADER.encode()
+
+    async def __call__(self, scope, receive, send) -> None:
+        if (
+            not self.token
+            or scope["type"] != "http"
+            or scope["path"].startswith(self.exempt_prefix)
+        ):
+            await self.app(scope, receive, send)
+            return
+        presented = next(
+            (v.decode() for k, v in scope["headers"] if k == self._header), None
+        )
+        if not token_matches(self.token, presented):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = start_profile(
+            f"{scope['method']} {scope['path']}", out_dir=self.out_dir
+        )
+        profile_id = profiler.profile_id if profiler else "busy"
+
+        async def send_with_profile_id(message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (PROFILE_ID_HEADER.encode(), profile_id.encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            if profiler is not None:
+                await asyncio.to_thread(stop_profile, profiler)
@@ -0,0 +1,301 @@
+"""
+In-process cache for scene imagery and analysis results.
+
+Entries are keyed by a snapped coordinate cell so the same location typed in
+the address bar, prefetched, and later dispatched hits one entry. Concurrent
+requests for a key that is still being computed share a single upstream call.
+
+An optional shared tier lets separate processes, such as the prewarm job and
+API workers, share results: files in a directory (VECTR_SCENE_CACHE_DIR) or
+an incident store (see incident_store.py). Keys are tuples of
+(kind, geocell, ...); the geocell is indexed by the store. Shared entries are
+a JSON header line followed by the raw payload (imagery bytes, text or a
+registered model's JSON), never pickles: other processes can write them.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Hashable
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+# 5 decimal places is ~1.1 m, well inside geocoding jitter for one address.
+GEOCELL_PRECISION = int(os.environ.get("VECTR_GEOCELL_PRECISION", "5"))
+
+logger = logging.getLogger("vectr-scene-cache")
+
+# How often writes also sweep expired entries out of an incident store.
+STORE_PURGE_INTERVAL = 3600
+
+
+def geocell(lat: float, lng: float, precision: int = GEOCELL_PRECISION) -> str:
+    """Snap coordinates to a fixed-precision cell id."""
+    return f"{lat:.{precision}f},{lng:.{precision}f}"
+
+
+def distance_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in meters (haversine)."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = (
+        math.sin(dphi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    )
+    return 2 * 6371000 * math.asin(math.sqrt(a))
+
+
+# Pydantic models that may be stored in the shared tier, by class name.
+CACHE_MODELS: dict[str, type] = {}
+
+
+def cache_model(cls: type) -> type:
+    """Class decorator allowing a pydantic model's values in the shared tier."""
+    CACHE_MODELS[cls.__name__] = cls
+    return cls
+
+
+def encode_entry(key: Hashable, stored_at: float, value: Any) -> bytes:
+    if isinstance(value, bytes):
+        kind, payload = "bytes", value
+    elif isinstance(value, str):
+        kind, payload = "text", value.encode()
+    elif type(value).__name__ in CACHE_MODELS:
+        kind = f"model:{type(value).__name__}"
+        payload = value.model_dump_json().encode()
+    else:
+        kind, payload = "json", json.dumps(value).encode()
+    header = json.dumps({"key": repr(key), "stored_at": stored_at, "kind": kind})
+    return header.encode() + b"\n" + payload
+
+
+def decode_entry(data: bytes) -> tuple[str, float, Any]:
+    """Return (key repr, stored_at, value) for an encoded entry."""
+    header, _, payload = data.partition(b"\n")
+    meta = json.loads(header)
+    kind = meta["kind"]
+    if kind == "bytes":
+        value = payload
+    elif kind == "text":
+        value = payload.decode()
+    elif kind == "json":
+        value = json.loads(payload)
+    elif kind.startswith("model:") and kind[6:] in CACHE_MODELS:
+        value = CACHE_MODELS[kind[6:]].model_validate_json(payload)
+    else:
+        raise ValueError(f"Unknown entry kind {kind!r}")
+    return meta["key"], meta["stored_at"], value
+
+
+class SceneCache:
+    """
+    TTL + LRU cache with in-flight de-duplication.
+
+    Values are produced by async compute callables; blocking upstream calls
+    (requests, Gemini) should be pushed to a worker thread by the caller.
+    Failures are never cached.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 900,
+        max_entries: int = 512,
+        disk_dir: Optional[str] = None,
+        disk_ttl_seconds: float = 7 * 24 * 3600,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.disk_ttl_seconds = disk_ttl_seconds
+        self.disk_dir: Optional[Path] = None
+        self.store = None
+        self._purged_at = 0.0
+        # key -> (expires_at, stored_at, value)
+        self._entries: OrderedDict[Hashable, tuple[float, float, Any]] = OrderedDict()
+        # key -> (priority, future)
+        self._inflight: dict[Hashable, tuple[int, asyncio.Future]] = {}
+        self.hits = 0
+        self.misses = 0
+        if disk_dir:
+            self.enable_disk(disk_dir)
+
+    def enable_disk(self, disk_dir: str) -> None:
+        self.disk_dir = Path(disk_dir)
+        self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    def enable_store(self, store) -> None:
+        """Use an incident store as the shared tier instead of files."""
+        self.store = store
+        self._purge_store()
+
+    def _purge_store(self) -> None:
+        """Drop shared entries past disk_ttl_seconds."""
+        self._purged_at = time.time()
+        try:
+            purged = self.store.purge_cache(self._purged_at - self.disk_ttl_seconds)
+        except Exception as e:
+            logger.warning(f"Could not purge shared scene cache: {e}")
+            return
+        if purged:
+            logger.info(f"Purged {purged} expired shared scene cache entries")
+
+    @property
+    def shared(self) -> bool:
+        return self.disk_dir is not None or self.store is not None
+
+    def get(self, key: Hashable, max_age: Optional[float] = None) -> Optional[Any]:
+        entry = self.get_entry(key, max_age)
+        return entry[1] if entry else None
+
+    def get_entry(
+        self, key: Hashable, max_age: Optional[float] = None
+    ) -> Optional[tuple[float, Any]]:
+        """Return (stored_at, value) if the key is fresh enough, else None."""
+        now = time.time()
+        max_age = float("inf") if max_age is None else max_age
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, stored_at, value = entry
+            if now < expires_at and now - stored_at <= max_age:
+                self._entries.move_to_end(key)
+                return stored_at, value
+            del self._entries[key]
+
+        disk_entry = self._read_disk(key)
+        if disk_entry is None:
+            return None
+        stored_at, value = disk_entry
+        if now - stored_at > min(self.disk_ttl_seconds, max_age):
+            return None
+        self._remember(key, stored_at, value)
+        return disk_entry
+
+    def set(self, key: Hashable, value: Any) -> None:
+        stored_at = time.time()
+        self._remember(key, stored_at, value)
+        self._write_disk(key, stored_at, value)
+
+    def _remember(self, key: Hashable, stored_at: float, value: Any) -> None:
+        expires_at = time.time() + self.ttl_seconds
+        if self.shared:
+            expires_at = min(expires_at, stored_at + self.disk_ttl_seconds)
+        self._entries[key] = (expires_at, stored_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_path(self, key: Hashable) -> Path:
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return self.disk_dir / digest[:2] / f"{digest}.entry"
+
+    def _read_disk(self, key: Hashable) -> Optional[tuple[float, Any]]:
+        if self.store is None and self.disk_dir is None:
+            return None
+        try:
+            if self.store is not None:
+                data = self.store.cache_get(repr(key))
+                if data is None:
+                    return None
+            else:
+                with open(self._disk_path(key), "rb") as f:
+                    data = f.read()
+            stored_key, stored_at, value = decode_entry(data)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Unreadable scene cache entry for {key}: {e}")
+            return None
+        return (stored_at, value) if stored_key == repr(key) else None
+
+    def _write_disk(self, key: Hashable, stored_at: float, value: Any) -> None:
+        if self.store is not None:
+            cell = key[1] if isinstance(key, tuple) and len(key) > 1 else None
+            try:
+                self.store.cache_set(
+                    repr(key), cell, stored_at, encode_entry(key, stored_at, value)
+                )
+            except Exception as e:
+                logger.warning(f"Could not share scene cache entry for {key}: {e}")
+            if time.time() - self._purged_at > STORE_PURGE_INTERVAL:
+                self._purge_store()
+            return
+        if self.disk_dir is None:
+            return
+        path = self._disk_path(key)
+        try:
+            data = encode_entry(key, stored_at, value)
+            path.parent.mkdir(exist_ok=True)
+            # Write then rename so readers in other processes never see a partial file.
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not persist scene cache entry for {key}: {e}")
+
+    def contains(self, key: Hashable) -> bool:
+        return self.get(key) is not None or key in self._inflight
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+        should_cache: Optional[Callable[[Any], bool]] = None,
+        max_age: Optional[float] = None,
+        priority: int = 0,
+    ) -> Any:
+        """
+        Cached value for key, else a shared in-flight computation. Callers
+        never wait on a computation started at a lower priority (e.g. a live
+        incident on a prefetch running a slower model); they start their own.
+        """
+        value = self.get(key, max_age)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is None or inflight[0] < priority:
+            self.misses += 1
+            future = asyncio.ensure_future(self._compute(key, compute, should_cache))
+            # Nobody may be left awaiting a failed call; don't warn about it.
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._inflight[key] = (priority, future)
+        else:
+            self.hits += 1
+            future = inflight[1]
+
+        # Shield so one cancelled caller (e.g. an aborted prefetch) does not
+        # cancel the upstream call other callers are waiting on.
+        return await asyncio.shield(future)
+
+    async def _compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+        should_cache: Optional[Callable[[Any], bool]],
+    ) -> Any:
+        try:
+            value = await compute()
+            if should_cache is None or should_cache(value):
+                self.set(key, value)
+            return value
+        finally:
+            inflight = self._inflight.get(key)
+            # A higher-priority computation may have taken over the key.
+            if inflight is not None and inflight[1] is asyncio.current_task():
+                del self._inflight[key]
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,547 @@
+"""
+Scene intelligence shared by the API (voice.py), the agent worker and the
+prewarm job: imagery fetch, Gemini scene analyses, text compression and the
+scene cache in front of them.
+
+Kept deliberately lean: heavy SDKs (requests, google-genai) are imported on
+first use and nothing here depends on FastAPI, so agent worker processes
+don't pay for the web stack at spawn time.
+"""
+
+import asyncio
+import functools
+import json
+import os
+from typing import Optional
+
+from dotenv import load_dotenv
+from pydantic import BaseModel
+
+from model_router import LIVE, current_urgency, model_router
+from payload_budget import encoded_size, payload_budget
+from scene_cache import SceneCache, cache_model, geocell
+
+load_dotenv()
+
+
+TOKEN_COMPANY_API_KEY = os.environ.get("TOKEN_COMPANY_API_KEY")
+GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
+GEMINI_API_KEY = GOOGLE_API_KEY
+WISPR_API_KEY = os.environ.get("WISPR_API_KEY")
+GOOGLE_MAPS_API_KEY = os.environ.get("GOOGLE_MAPS_API_KEY") or os.environ.get(
+    "VITE_GOOGLE_MAPS_API_KEY"
+)
+
+
+class UpstreamError(Exception):
+    """
+    An upstream service failed or is not configured. Carries the HTTP status
+    the API should answer with; voice.py maps it onto an HTTP response.
+    """
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+    def __str__(self) -> str:
+        return f"{self.status_code}: {self.detail}"
+
+
+@functools.lru_cache(maxsize=4)
+def gemini_client(api_key: str):
+    """Shared Gemini client; the SDK is only imported when first needed."""
+    from google import genai
+
+    return genai.Client(api_key=api_key)
+
+
+def image_part(image: bytes, mime_type: str):
+    """
+    Inline image part wrapping `image` without copying it. The SDK base64s
+    the bytes once, when it serializes the request; handing it a base64
+    string instead would make it decode that back into a second copy.
+    """
+    from google.genai import types
+
+    return types.Part.from_bytes(data=image, mime_type=mime_type)
+
+
+scene_cache = SceneCache(
+    ttl_seconds=float(os.environ.get("VECTR_SCENE_CACHE_TTL_SECONDS", "900")),
+    max_entries=int(os.environ.get("VECTR_SCENE_CACHE_MAX_ENTRIES", "512")),
+    disk_dir=os.environ.get("VECTR_SCENE_CACHE_DIR"),
+    disk_ttl_seconds=float(
+        os.environ.get("VECTR_SCENE_CACHE_DISK_TTL_SECONDS", str(7 * 24 * 3600))
+    ),
+)
+
+
+def compress_text_with_token_company(text: str, aggressiveness: float) -> str:
+    import requests
+
+    if not TOKEN_COMPANY_API_KEY:
+        raise UpstreamError(
+            status_code=500, detail="TOKEN_COMPANY_API_KEY is not configured"
+        )
+
+    url = "https://api.thetokencompany.com/v1/compress"
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {TOKEN_COMPANY_API_KEY}",
+    }
+    payload = {
+        "model": "bear-1",
+        "compression_settings": {
+            "aggressiveness": aggressiveness,
+            "max_output_tokens": None,
+            "min_output_tokens": None,
+        },
+        "input": text,
+    }
+
+    try:
+        response = requests.post(url, headers=headers, json=payload, timeout=30)
+    except requests.RequestException as exc:
+        raise UpstreamError(
+            status_code=502, detail="Error calling compression service"
+        ) from exc
+
+    if response.status_code != 200:
+        raise UpstreamError(
+            status_code=502, detail="Compression service returned an error"
+        )
+
+    data = response.json()
+    output = data.get("output")
+    if not isinstance(output, str):
+        raise UpstreamError(
+            status_code=502, detail="Invalid response from compression service"
+        )
+
+    return output
+
+
+def fetch_static_satellite_image(lat: float, lng: float) -> bytes:
+    import requests
+
+    api_key = GOOGLE_MAPS_API_KEY
+    if not api_key:
+        raise UpstreamError(
+            status_code=500, detail="GOOGLE_MAPS_API_KEY is not configured"
+        )
+    url = (
+        "https://maps.googleapis.com/maps/api/staticmap"
+        f"?center={lat},{lng}&zoom=19&size=640x640&maptype=satellite&key={api_key}"
+    )
+    try:
+        response = requests.get(url, timeout=30)
+    except requests.RequestException as exc:
+        raise UpstreamError(
+            status_code=502, detail="Error fetching static map image"
+        ) from exc
+    if response.status_code != 200:
+        raise UpstreamError(status_code=502, detail="Failed to fetch static map image")
+    return response.content
+
+
+def fetch_street_view_image(
+    lat: float, lng: float, heading: Optional[int] = None, fov: int = 120
+) -> bytes:
+    """
+    Fetch street view image for positioning analysis.
+    Without a heading, the camera points at the location.
+    """
+    import requests
+
+    api_key = GOOGLE_MAPS_API_KEY
+    if not api_key:
+        raise UpstreamError(
+            status_code=500, detail="GOOGLE_MAPS_API_KEY is not configured"
+        )
+    url = (
+        "https://maps.googleapis.com/maps/api/streetview"
+        f"?size=640x480&location={lat},{lng}&fov={fov}&key={api_key}"
+    )
+    if heading is not None:
+        url += f"&heading={heading}"
+    try:
+        response = requests.get(url, timeout=30)
+    except requests.RequestException as exc:
+        raise UpstreamError(
+            status_code=502, detail="Error fetching street view image"
+        ) from exc
+    if response.status_code != 200:
+        raise UpstreamError(status_code=502, detail="Failed to fetch street view image")
+    return response.content
+
+
+def analyze_scene_with_gemini(
+    address: str, lat: float, lng: float, image_bytes: bytes
+) -> str:
+    if not GEMINI_API_KEY:
+        raise UpstreamError(status_code=500, detail="GEMINI_API_KEY is not configured")
+
+    # Pass API key explicitly
+    client = gemini_client(GEMINI_API_KEY)
+
+    prompt = (
+        "You are helping Emergency Medical Services (EMS). "
+        f"Address: {address}. "
+        f"Coordinates: {lat}, {lng}. "
+        "Analyze this satellite image and identify:\n"
+        "- Best approach route for emergency vehicles\n"
+        "- Parking locations for ambulances and fire apparatus\n"
+        "- Potential hazards that could affect access or safety\n"
+        "- Likely building access points and entrances\n"
+        "- Yard or driveway obstacles that may slow access\n"
+        "Respond with concise, tactical bullet-style guidance."
+    )
+    contents = [{"parts": [{"text": prompt}, image_part(image_bytes, "image/png")]}]
+    model = model_router.route("scene_analysis", len(image_bytes))
+    with payload_budget.reserve(encoded_size(len(image_bytes)), "satellite_image"):
+        try:
+            with model_router.timed(model):
+                response = client.models.generate_content(
+                    model=model,
+                    contents=contents,
+                )
+        except Exception as exc:
+            raise UpstreamError(
+                status_code=502, detail="Error calling Gemini API"
+            ) from exc
+    text = getattr(response, "text", None)
+    if callable(text):
+        text = response.text()
+    if not isinstance(text, str) or not text.strip():
+        raise UpstreamError(status_code=502, detail="Invalid response from Gemini API")
+    return text
+
+
+def generate_positioning_guidance(
+    address: str, lat: float, lng: float, street_view_bytes: bytes
+) -> str:
+    """Analyze street view to provide ambulance positioning guidance."""
+    if not GEMINI_API_KEY:
+        raise UpstreamError(status_code=500, detail="GEMINI_API_KEY is not configured")
+
+    client = gemini_client(GEMINI_API_KEY)
+
+    prompt = (
+        "You are an EMS positioning expert helping ambulance crews. "
+        f"Address: {address}. "
+        "Analyze this street-level view and provide specific ambulance positioning guidance:\n\n"
+        "1. OPTIMAL PARKING POSITION:\n"
+        "   - Exactly where should the ambulance stop (e.g., 'Park 20ft past the driveway on the right')\n"
+        "   - Which direction should it face for fastest departure\n"
+        "   - Distance from the likely patient pickup point\n\n"
+        "2. STRETCHER PATH:\n"
+        "   - Best route from ambulance to building entrance\n"
+        "   - Surface conditions (grass, concrete, gravel, stairs)\n"
+        "   - Width constraints for stretcher navigation\n\n"
+        "3. EGRESS STRATEGY:\n"
+        "   - Recommended departure direction\n"
+        "   - Turn-around options if needed\n"
+        "   - Traffic/visibility concerns for pulling out\n\n"
+        "4. VISUAL MARKERS:\n"
+        "   - Key landmarks to identify the exact location\n"
+        "   - House numbers, mailboxes, distinctive features\n\n"
+        "Be SPECIFIC with distances and directions. Use clock positions (12 o'clock = straight ahead) "
+        "and cardinal directions. Keep it concise - crews read this while driving."
+    )
+
+    contents = [
+        {"parts": [{"text": prompt}, image_part(street_view_bytes, "image/jpeg")]}
+    ]
+    reserved = encoded_size(len(street_view_bytes))
+    model = model_router.route("positioning_guidance", len(street_view_bytes))
+    with payload_budget.reserve(reserved, "street_view_image"):
+        try:
+            with model_router.timed(model):
+                response = client.models.generate_content(
+                    model=model,
+                    contents=contents,
+                )
+        except Exception as exc:
+            raise UpstreamError(
+                status_code=502, detail="Error calling Gemini API for positioning"
+            ) from exc
+
+    text = getattr(response, "text", None)
+    if callable(text):
+        text = response.text()
+    if not isinstance(text, str) or not text.strip():
+        raise UpstreamError(status_code=502, detail="Invalid response from Gemini API")
+    return text
+
+
+class StructuredPOI(BaseModel):
+    type: str
+    description: str
+    heading: int
+    priority: int
+
+
+@cache_model
+class StructuredPositioningResponse(BaseModel):
+    pois: list[StructuredPOI]
+    recommended_heading: int
+    approach_heading: int
+    raw_guidance: str
+
+
+def generate_structured_positioning(
+    address: str,
+    lat: float,
+    lng: float,
+    street_view_bytes: Optional[bytes] = None,
+    frames: Optional[list[tuple[int, bytes]]] = None,
+) -> StructuredPositioningResponse:
+    """
+    Structured POIs and headings from street view. Pass either a single
+    image or a sweep of (camera heading, image) frames; with a sweep, POI
+    headings are anchored to the known heading of the frame they appear in.
+    """
+    if not GEMINI_API_KEY:
+        raise UpstreamError(status_code=500, detail="GEMINI_API_KEY not configured")
+
+    client = gemini_client(GEMINI_API_KEY)
+
+    sweep_instructions = ""
+    if frames:
+        fov = sweep_fov(len(frames))
+        if fov * len(frames) >= 360:
+            coverage = "forming a 360-degree sweep"
+        else:
+            coverage = (
+                f"covering {fov * len(frames)} of 360 degrees (objects between "
+                "frames are not visible)"
+            )
+        sweep_instructions = (
+            f"You are given {len(frames)} frames {coverage} from the "
+            f"same camera position, each with a {fov}-degree field of view and "
+            "labeled with its camera heading (the compass direction of the frame "
+            "center). Compute each heading as the frame heading plus the object's "
+            f"offset from the frame center (left edge = -{fov // 2}, right edge = "
+            f"+{fov // 2}), normalized to 0-359.\n"
+        )
+
+    prompt = f"""You are analyzing a street view for EMS ambulance positioning at {address}.
+
+CRITICAL: Respond ONLY with valid JSON matching this exact schema:
+{{
+  "pois": [
+    {{
+      "type": "entrance|parking|hazard|approach",
+      "description": "brief description",
+      "heading": 0-360,
+      "priority": 1-5
+    }}
+  ],
+  "recommended_heading": 0-360,
+  "approach_heading": 0-360,
+  "raw_guidance": "2-3 sentence summary for display"
+}}
+
+Heading is compass direction from camera position (0=North, 90=East, 180=South, 270=West).
+{sweep_instructions}Analyze:
+1. Where should the ambulance park? (recommended_heading = direction truck faces)
+2. Where is the main entrance? (POI with type "entrance")
+3. Best approach direction? (approach_heading)
+4. Any hazards to flag? (POI with type "hazard")
+
+Return ONLY the JSON, no markdown, no explanation."""
+
+    if frames:
+        parts = [{"text": prompt}]
+        for heading, frame_bytes in frames:
+            parts.append({"text": f"Frame: camera heading {heading} degrees."})
+            parts.append(image_part(frame_bytes, "image/jpeg"))
+        image_size = sum(len(frame_bytes) for _, frame_bytes in frames)
+    else:
+        parts = [{"text": prompt}, image_part(street_view_bytes, "image/jpeg")]
+        image_size = len(street_view_bytes)
+    contents = [{"parts": parts}]
+
+    # A rejection is not an in-band analysis failure; keep it outside the try.
+    model = model_router.route("structured_positioning", image_size)
+    with payload_budget.reserve(encoded_size(image_size), "street_view_image"):
+        try:
+            with model_router.timed(model):
+                response = client.models.generate_content(
+                    model=model,
+                    contents=contents,
+                )
+            text = response.text if hasattr(response, "text") else str(response)
+
+            text = text.strip()
+            if text.startswith("```"):
+                text = text.split("\n", 1)[1].rsplit("```", 1)[0]
+
+            data = json.loads(text)
+            return StructuredPositioningResponse(
+                pois=[StructuredPOI(**p) for p in data.get("pois", [])],
+                recommended_heading=data.get("recommended_heading", 0),
+                approach_heading=data.get("approach_heading", 0),
+                raw_guidance=data.get("raw_guidance", ""),
+            )
+        except Exception as e:
+            return StructuredPositioningResponse(
+                pois=[],
+                recommended_heading=0,
+                approach_heading=0,
+                raw_guidance=f"Analysis unavailable: {str(e)}",
+            )
+
+
+async def get_satellite_image(
+    lat: float, lng: float, max_age: Optional[float] = None
+) -> bytes:
+    async def compute() -> bytes:
+        return await asyncio.to_thread(fetch_static_satellite_image, lat, lng)
+
+    return await scene_cache.get_or_compute(
+        ("satellite", geocell(lat, lng)), compute, max_age=max_age
+    )
+
+
+async def get_street_view_image(
+    lat: float, lng: float, max_age: Optional[float] = None
+) -> bytes:
+    async def compute() -> bytes:
+        return await asyncio.to_thread(fetch_street_view_image, lat, lng)
+
+    return await scene_cache.get_or_compute(
+        ("street_view", geocell(lat, lng)), compute, max_age=max_age
+    )
+
+
+STREET_VIEW_SWEEP_HEADINGS = tuple(
+    int(h)
+    for h in os.environ.get("VECTR_STREET_VIEW_SWEEP_HEADINGS", "0,90,180,270").split(
+        ","
+    )
+)
+
+
+def sweep_fov(frame_count: int) -> int:
+    """
+    Per-frame fov of a sweep. Street View caps fov at 120, so fewer than 3
+    frames leave gaps instead of covering 360 degrees.
+    """
+    return min(120, 360 // frame_count)
+
+
+async def get_street_view_sweep(
+    lat: float, lng: float, max_age: Optional[float] = None
+) -> list[tuple[int, bytes]]:
+    """
+    Fetch a street view sweep, one cached frame per heading, with all frames
+    requested concurrently.
+    """
+    fov = sweep_fov(len(STREET_VIEW_SWEEP_HEADINGS))
+
+    async def frame(heading: int) -> tuple[int, bytes]:
+        async def compute() -> bytes:
+            return await asyncio.to_thread(
+                fetch_street_view_image, lat, lng, heading, fov
+            )
+
+        image = await scene_cache.get_or_compute(
+            ("street_view", geocell(lat, lng), heading, fov), compute, max_age=max_age
+        )
+        return heading, image
+
+    return list(
+        await asyncio.gather(
+            *(frame(heading) for heading in STREET_VIEW_SWEEP_HEADINGS)
+        )
+    )
+
+
+def analysis_priority() -> int:
+    """Live calls don't join an in-flight prefetch running a slower model."""
+    return 1 if current_urgency.get() == LIVE else 0
+
+
+async def get_scene_analysis(
+    address: str, lat: float, lng: float, max_age: Optional[float] = None
+) -> str:
+    """Cached satellite scene analysis; shares imagery with other analyses."""
+
+    async def compute() -> str:
+        satellite_bytes = await get_satellite_image(lat, lng, max_age)
+        return await asyncio.to_thread(
+            analyze_scene_with_gemini, address, lat, lng, satellite_bytes
+        )
+
+    return await scene_cache.get_or_compute(
+        ("scene_analysis", geocell(lat, lng), address),
+        compute,
+        max_age=max_age,
+        priority=analysis_priority(),
+    )
+
+
+async def get_positioning_guidance(
+    address: str, lat: float, lng: float, max_age: Optional[float] = None
+) -> str:
+    async def compute() -> str:
+        street_view_bytes = await get_street_view_image(lat, lng, max_age)
+        return await asyncio.to_thread(
+            generate_positioning_guidance, address, lat, lng, street_view_bytes
+        )
+
+    return await scene_cache.get_or_compute(
+        ("positioning_guidance", geocell(lat, lng), address),
+        compute,
+        max_age=max_age,
+        priority=analysis_priority(),
+    )
+
+
+async def get_structured_positioning(
+    address: str,
+    lat: float,
+    lng: float,
+    max_age: Optional[float] = None,
+    sweep: bool = False,
+) -> "StructuredPositioningResponse":
+    async def compute() -> StructuredPositioningResponse:
+        if sweep:
+            frames = await get_street_view_sweep(lat, lng, max_age)
+            return await asyncio.to_thread(
+                generate_structured_positioning, address, lat, lng, frames=frames
+            )
+        street_view_bytes = await get_street_view_image(lat, lng, max_age)
+        return await asyncio.to_thread(
+            generate_structured_positioning, address, lat, lng, street_view_bytes
+        )
+
+    kind = "structured_positioning_sweep" if sweep else "structured_positioning"
+    # generate_structured_positioning reports failures in-band; don't keep those.
+    return await scene_cache.get_or_compute(
+        (kind, geocell(lat, lng), address),
+        compute,
+        should_cache=lambda result: bool(result.pois),
+        max_age=max_age,
+        priority=analysis_priority(),
+    )
+
+
+PREFETCH_TARGETS = (
+    "scene_analysis",
+    "positioning_guidance",
+    "structured_positioning",
+    "structured_positioning_sweep",
+)
+DEFAULT_PREFETCH_TARGETS = PREFETCH_TARGETS[:3]
+
+PREFETCH_GETTERS = {
+    "scene_analysis": get_scene_analysis,
+    "positioning_guidance": get_positioning_guidance,
+    "structured_positioning": get_structured_positioning,
+    "structured_positioning_sweep": functools.partial(
+        get_structured_positioning, sweep=True
+    ),
+}
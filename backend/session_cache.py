@@ -0,0 +1,55 @@
+"""
+Per-session cache of agent tool results.
+
+Crews ask about approach and parking over and over, and the LLM re-invokes
+the scene tools each time with the same or slightly different coordinates
+(rounded, truncated or jittered floats). Results are matched by distance
+rather than by exact coordinates, so a repeat question within `radius_m` of
+an earlier answer is served from memory instead of refetching imagery and
+rerunning Gemini. Sessions seed it with the incident's full-length intel so
+the first tool call is already warm.
+"""
+
+import os
+import time
+from typing import Callable, Optional
+
+from scene_cache import distance_m
+
+SESSION_TOOL_TTL = float(os.environ.get("VECTR_SESSION_TOOL_TTL_SECONDS", "300"))
+SESSION_TOOL_RADIUS_M = float(os.environ.get("VECTR_SESSION_TOOL_RADIUS_M", "50"))
+
+
+class SessionToolCache:
+    def __init__(
+        self,
+        ttl_seconds: float = SESSION_TOOL_TTL,
+        radius_m: float = SESSION_TOOL_RADIUS_M,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.radius_m = radius_m
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        # tool -> [(lat, lng, stored_at, value)], newest last; a session only
+        # ever sees a handful of locations, so lookups are a linear scan.
+        self._entries: dict[str, list[tuple[float, float, float, str]]] = {}
+
+    def get(self, tool: str, lat: float, lng: float) -> Optional[str]:
+        now = self.clock()
+        entries = [
+            entry
+            for entry in self._entries.get(tool, [])
+            if now - entry[2] < self.ttl_seconds
+        ]
+        self._entries[tool] = entries
+        for entry_lat, entry_lng, _, value in reversed(entries):
+            if distance_m(lat, lng, entry_lat, entry_lng) <= self.radius_m:
+                self.hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, tool: str, lat: float, lng: float, value: str) -> None:
+        self._entries.setdefault(tool, []).append((lat, lng, self.clock(), value))
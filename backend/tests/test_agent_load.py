@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+from loadtest import LatencySLO, LoadConfig, check_slo, percentile, run_load_test
+
+# Kept small so it runs with the unit tests; scale up with loadtest.py.
+LOAD_SESSIONS = int(os.environ.get("VECTR_LOADTEST_SESSIONS", "8"))
+
+FAST_STUBS = {
+    "stt_delay": 0.02,
+    "llm_ttft": 0.05,
+    "token_interval": 0.005,
+    "tts_ttfb": 0.02,
+    "tool_latency": 0.3,
+    "think_time": 0.1,
+}
+
+
+def test_percentile() -> None:
+    samples = [i / 100 for i in range(1, 101)]
+    assert percentile(samples, 50) == 0.5
+    assert percentile(samples, 95) == 0.95
+    assert percentile([], 95) == 0.0
+
+
+async def test_concurrent_sessions_complete_every_turn() -> None:
+    config = LoadConfig(sessions=LOAD_SESSIONS, turns=4, warm=False, **FAST_STUBS)
+
+    report = await run_load_test(config)
+
+    assert report.errors == 0
+    assert report.turns == LOAD_SESSIONS * 4
+    assert report.tool_calls == LOAD_SESSIONS * 4
+    # Cold sessions fetch each tool once; the repeat hazards question is
+    # answered from the session cache.
+    assert report.tool_ms["p50"] < config.tool_latency * 1000
+
+
+@pytest.mark.load
+async def test_concurrent_sessions_meet_latency_slos() -> None:
+    config = LoadConfig(sessions=LOAD_SESSIONS, turns=4, **FAST_STUBS)
+    slo = LatencySLO(turn_p95_ms=1500, tool_p95_ms=1000)
+
+    report = await run_load_test(config, slo)
+
+    assert report.errors == 0
+    assert report.breaches == [], report.breaches
+
+
+async def test_reports_breaches() -> None:
+    config = LoadConfig(sessions=2, turns=1, **FAST_STUBS)
+    report = await run_load_test(config, LatencySLO(turn_p95_ms=1))
+
+    assert report.breaches
+    assert report.breaches == check_slo(report, LatencySLO(turn_p95_ms=1))
+    assert report.breaches[0].startswith("turn p95")
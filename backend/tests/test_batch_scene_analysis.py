@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+import voice
+from scene_intel import UpstreamError
+
+LOCATIONS = [
+    {"id": "a", "address": "1 Main St", "lat": 37.774900, "lng": -122.419400},
+    {"id": "b", "address": "1 Main St Apt 2", "lat": 37.7749001, "lng": -122.4194},
+    {"id": "c", "address": "9 Oak St", "lat": 37.774990, "lng": -122.419400},
+    {"id": "d", "address": "500 Pine St", "lat": 37.790000, "lng": -122.400000},
+]
+
+
+def test_cluster_locations_groups_only_same_cell() -> None:
+    locations = [voice.BatchSceneLocation(**location) for location in LOCATIONS]
+
+    # c is ~10 m from a: close, but a different spot for street view.
+    assert voice.cluster_locations(locations) == [0, 0, 2, 3]
+
+
+def test_batch_streams_ndjson_with_per_location_errors(monkeypatch) -> None:
+    analyzed = []
+
+    async def fake_analyze(address, lat, lng, sweep=False):
+        analyzed.append((address, lat, lng))
+        if address == "9 Oak St":
+            raise UpstreamError(status_code=502, detail="Error calling Gemini API")
+        if address == "500 Pine St":
+            await asyncio.sleep(0.05)
+        return voice.SceneAnalysisResponse(
+            analysis=f"Stage at {address}", positioning_guidance="Park north."
+        )
+
+    monkeypatch.setattr(voice, "analyze_location", fake_analyze)
+
+    response = TestClient(voice.app).post(
+        "/ems/scene-analysis/batch", json={"locations": LOCATIONS}
+    )
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 4
+    assert lines[-1]["id"] == "d"  # Completion order, not request order.
+    by_id = {line["id"]: line for line in lines}
+    assert by_id["a"]["status"] == "ok"
+    assert by_id["a"]["result"]["analysis"] == "Stage at 1 Main St"
+    assert by_id["b"]["shared_imagery_with"] == 0
+    assert by_id["a"]["shared_imagery_with"] is None
+    assert by_id["c"] == {
+        "index": 2,
+        "id": "c",
+        "shared_imagery_with": None,
+        "status": "error",
+        "error": "Error calling Gemini API",
+    }
+    # Each location is analyzed at its own coordinates.
+    assert sorted(analyzed) == sorted(
+        (location["address"], location["lat"], location["lng"])
+        for location in LOCATIONS
+    )
+
+
+def test_batch_rejects_empty_and_oversized_requests(monkeypatch) -> None:
+    client = TestClient(voice.app)
+    monkeypatch.setattr(voice, "BATCH_MAX_LOCATIONS", 2)
+
+    assert (
+        client.post("/ems/scene-analysis/batch", json={"locations": []}).status_code
+        == 400
+    )
+    assert (
+        client.post(
+            "/ems/scene-analysis/batch", json={"locations": LOCATIONS}
+        ).status_code
+        == 400
+    )
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from briefing_queue import BriefingQueue
+
+
+class FakeSpeech:
+    """Stands in for a SpeechHandle: awaitable until played out or interrupted."""
+
+    def __init__(self, instructions: str):
+        self.instructions = instructions
+        self.interrupted = False
+        self._done = asyncio.Event()
+
+    def interrupt(self, force: bool = False) -> "FakeSpeech":
+        self.interrupted = True
+        self._done.set()
+        return self
+
+    def finish(self) -> None:
+        self._done.set()
+
+    def __await__(self):
+        return self._done.wait().__await__()
+
+
+@pytest.fixture
+def spoken() -> list[FakeSpeech]:
+    return []
+
+
+@pytest.fixture
+async def queue(spoken):
+    async def speak(instructions: str) -> FakeSpeech:
+        speech = FakeSpeech(instructions)
+        spoken.append(speech)
+        return speech
+
+    async def say(text: str) -> FakeSpeech:
+        return await speak(f"VERBATIM {text}")
+
+    briefings = BriefingQueue(speak, say=say)
+    briefings.start()
+    yield briefings
+    await briefings.aclose()
+
+
+async def _settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_pending_scene_updates_are_coalesced(queue, spoken) -> None:
+    queue.put_packet({"type": "tactical_briefing", "briefing": "Gate code 1234"})
+    await _settle()
+    for summary in ("Second patient found", "Power lines down", "PD on scene"):
+        queue.put_packet({"type": "scene_update", "data": {"summary": summary}})
+
+    spoken[0].finish()
+    await _settle()
+
+    assert len(spoken) == 2
+    assert "Power lines down" in spoken[1].instructions
+    assert "PD on scene" in spoken[1].instructions
+    assert queue.coalesced == 2
+
+
+@pytest.mark.asyncio
+async def test_urgent_briefing_interrupts_and_jumps_queue(queue, spoken) -> None:
+    queue.put_packet({"type": "scene_update", "data": {"summary": "Road clear"}})
+    await _settle()
+    queue.put_packet({"type": "tactical_briefing", "briefing": "Routine note"})
+    queue.put_packet(
+        {"type": "tactical_briefing", "briefing": "Shots fired, stage", "urgent": True}
+    )
+    await _settle()
+
+    assert spoken[0].interrupted
+    assert "Shots fired" in spoken[1].instructions
+    spoken[1].finish()
+    await _settle()
+    assert "Routine note" in spoken[2].instructions
+
+
+@pytest.mark.asyncio
+async def test_verbatim_briefing_bypasses_llm(queue, spoken) -> None:
+    queue.put_packet(
+        {"type": "tactical_briefing", "briefing": "Use north gate", "verbatim": True}
+    )
+    await _settle()
+
+    assert spoken[0].instructions == "VERBATIM Use north gate"
+
+
+@pytest.mark.asyncio
+async def test_full_queue_sheds_lowest_priority(spoken) -> None:
+    async def speak(instructions: str) -> FakeSpeech:
+        return FakeSpeech(instructions)
+
+    briefings = BriefingQueue(speak, maxsize=1)
+    briefings.put_packet({"type": "scene_update", "data": {"summary": "Minor"}})
+    briefings.put_packet({"type": "tactical_briefing", "briefing": "Important"})
+
+    assert len(briefings) == 1
+    assert briefings.dropped == 1
+    await briefings.aclose()
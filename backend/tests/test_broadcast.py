@@ -0,0 +1,66 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import voice
+
+
+class FakeRoomService:
+    def __init__(self, rooms, failing=(), delay=0.05):
+        self.rooms = rooms
+        self.failing = set(failing)
+        self.delay = delay
+        self.sent = []
+
+    async def list_rooms(self, request):
+        return SimpleNamespace(rooms=self.rooms)
+
+    async def send_data(self, request):
+        await asyncio.sleep(self.delay)
+        if request.room in self.failing:
+            raise RuntimeError("room gone")
+        self.sent.append(request.room)
+
+
+@pytest.fixture
+def fake_livekit(monkeypatch):
+    rooms = [
+        SimpleNamespace(name=f"incident-{i}", num_participants=1) for i in range(50)
+    ]
+    rooms.append(SimpleNamespace(name="incident-empty", num_participants=0))
+    rooms.append(SimpleNamespace(name="training-1", num_participants=3))
+    service = FakeRoomService(rooms, failing={"incident-7"})
+    monkeypatch.setattr(voice, "get_livekit_api", lambda: SimpleNamespace(room=service))
+    return service
+
+
+def test_broadcast_fans_out_concurrently(fake_livekit) -> None:
+    client = TestClient(voice.app)
+    started = time.monotonic()
+    response = client.post(
+        "/incident/broadcast", json={"briefing_text": "I-5 closed northbound"}
+    )
+    elapsed = time.monotonic() - started
+
+    body = response.json()
+    assert response.status_code == 200
+    assert body["sent"] == 49 and body["failed"] == 1
+    assert "training-1" not in fake_livekit.sent
+    assert "incident-empty" not in fake_livekit.sent
+    failed = [r for r in body["results"] if r["status"] == "failed"]
+    assert [r["room"] for r in failed] == ["incident-7"]
+    # 50 sends of 50 ms each would take 2.5 s sequentially.
+    assert elapsed < 1.0
+
+
+def test_broadcast_to_explicit_rooms(fake_livekit) -> None:
+    client = TestClient(voice.app)
+    response = client.post(
+        "/incident/broadcast",
+        json={"briefing_text": "Diversion", "rooms": ["training-1", "training-1"]},
+    )
+    assert response.json()["sent"] == 1
+    assert fake_livekit.sent == ["training-1"]
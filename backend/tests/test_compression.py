@@ -0,0 +1,77 @@
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+import voice
+from compression import CompressionMiddleware, prefers_brotli
+from scene_intel import StructuredPositioningResponse
+
+
+def make_client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/big")
+    def big():
+        return PlainTextResponse("hazard " * 500)
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("ok")
+
+    return TestClient(app)
+
+
+def test_prefers_brotli() -> None:
+    assert prefers_brotli("gzip, deflate, br")
+    assert not prefers_brotli("gzip, br;q=0.5")
+    assert not prefers_brotli("gzip")
+
+
+def test_negotiates_encoding_above_threshold() -> None:
+    client = make_client()
+    br = client.get("/big", headers={"Accept-Encoding": "gzip, br"})
+    gz = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    small = client.get("/small", headers={"Accept-Encoding": "gzip, br"})
+
+    assert br.headers["content-encoding"] == "br"
+    assert gz.headers["content-encoding"] == "gzip"
+    assert br.text == gz.text == "hazard " * 500
+    assert "content-encoding" not in small.headers
+
+
+def test_scene_analysis_revalidates_with_etag(monkeypatch) -> None:
+    async def fake_analysis(address, lat, lng, max_age=None):
+        return "Stage north of the building."
+
+    async def fake_positioning(address, lat, lng, max_age=None, sweep=False):
+        return StructuredPositioningResponse(
+            pois=[], recommended_heading=90, approach_heading=180, raw_guidance="ok"
+        )
+
+    monkeypatch.setattr(voice, "get_scene_analysis", fake_analysis)
+    monkeypatch.setattr(voice, "get_structured_positioning", fake_positioning)
+    client = TestClient(voice.app)
+    params = {"lat": 37.77, "lng": -122.42, "address": "1 Main St"}
+
+    first = client.get("/ems/scene-analysis", params=params)
+    assert first.status_code == 200
+    assert first.json()["recommended_heading"] == 90
+    etag = first.headers["etag"]
+    # Compression may re-encode the body, so the validator must be weak.
+    assert etag.startswith('W/"')
+
+    again = client.get(
+        "/ems/scene-analysis", params=params, headers={"If-None-Match": etag}
+    )
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+    assert (
+        client.get(
+            "/ems/scene-analysis",
+            params=params,
+            headers={"If-None-Match": etag.removeprefix("W/")},
+        ).status_code
+        == 304
+    )
@@ -0,0 +1,200 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+import voice
+from ems_reports import (
+    IncidentReport,
+    ReportStore,
+    notes_delta,
+    split_report_sections,
+)
+from premise_notes import NotesIndex, PremiseNote
+
+REPORT = """**TACTICAL SCENE REPORT**
+
+**1. SITUATION / CHIEF COMPLAINT:** Adult male, chest pain.
+**2. PATIENT DETAILS**
+- 60s, conscious
+3. ACCESS & STAGING
+Stage on Main St, front entrance.
+4. HAZARDS & SCENE SAFETY
+None visible.
+5. MECHANISM / HISTORY
+Unknown.
+6. DISPATCH INFO
+123 Main St."""
+
+
+def test_split_report_sections() -> None:
+    preamble, sections = split_report_sections(REPORT)
+    assert preamble == "**TACTICAL SCENE REPORT**"
+    assert sections["1"] == "Adult male, chest pain."
+    assert sections["2"] == "- 60s, conscious"
+    assert list(sections) == ["1", "2", "3", "4", "5", "6"]
+
+
+def test_numbered_lists_in_a_section_are_not_headers() -> None:
+    _, sections = split_report_sections(
+        "1. SITUATION / CHIEF COMPLAINT\nFall from ladder.\n"
+        "2. Patient Details\n3. Left leg deformity\n4. Scalp laceration\n"
+        "3) ACCESS & STAGING: Driveway\n"
+        "**4. HAZARDS & SCENE SAFETY**\nLoose dog."
+    )
+    assert sections == {
+        "1": "Fall from ladder.",
+        "2": "3. Left leg deformity\n4. Scalp laceration",
+        "3": "Driveway",
+        "4": "Loose dog.",
+    }
+
+
+def test_report_store_evicts_locks_with_reports() -> None:
+    store = ReportStore(max_entries=2)
+    for incident_id in ("1", "2", "3"):
+        store.put(IncidentReport(incident_id=incident_id, address="1 Main St"))
+        store.lock(incident_id)
+
+    assert voice.report_store.backend is None
+    assert store.get("1") is None
+    assert set(store._locks) == {"2", "3"}
+
+
+def test_notes_delta() -> None:
+    assert notes_delta("chest pain", "chest pain\ndog on scene") == "dog on scene"
+    assert notes_delta("a\nb", "b\nc\na") == "c"
+    assert notes_delta("same", "same") == ""
+
+
+def test_note_update_patches_only_changed_sections(monkeypatch) -> None:
+    preamble, sections = split_report_sections(REPORT)
+    voice.report_store.put(
+        IncidentReport(
+            incident_id="42",
+            address="123 Main St",
+            caller_notes="chest pain",
+            preamble=preamble,
+            sections=sections,
+        )
+    )
+    notes = NotesIndex()
+    notes.add(
+        PremiseNote(
+            address="123 Main St", address_key="123-main-st", content="Gate 4411"
+        )
+    )
+    monkeypatch.setattr(voice, "notes_index", notes)
+    deltas = []
+    premise = []
+
+    def fake_patch(report, delta, premise_notes=""):
+        deltas.append(delta)
+        premise.append(premise_notes)
+        return {"4": "Aggressive dog in yard."}
+
+    sent = []
+
+    async def send_data(request):
+        await asyncio.sleep(0)
+        sent.append(request)
+
+    monkeypatch.setattr(voice, "patch_report_sections", fake_patch)
+    monkeypatch.setattr(
+        voice,
+        "get_livekit_api",
+        lambda: SimpleNamespace(room=SimpleNamespace(send_data=send_data)),
+    )
+
+    client = TestClient(voice.app)
+    body = client.post(
+        "/incident/42/notes",
+        json={"caller_notes": "dog on scene", "append": True},
+    ).json()
+
+    assert deltas == ["dog on scene"]
+    assert "Gate 4411" in premise[0]
+    assert body["version"] == 2
+    assert body["changed_sections"] == {"4": "Aggressive dog in yard."}
+    assert "Stage on Main St" in body["ems_report"]
+    assert body["delivered"] is True
+    packet = json.loads(sent[0].data)
+    assert sent[0].room == "incident-42"
+    assert packet["type"] == "scene_update"
+    assert "HAZARDS" in packet["data"]["summary"]
+
+    # Re-sending the same notes is a no-op.
+    body = client.post(
+        "/incident/42/notes",
+        json={"caller_notes": "chest pain\ndog on scene"},
+    ).json()
+    assert body["version"] == 2 and body["changed_sections"] == {}
+    assert len(deltas) == 1
+
+
+def test_note_update_for_unknown_incident() -> None:
+    client = TestClient(voice.app)
+    response = client.post("/incident/missing/notes", json={"caller_notes": "x"})
+    assert response.status_code == 404
+
+
+def test_note_update_retries_when_another_worker_writes(monkeypatch) -> None:
+    preamble, sections = split_report_sections(REPORT)
+    voice.report_store.put(
+        IncidentReport(
+            incident_id="43",
+            address="123 Main St",
+            caller_notes="chest pain",
+            preamble=preamble,
+            sections=sections,
+        )
+    )
+    deltas = []
+
+    def fake_patch(report, delta, premise_notes=""):
+        deltas.append(delta)
+        if len(deltas) == 1:
+            # Another worker appends notes while the model is running.
+            voice.report_store.put(
+                report.model_copy(update={"caller_notes": "chest pain\nfall"})
+            )
+        return {"4": f"Update: {delta}"}
+
+    monkeypatch.setattr(voice, "patch_report_sections", fake_patch)
+    monkeypatch.setattr(voice, "get_livekit_api", lambda: None)
+
+    body = (
+        TestClient(voice.app)
+        .post("/incident/43/notes", json={"caller_notes": "dog", "append": True})
+        .json()
+    )
+
+    assert deltas == ["dog", "dog"]
+    assert voice.report_store.get("43").caller_notes == "chest pain\nfall\ndog"
+    assert body["changed_sections"] == {"4": "Update: dog"}
+
+
+def test_generated_report_keeps_notes_that_arrived_meanwhile(monkeypatch) -> None:
+    payload = voice.CreateIncidentRequest(
+        incident_id="44", address="123 Main St", lat=0, lng=0, caller_notes="chest pain"
+    )
+    voice.remember_report(payload, "", "", "")
+    voice.report_store.put(
+        voice.report_store.get("44").model_copy(
+            update={"caller_notes": "chest pain\ndog on scene"}
+        )
+    )
+    monkeypatch.setattr(
+        voice,
+        "patch_report_sections",
+        lambda report, delta, premise_notes="": {"4": delta},
+    )
+
+    asyncio.run(voice.store_generated_report(payload, "scene", "positioning", REPORT))
+
+    report = voice.report_store.get("44")
+    assert report.caller_notes == "chest pain\ndog on scene"
+    assert report.scene_analysis == "scene"
+    assert report.sections["3"] == "Stage on Main St, front entrance."
+    assert report.sections["4"] == "dog on scene"
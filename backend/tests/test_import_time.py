@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+IMPORT_BUDGET_MS = float(os.environ.get("VECTR_IMPORT_BUDGET_MS", "1500"))
+
+
+def import_profile(module: str) -> dict[str, int]:
+    """Import `module` in a fresh interpreter; return cumulative us per module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            profile[name.strip()] = int(cumulative)
+    return profile
+
+
+def test_scene_intel_stays_lean() -> None:
+    profile = import_profile("scene_intel")
+    for heavy in ("fastapi", "starlette", "google.genai", "requests"):
+        assert heavy not in profile, f"scene_intel imports {heavy} eagerly"
+    assert profile["scene_intel"] / 1000 < IMPORT_BUDGET_MS
+
+
+def test_agent_does_not_import_the_api() -> None:
+    profile = import_profile("agent")
+    assert "voice" not in profile
+    assert "fastapi" not in profile
@@ -0,0 +1,91 @@
+import pickle
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from ems_reports import IncidentReport
+from incident_store import SQLiteIncidentStore
+from scene_cache import SceneCache, geocell
+
+
+def make_report(incident_id: str, lat: float = 37.7749, lng: float = -122.4194):
+    return IncidentReport(
+        incident_id=incident_id,
+        address="1 Main St",
+        lat=lat,
+        lng=lng,
+        sections={"1": "Chest pain."},
+    )
+
+
+def test_store_is_shared_between_connections(tmp_path) -> None:
+    path = tmp_path / "incidents.db"
+    writer, reader = SQLiteIncidentStore(path), SQLiteIncidentStore(path)
+
+    writer.save_report(make_report("a"))
+    writer.save_report(make_report("b", lat=40.0, lng=-70.0))
+    writer.save_stage("a", "scene_analysis", "Stage north.")
+
+    assert reader.get_report("a").sections == {"1": "Chest pain."}
+    assert reader.get_report("missing") is None
+    assert [
+        r.incident_id for r in reader.reports_in_cell(geocell(37.7749, -122.4194))
+    ] == ["a"]
+    assert reader.get_stages("a") == {"scene_analysis": "Stage north."}
+    mode = sqlite3.connect(path).execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+
+
+@pytest.mark.asyncio
+async def test_scene_cache_shares_entries_through_store(tmp_path) -> None:
+    path = tmp_path / "incidents.db"
+    first, second = SceneCache(), SceneCache()
+    first.enable_store(SQLiteIncidentStore(path))
+    second.enable_store(SQLiteIncidentStore(path))
+    key = ("scene_analysis", geocell(37.7749, -122.4194), "1 Main St")
+    calls = 0
+
+    async def compute() -> str:
+        nonlocal calls
+        calls += 1
+        return "analysis"
+
+    assert await first.get_or_compute(key, compute) == "analysis"
+    assert await second.get_or_compute(key, compute) == "analysis"
+    assert calls == 1
+
+
+def test_update_report_is_atomic_across_workers(tmp_path) -> None:
+    path = tmp_path / "incidents.db"
+    SQLiteIncidentStore(path).save_report(make_report("a"))
+    stores = [SQLiteIncidentStore(path) for _ in range(4)]
+
+    def bump(current):
+        return current.model_copy(update={"version": current.version + 1})
+
+    def worker(store) -> None:
+        for _ in range(25):
+            store.update_report("a", bump)
+
+    threads = [threading.Thread(target=worker, args=(store,)) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert stores[0].get_report("a").version == 101
+    assert stores[0].update_report("missing", lambda current: current) is None
+
+
+def test_expired_and_pickled_cache_entries_are_dropped(tmp_path) -> None:
+    store = SQLiteIncidentStore(tmp_path / "incidents.db")
+    store.cache_set("stale", None, time.time() - 7200, b"old")
+    store.cache_set(repr("pickled"), None, time.time(), pickle.dumps("x"))
+
+    cache = SceneCache(disk_ttl_seconds=3600)
+    cache.enable_store(store)
+
+    assert store.cache_get("stale") is None
+    assert cache.get("pickled") is None
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from jobs import (
+    JOB_FAILED,
+    JOB_SUCCEEDED,
+    STAGE_DONE,
+    STAGE_FAILED,
+    InMemoryJobBackend,
+    JobContext,
+    JobQueue,
+    QueueFullError,
+)
+
+
+async def _wait_for_status(queue: JobQueue, job_id: str, status: str) -> None:
+    for _ in range(100):
+        job = await queue.get(job_id)
+        if job.status == status:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job never reached {status}")
+
+
+@pytest.mark.asyncio
+async def test_job_runs_stages_and_records_result() -> None:
+    queue = JobQueue(InMemoryJobBackend(), workers=2)
+    queue.start()
+    gate = asyncio.Event()
+
+    async def runner(ctx: JobContext) -> None:
+        await gate.wait()
+        async with ctx.stage("first"):
+            ctx.set_result(first="ok")
+        async with ctx.stage("second"):
+            ctx.set_result(second="ok")
+
+    try:
+        job = await queue.submit("test", runner, stages=("first", "second"))
+        stream = queue.events(job.job_id)
+        events = [await stream.__anext__()]
+        gate.set()
+        events += [event async for event in stream]
+        await _wait_for_status(queue, job.job_id, JOB_SUCCEEDED)
+
+        stored = await queue.get(job.job_id)
+        assert stored.result == {"first": "ok", "second": "ok"}
+        assert all(stage.status == STAGE_DONE for stage in stored.stages.values())
+        assert events[0]["type"] == "snapshot"
+        done = [e["stage"] for e in events[1:] if e.get("status") == STAGE_DONE]
+        assert done == ["first", "second"]
+        assert events[-1]["job_status"] == JOB_SUCCEEDED
+    finally:
+        await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_failed_stage_marks_job_failed() -> None:
+    queue = JobQueue(InMemoryJobBackend(), workers=1)
+    queue.start()
+
+    async def runner(ctx: JobContext) -> None:
+        async with ctx.stage("boom"):
+            raise RuntimeError("upstream down")
+
+    try:
+        job = await queue.submit("test", runner, stages=("boom",))
+        await _wait_for_status(queue, job.job_id, JOB_FAILED)
+
+        stored = await queue.get(job.job_id)
+        assert stored.error == "upstream down"
+        assert stored.stages["boom"].status == STAGE_FAILED
+    finally:
+        await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_submit_rejects_when_queue_is_full() -> None:
+    # No workers started, so nothing drains the queue.
+    queue = JobQueue(InMemoryJobBackend(), workers=1, max_pending=1)
+
+    async def runner(ctx: JobContext) -> None:
+        return None
+
+    await queue.submit("test", runner)
+    with pytest.raises(QueueFullError):
+        await queue.submit("test", runner)
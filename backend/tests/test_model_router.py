@@ -0,0 +1,119 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from model_router import (
+    DEFAULT_ROUTES,
+    GEMINI_FLASH,
+    GEMINI_FLASH_LITE,
+    PREFETCH,
+    ModelRouter,
+    load_routes,
+    model_urgency,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_routes_by_urgency_and_input_size() -> None:
+    router = ModelRouter(DEFAULT_ROUTES)
+
+    assert router.route("scene_analysis") == GEMINI_FLASH_LITE
+    assert router.route("scene_analysis", urgency=PREFETCH) == GEMINI_FLASH
+    assert router.route("structured_positioning", 100_000) == GEMINI_FLASH_LITE
+    assert router.route("structured_positioning", 600_000) == GEMINI_FLASH
+    assert router.route("agent_llm") == "openai/gpt-5.2-chat-latest"
+    # Unknown tasks get the fastest tier.
+    assert router.route("something_new") == GEMINI_FLASH_LITE
+
+
+def test_urgency_follows_context_into_threads() -> None:
+    router = ModelRouter(DEFAULT_ROUTES)
+
+    async def scene_model() -> str:
+        return await asyncio.to_thread(router.route, "scene_analysis")
+
+    async def prefetch() -> str:
+        with model_urgency(PREFETCH):
+            return await scene_model()
+
+    assert asyncio.run(prefetch()) == GEMINI_FLASH
+    assert asyncio.run(scene_model()) == GEMINI_FLASH_LITE
+
+
+def test_falls_back_while_preferred_tier_breaches_budget() -> None:
+    clock = FakeClock()
+    router = ModelRouter(DEFAULT_ROUTES, window_seconds=60, min_samples=5, clock=clock)
+
+    for _ in range(4):
+        router.record(GEMINI_FLASH, 12.0)
+    # Not enough samples to judge yet.
+    assert router.route("scene_analysis", urgency=PREFETCH) == GEMINI_FLASH
+
+    router.record(GEMINI_FLASH, 12.0)
+    assert router.route("scene_analysis", urgency=PREFETCH) == GEMINI_FLASH_LITE
+    assert router.stats()["fallbacks"] == 1
+    assert router.stats()["models"][GEMINI_FLASH]["p95_ms"] == 12000
+
+    # Slow samples age out and the preferred tier is tried again.
+    clock.now = 61
+    assert router.route("scene_analysis", urgency=PREFETCH) == GEMINI_FLASH
+
+
+def test_timed_records_failed_calls() -> None:
+    router = ModelRouter(DEFAULT_ROUTES, min_samples=1)
+
+    with pytest.raises(RuntimeError), router.timed(GEMINI_FLASH_LITE):
+        raise RuntimeError("quota")
+
+    assert router.stats()["models"][GEMINI_FLASH_LITE]["samples"] == 1
+
+
+def test_loads_routes_from_json_or_file(tmp_path) -> None:
+    routes = {
+        "tiers": [{"model": "slow", "p95_budget_ms": 100}],
+        "tasks": {"ems_report": [{"model": "slow"}]},
+    }
+    path = tmp_path / "routes.json"
+    path.write_text(json.dumps(routes))
+
+    assert load_routes(None) is DEFAULT_ROUTES
+    assert load_routes(json.dumps(routes))["tasks"]["ems_report"] == [{"model": "slow"}]
+    assert ModelRouter(load_routes(str(path))).route("ems_report") == "slow"
+    with pytest.raises(ValueError):
+        load_routes('{"tasks": {"ems_report": [{"urgency": "live"}]}}')
+
+
+def test_agent_routes_keep_defaults_and_need_a_voice() -> None:
+    routes = load_routes('{"tasks": {"agent_llm": [{"model": "openai/gpt-4o"}]}}')
+
+    assert ModelRouter(routes).route("agent_llm") == "openai/gpt-4o"
+    assert ":" in ModelRouter(routes).route("agent_tts")
+    with pytest.raises(ValueError):
+        load_routes('{"tasks": {"agent_tts": [{"model": "cartesia/sonic-3"}]}}')
+
+
+def test_stats_while_workers_record() -> None:
+    router = ModelRouter(DEFAULT_ROUTES, min_samples=1)
+
+    def record(worker: int) -> None:
+        for i in range(200):
+            router.record(f"model-{worker}-{i}", 0.1)
+
+    threads = [threading.Thread(target=record, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    while any(thread.is_alive() for thread in threads):
+        router.stats()
+    for thread in threads:
+        thread.join()
+
+    assert len(router.stats()["models"]) == 802
@@ -0,0 +1,86 @@
+import base64
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from payload_budget import (
+    PayloadBudget,
+    PayloadBudgetError,
+    PayloadLimitMiddleware,
+    iter_b64decode,
+)
+
+
+class Upload(BaseModel):
+    data: str
+
+
+def make_client(budget: PayloadBudget) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(PayloadLimitMiddleware, budget=budget)
+
+    @app.post("/upload")
+    def upload(payload: Upload):
+        return {"size": len(payload.data), "in_use": budget.in_use}
+
+    return TestClient(app)
+
+
+def test_budget_rejects_oversize_and_over_budget() -> None:
+    budget = PayloadBudget(max_request_bytes=100, max_global_bytes=150)
+
+    with pytest.raises(PayloadBudgetError) as too_large:
+        budget.acquire(101, "audio")
+    assert too_large.value.status_code == 413
+
+    with budget.reserve(100, "audio"):
+        with pytest.raises(PayloadBudgetError) as busy:
+            budget.acquire(60, "image")
+        assert busy.value.status_code == 503
+        assert budget.in_use == 100
+
+    assert budget.in_use == 0
+    assert budget.peak == 100
+    assert budget.stats()["rejected"] == {"audio:too_large": 1, "image:over_budget": 1}
+
+
+def test_iter_b64decode_matches_one_shot_decode() -> None:
+    raw = bytes(range(256)) * 50
+    encoded = base64.b64encode(raw).decode()
+    assert b"".join(iter_b64decode(encoded, chunk_chars=400)) == raw
+
+    wrapped = base64.encodebytes(raw).decode()
+    assert b"".join(iter_b64decode(wrapped, chunk_chars=400)) == raw
+
+
+def test_middleware_reserves_request_bodies() -> None:
+    budget = PayloadBudget(max_request_bytes=1000, max_global_bytes=10_000)
+    client = make_client(budget)
+
+    ok = client.post("/upload", json={"data": "x" * 100})
+    assert ok.status_code == 200
+    assert ok.json()["in_use"] > 100
+    assert budget.in_use == 0
+
+    rejected = client.post("/upload", json={"data": "x" * 2000})
+    assert rejected.status_code == 413
+    assert budget.stats()["rejected"] == {"request_body:too_large": 1}
+
+
+def test_middleware_caps_chunked_bodies() -> None:
+    budget = PayloadBudget(max_request_bytes=1000, max_global_bytes=10_000)
+    client = make_client(budget)
+
+    def chunks():
+        yield b'{"data": "'
+        for _ in range(20):
+            yield b"x" * 100
+        yield b'"}'
+
+    response = client.post(
+        "/upload", content=chunks(), headers={"Content-Type": "application/json"}
+    )
+    assert response.status_code == 413
+    assert budget.in_use == 0
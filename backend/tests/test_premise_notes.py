@@ -0,0 +1,90 @@
+import json
+
+from incident_store import SQLiteIncidentStore
+from premise_notes import (
+    NotesIndex,
+    PremiseNote,
+    create_notes_index,
+    normalize_address,
+)
+
+
+def test_normalize_address_matches_frontend() -> None:
+    # Same output as normalizeAddress() in frontend/src/hooks/useNotes.js.
+    assert normalize_address("  123 Main St., Apt #4 ") == "123-main-st-apt-4"
+    assert normalize_address("") is None
+
+
+def test_export_load_and_lookup(tmp_path) -> None:
+    export = tmp_path / "notes.json"
+    export.write_text(
+        json.dumps(
+            [
+                {
+                    "id": "n1",
+                    "address": "123 Main St",
+                    "addressKey": "123-main-st",
+                    "type": "access",
+                    "content": "Gate code 4411",
+                    "createdAt": {"_seconds": 1700000000, "_nanoseconds": 0},
+                },
+                {
+                    "id": "n2",
+                    "address": "123 Main St Rear",
+                    "type": "hazard",
+                    "content": "Large dog in yard",
+                    "createdAt": "2024-03-01T10:00:00Z",
+                    "lat": 37.77491,
+                    "lng": -122.41941,
+                },
+                {"id": "n3", "address": "9 Elm St", "content": ""},
+            ]
+        )
+    )
+    index = NotesIndex()
+    assert index.load_export(str(export)) == 2
+    assert index.load_export(str(export)) == 0
+
+    assert [n.id for n in index.lookup("123 MAIN ST")] == ["n1"]
+
+    index.locate("123-main-st", 37.7749, -122.4194)
+    notes = index.lookup("123 Main St", 37.7749, -122.4194)
+    assert [n.id for n in notes] == ["n1", "n2"]
+
+    block = index.prompt_block("123 Main St", 37.7749, -122.4194)
+    assert "Gate code 4411" in block
+    assert "(at 123 Main St Rear) Large dog in yard" in block
+
+
+def test_incremental_add_deduplicates() -> None:
+    index = NotesIndex()
+    note = PremiseNote(address="1 A St", address_key="1-a-st", content="Stairs only")
+    assert index.add(note)
+    assert not index.add(note.model_copy())
+    assert len(index) == 1
+
+
+def test_shared_index_is_seen_by_every_worker(tmp_path) -> None:
+    path = tmp_path / "incidents.db"
+    first = create_notes_index(SQLiteIncidentStore(path))
+    second = create_notes_index(SQLiteIncidentStore(path))
+    note = PremiseNote(
+        address="123 Main St Rear",
+        address_key="123-main-st-rear",
+        type="hazard",
+        content="Large dog in yard",
+        lat=37.77491,
+        lng=-122.41941,
+    )
+
+    assert first.add(note)
+    assert not second.add(note.model_copy())
+    second.locate("123-main-st", 37.7749, -122.4194)
+
+    assert len(second) == 1
+    assert [n.content for n in second.lookup("123 Main St Rear")] == [
+        "Large dog in yard"
+    ]
+    assert "(at 123 Main St Rear)" in first.prompt_block(
+        "123 Main St", 37.7749, -122.4194
+    )
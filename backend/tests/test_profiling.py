@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import voice
+from profiling import ProfilingMiddleware, SamplingProfiler, active_profile
+
+
+def block_the_loop(seconds: float) -> None:
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_profiler_writes_folded_stacks(tmp_path) -> None:
+    profiler = SamplingProfiler("test", out_dir=str(tmp_path), interval=0.002)
+    profiler.start()
+    await asyncio.sleep(0.05)
+    block_the_loop(0.2)
+    await asyncio.sleep(0.02)
+    paths = profiler.stop()
+
+    assert set(paths) == {"wall", "cpu", "blocking"}
+    blocking = (tmp_path / f"{profiler.profile_id}.blocking.folded").read_text()
+    assert "block_the_loop" in blocking
+    stack, count = blocking.splitlines()[0].rsplit(" ", 1)
+    assert stack.startswith("MainThread;") and int(count) > 0
+    assert (
+        "block_the_loop" in (tmp_path / f"{profiler.profile_id}.cpu.folded").read_text()
+    )
+
+
+def test_middleware_profiles_only_with_token(tmp_path) -> None:
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, token="s3cret", out_dir=str(tmp_path))
+
+    @app.get("/work")
+    def work():
+        block_the_loop(0.05)
+        return {"ok": True}
+
+    client = TestClient(app)
+    assert "x-vectr-profile-id" not in client.get("/work").headers
+    assert (
+        "x-vectr-profile-id"
+        not in client.get("/work", headers={"X-Vectr-Profile": "wrong"}).headers
+    )
+
+    response = client.get("/work", headers={"X-Vectr-Profile": "s3cret"})
+    profile_id = response.headers["x-vectr-profile-id"]
+    assert (tmp_path / f"{profile_id}.wall.folded").exists()
+
+
+def test_admin_toggle_starts_and_stops_profile(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(voice, "PROFILE_TOKEN", "s3cret")
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, token="s3cret", out_dir=str(tmp_path))
+    app.add_api_route("/admin/profiling", voice.toggle_profiling, methods=["POST"])
+    client = TestClient(app)
+    headers = {"X-Vectr-Profile": "s3cret"}
+
+    started = client.post("/admin/profiling", json={"enabled": True}, headers=headers)
+    assert started.status_code == 200, started.text
+    assert "x-vectr-profile-id" not in started.headers
+
+    stopped = client.post("/admin/profiling", json={"enabled": False}, headers=headers)
+    assert stopped.status_code == 200, stopped.text
+    assert stopped.json()["profile_id"] == started.json()["profile_id"]
+    assert active_profile() is None
@@ -0,0 +1,178 @@
+import asyncio
+import pickle
+
+import pytest
+
+import scene_intel
+from scene_cache import SceneCache, geocell
+from scene_intel import StructuredPOI, StructuredPositioningResponse
+
+
+def test_geocell_snaps_nearby_coordinates() -> None:
+    assert geocell(37.7749001, -122.4194002) == geocell(37.7749004, -122.4194)
+    assert geocell(37.7749, -122.4194) != geocell(37.7750, -122.4194)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_computation() -> None:
+    cache = SceneCache()
+    calls = 0
+
+    async def compute() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "analysis"
+
+    results = await asyncio.gather(
+        *(cache.get_or_compute("key", compute) for _ in range(5))
+    )
+
+    assert results == ["analysis"] * 5
+    assert calls == 1
+    assert await cache.get_or_compute("key", compute) == "analysis"
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_failures_and_rejected_values_are_not_cached() -> None:
+    cache = SceneCache()
+
+    async def fail() -> str:
+        raise RuntimeError("upstream down")
+
+    async def unavailable() -> str:
+        return "unavailable"
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_compute("key", fail)
+    await cache.get_or_compute("key", unavailable, should_cache=lambda v: False)
+
+    assert not cache.contains("key")
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_computation() -> None:
+    cache = SceneCache()
+    release = asyncio.Event()
+
+    async def compute() -> str:
+        await release.wait()
+        return "analysis"
+
+    first = asyncio.ensure_future(cache.get_or_compute("key", compute))
+    second = asyncio.ensure_future(cache.get_or_compute("key", compute))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    assert await second == "analysis"
+    assert cache.get("key") == "analysis"
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_is_shared_between_instances(tmp_path) -> None:
+    writer = SceneCache(disk_dir=str(tmp_path))
+    reader = SceneCache(disk_dir=str(tmp_path))
+
+    async def compute() -> bytes:
+        return b"satellite"
+
+    await writer.get_or_compute(("satellite", "1,2"), compute)
+
+    assert reader.get(("satellite", "1,2")) == b"satellite"
+    assert reader.get(("satellite", "1,2"), max_age=-1) is None
+
+
+def test_disk_entries_round_trip_without_pickle(tmp_path) -> None:
+    writer = SceneCache(disk_dir=str(tmp_path))
+    reader = SceneCache(disk_dir=str(tmp_path))
+    positioning = StructuredPositioningResponse(
+        pois=[
+            StructuredPOI(type="entrance", description="door", heading=90, priority=1)
+        ],
+        recommended_heading=180,
+        approach_heading=0,
+        raw_guidance="Park facing south.",
+    )
+    writer.set(("satellite", "1,2"), b"\x89PNG")
+    writer.set(("scene_analysis", "1,2", "1 Main St"), "Stage north.")
+    writer.set(("structured_positioning", "1,2", "1 Main St"), positioning)
+
+    assert reader.get(("satellite", "1,2")) == b"\x89PNG"
+    assert reader.get(("scene_analysis", "1,2", "1 Main St")) == "Stage north."
+    assert reader.get(("structured_positioning", "1,2", "1 Main St")) == positioning
+
+
+def test_pickled_disk_entries_are_not_loaded(tmp_path) -> None:
+    cache = SceneCache(disk_dir=str(tmp_path))
+    path = cache._disk_path(("satellite", "1,2"))
+    path.parent.mkdir(parents=True)
+    path.write_bytes(pickle.dumps((("satellite", "1,2"), 0.0, b"x")))
+
+    assert cache.get(("satellite", "1,2")) is None
+
+
+@pytest.mark.asyncio
+async def test_higher_priority_caller_skips_lower_priority_inflight() -> None:
+    cache = SceneCache()
+    release_prefetch = asyncio.Event()
+
+    async def slow_prefetch() -> str:
+        await release_prefetch.wait()
+        return "flash analysis"
+
+    async def live() -> str:
+        return "lite analysis"
+
+    prefetch = asyncio.ensure_future(cache.get_or_compute("key", slow_prefetch))
+    await asyncio.sleep(0)
+
+    # The live call does not wait for the slower prefetch to finish.
+    assert await cache.get_or_compute("key", live, priority=1) == "lite analysis"
+    release_prefetch.set()
+    assert await prefetch == "flash analysis"
+    assert cache.stats()["inflight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_sweep_fov_stays_within_street_view_limit(monkeypatch) -> None:
+    fovs = []
+
+    def fake_fetch(lat, lng, heading=None, fov=120):
+        fovs.append(fov)
+        return b"frame"
+
+    monkeypatch.setattr(scene_intel, "fetch_street_view_image", fake_fetch)
+    monkeypatch.setattr(scene_intel, "scene_cache", SceneCache())
+    monkeypatch.setattr(scene_intel, "STREET_VIEW_SWEEP_HEADINGS", (0, 180))
+
+    frames = await scene_intel.get_street_view_sweep(37.7749, -122.4194)
+
+    assert frames == [(0, b"frame"), (180, b"frame")]
+    assert fovs == [120, 120]
+
+
+def test_sweep_prompt_matches_fetched_fov(monkeypatch) -> None:
+    prompts = []
+
+    class FakeModels:
+        def generate_content(self, model, contents):
+            prompts.append(contents[0]["parts"][0]["text"])
+            raise RuntimeError("no model in tests")
+
+    monkeypatch.setattr(scene_intel, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(
+        scene_intel,
+        "gemini_client",
+        lambda key: type("C", (), {"models": FakeModels()}),
+    )
+
+    scene_intel.generate_structured_positioning(
+        "1 Main St", 37.7749, -122.4194, frames=[(0, b"a"), (180, b"b")]
+    )
+
+    assert "each with a 120-degree field of view" in prompts[0]
+    assert "left edge = -60, right edge = +60" in prompts[0]
+    assert "covering 240 of 360 degrees" in prompts[0]
+    assert "360-degree sweep" not in prompts[0]
@@ -0,0 +1,54 @@
+import asyncio
+
+import agent
+from ems_reports import IncidentReport
+from incident_store import SQLiteIncidentStore
+from session_cache import SessionToolCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_jittered_coordinates_hit_until_ttl() -> None:
+    clock = FakeClock()
+    cache = SessionToolCache(ttl_seconds=60, radius_m=50, clock=clock)
+    cache.put("scene_analysis", 37.774929, -122.419416, "stage on Oak St")
+
+    # Rounded and jittered the way the LLM echoes coordinates back.
+    assert cache.get("scene_analysis", 37.7749, -122.4194) == "stage on Oak St"
+    assert cache.get("scene_analysis", 37.77501, -122.41933) == "stage on Oak St"
+    assert cache.get("positioning_guidance", 37.7749, -122.4194) is None
+    assert cache.get("scene_analysis", 37.78, -122.4194) is None
+
+    clock.now = 61
+    assert cache.get("scene_analysis", 37.774929, -122.419416) is None
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_seeds_full_length_intel_from_shared_store(tmp_path, monkeypatch) -> None:
+    store = SQLiteIncidentStore(str(tmp_path / "incidents.db"))
+    long_analysis = "Approach from the north. " * 100
+    store.save_report(
+        IncidentReport(
+            incident_id="inc-1",
+            address="123 Oak St",
+            lat=37.7749,
+            lng=-122.4194,
+            scene_analysis=long_analysis,
+            positioning_guidance="Positioning guidance unavailable: 502",
+        )
+    )
+    monkeypatch.setattr(agent, "shared_incident_store", lambda: store)
+
+    cache = SessionToolCache()
+    seeded = asyncio.run(agent.seed_tool_cache(cache, {"incident_id": "inc-1"}))
+
+    assert seeded == 1
+    assert cache.get("scene_analysis", 37.77491, -122.41938) == long_analysis
+    assert cache.get("positioning_guidance", 37.7749, -122.4194) is None
+    assert asyncio.run(agent.seed_tool_cache(cache, {"address": "x"})) == 0
@@ -0,0 +1,48 @@
+import jwt
+from fastapi.testclient import TestClient
+
+import voice
+from ems_reports import IncidentReport
+from tokens import TokenService
+
+
+def make_service(**kwargs) -> TokenService:
+    return TokenService(api_key="devkey", api_secret="secret" * 6, **kwargs)
+
+
+def test_tokens_are_reused_until_near_expiry() -> None:
+    service = make_service(ttl_seconds=3600, refresh_margin_seconds=60)
+    first, expires_at = service.mint_role("incident-1", "emt")
+    again, _ = service.mint_role("incident-1", "emt")
+    other, _ = service.mint_role("incident-1", "dispatcher")
+
+    assert first == again and first != other
+    assert service.minted == 2
+    claims = jwt.decode(first, "secret" * 6, algorithms=["HS256"])
+    assert claims["sub"] == "emt-crew"
+    assert claims["video"]["room"] == "incident-1"
+    assert abs(claims["exp"] - expires_at) <= 1
+
+
+def test_tokens_near_expiry_are_reminted() -> None:
+    service = make_service(ttl_seconds=3600, refresh_margin_seconds=60)
+    service.mint("incident-1", "emt-crew")
+    key = next(iter(service._tokens))
+    expires_at, token = service._tokens[key]
+    service._tokens[key] = (expires_at - 3590, token)
+
+    service.mint("incident-1", "emt-crew")
+    assert service.minted == 2
+
+
+def test_refresh_requires_a_known_incident(monkeypatch) -> None:
+    monkeypatch.setattr(voice, "token_service", make_service())
+    voice.report_store.put(IncidentReport(incident_id="77", address="1 Main St"))
+    client = TestClient(voice.app)
+
+    response = client.post("/incident/token", json={"incident_id": "77"})
+    assert response.status_code == 200
+    assert response.json()["room_name"] == "incident-77"
+
+    response = client.post("/incident/token", json={"incident_id": "unknown"})
+    assert response.status_code == 404
@@ -0,0 +1,62 @@
+import pytest
+from livekit import rtc
+
+from tts_cache import CachedAudio, TTSAudioCache
+
+
+class FakeTTS:
+    sample_rate = 24000
+    num_channels = 1
+
+    def __init__(self):
+        self.calls = 0
+
+    def synthesize(self, text: str) -> "FakeStream":
+        self.calls += 1
+        return FakeStream()
+
+
+class FakeEvent:
+    def __init__(self, frame: rtc.AudioFrame):
+        self.frame = frame
+
+
+class FakeStream:
+    async def __aenter__(self) -> "FakeStream":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        return None
+
+    def __aiter__(self):
+        return self._events()
+
+    async def _events(self):
+        for _ in range(3):
+            yield FakeEvent(rtc.AudioFrame.create(24000, 1, 240))
+
+
+@pytest.mark.asyncio
+async def test_repeat_phrase_is_synthesized_once_and_persisted(tmp_path) -> None:
+    tts = FakeTTS()
+    cache = TTSAudioCache(disk_dir=str(tmp_path))
+
+    first = await cache.synthesize(tts, "VECTR online.", "voice-a")
+    await cache.synthesize(tts, "VECTR online.", "voice-a")
+    restarted = TTSAudioCache(disk_dir=str(tmp_path))
+    reloaded = await restarted.synthesize(tts, "VECTR online.", "voice-a")
+
+    assert tts.calls == 1
+    assert reloaded.pcm == first.pcm
+    assert sum(f.samples_per_channel for f in reloaded.frames()) == 720
+    await cache.synthesize(tts, "VECTR online.", "voice-b")
+    assert tts.calls == 2
+
+
+def test_memory_tier_is_size_bounded() -> None:
+    cache = TTSAudioCache(max_bytes=10)
+    cache.put("a", "v", CachedAudio(b"x" * 6, 24000, 1))
+    cache.put("b", "v", CachedAudio(b"x" * 6, 24000, 1))
+
+    assert cache.get("a", "v") is None
+    assert cache.get("b", "v") is not None
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from worker_load import (
+    WORKER_ID,
+    CPUSampler,
+    LoopLagMonitor,
+    compute_load,
+    read_reported_lag,
+)
+
+
+class SlowCPUMonitor:
+    def __init__(self, usage: float) -> None:
+        self.usage = usage
+        self.sampled = threading.Event()
+
+    def cpu_percent(self, interval: float) -> float:
+        time.sleep(interval)
+        self.sampled.set()
+        return self.usage
+
+
+def test_load_follows_most_constrained_resource() -> None:
+    assert compute_load(5, 20, lag=0.01, lag_budget=0.1) == 0.25
+    assert compute_load(5, 20, lag=0.08, lag_budget=0.1) == pytest.approx(0.8)
+    assert compute_load(5, 20, lag=0.0, lag_budget=0.1, cpu=0.9) == 0.9
+    assert compute_load(40, 20, lag=0.0, lag_budget=0.1) == 1.0
+
+
+@pytest.mark.asyncio
+async def test_monitor_detects_stall_and_reports_lag(tmp_path) -> None:
+    monitor = LoopLagMonitor(
+        interval=0.01, stall_threshold=0.05, report_dir=tmp_path, report_interval=0
+    )
+    monitor.start()
+    await asyncio.sleep(0.03)
+    time.sleep(0.1)  # block the loop
+    await asyncio.sleep(0.03)
+
+    assert monitor.stalls >= 1
+    assert monitor.recent_lag >= 0.05
+    assert read_reported_lag(tmp_path) >= 0.05
+
+    await monitor.aclose()
+    assert read_reported_lag(tmp_path) == 0.0
+
+
+def test_stale_reports_are_ignored(tmp_path) -> None:
+    report = tmp_path / "12345"
+    report.write_text("0.5")
+    old = time.time() - 60
+    os.utime(report, (old, old))
+
+    assert read_reported_lag(tmp_path, max_age=5) == 0.0
+    assert not report.exists()
+
+
+def test_session_processes_report_under_their_workers_dir(tmp_path) -> None:
+    child = subprocess.run(
+        [sys.executable, "-c", "import worker_load; print(worker_load.WORKER_ID)"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert child.stdout.strip() == WORKER_ID
+
+    (tmp_path / "other-worker").mkdir()
+    (tmp_path / "other-worker" / "999").write_text("0.5")
+    (tmp_path / WORKER_ID).mkdir()
+    (tmp_path / WORKER_ID / "1000").write_text("0.01")
+
+    assert read_reported_lag(tmp_path / WORKER_ID) == 0.01
+
+
+def test_cpu_sampler_averages_in_the_background() -> None:
+    monitor = SlowCPUMonitor(0.6)
+    sampler = CPUSampler(monitor, interval=0.01, window=3)
+
+    assert sampler.value == 0.0
+    assert monitor.sampled.wait(1)
+    time.sleep(0.05)
+    assert sampler.value == pytest.approx(0.6)
+
+
+def test_worker_load_does_not_wait_for_a_cpu_sample(monkeypatch) -> None:
+    import agent
+
+    monitor = SlowCPUMonitor(0.9)
+    sampler = CPUSampler(monitor, interval=0.5)
+    monkeypatch.setattr(agent, "cpu_sampler", sampler)
+    server = SimpleNamespace(active_jobs=[])
+
+    started = time.monotonic()
+    load = agent.worker_load(server)
+    assert time.monotonic() - started < 0.1
+    assert load == 0.0
+
+    assert monitor.sampled.wait(2)
+    assert agent.worker_load(server) == pytest.approx(0.9)
@@ -0,0 +1,98 @@
+"""
+LiveKit access token minting with a signed-token cache.
+
+Tokens are cached per (room, identity, name, grants) and reused until they
+are within `refresh_margin_seconds` of expiry, so incident creation and
+client rejoins don't re-sign JWTs on every call.
+"""
+
+import datetime
+import os
+import threading
+import time
+from typing import Optional
+
+from livekit import api as livekit_api
+
+TOKEN_TTL_SECONDS = float(os.environ.get("VECTR_TOKEN_TTL_SECONDS", str(6 * 3600)))
+TOKEN_REFRESH_MARGIN_SECONDS = float(
+    os.environ.get("VECTR_TOKEN_REFRESH_MARGIN_SECONDS", "600")
+)
+
+# Participants an incident room is minted for: role -> (identity, display name).
+INCIDENT_ROLES = {
+    "dispatcher": ("dispatcher", "Dispatch"),
+    "emt": ("emt-crew", "EMT Crew"),
+}
+
+
+class TokenService:
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        api_secret: Optional[str] = None,
+        ttl_seconds: float = TOKEN_TTL_SECONDS,
+        refresh_margin_seconds: float = TOKEN_REFRESH_MARGIN_SECONDS,
+        max_entries: int = 4096,
+    ):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.ttl_seconds = ttl_seconds
+        # Never hand out a token that expires sooner than this.
+        self.refresh_margin_seconds = min(refresh_margin_seconds, ttl_seconds / 2)
+        self.max_entries = max_entries
+        self._tokens: dict[tuple, tuple[float, str]] = {}
+        self._lock = threading.Lock()
+        self.minted = 0
+
+    def mint(
+        self,
+        room: str,
+        identity: str,
+        name: str = "",
+        can_publish: bool = True,
+        can_subscribe: bool = True,
+    ) -> tuple[str, float]:
+        """Return (jwt, expires_at) for a room join, reusing a cached token."""
+        key = (room, identity, name, can_publish, can_subscribe)
+        now = time.time()
+        with self._lock:
+            cached = self._tokens.get(key)
+            if cached is not None and cached[0] - now > self.refresh_margin_seconds:
+                return cached[1], cached[0]
+
+        token = livekit_api.AccessToken(
+            api_key=self.api_key or os.getenv("LIVEKIT_API_KEY"),
+            api_secret=self.api_secret or os.getenv("LIVEKIT_API_SECRET"),
+        )
+        token.with_identity(identity).with_name(name)
+        token.with_ttl(datetime.timedelta(seconds=self.ttl_seconds))
+        token.with_grants(
+            livekit_api.VideoGrants(
+                room_join=True,
+                room=room,
+                can_publish=can_publish,
+                can_subscribe=can_subscribe,
+            )
+        )
+        jwt = token.to_jwt()
+        # JWT expiry has one-second resolution; round down to stay conservative.
+        expires_at = int(now + self.ttl_seconds)
+
+        with self._lock:
+            if len(self._tokens) >= self.max_entries:
+                self._evict(now)
+            self._tokens[key] = (expires_at, jwt)
+            self.minted += 1
+        return jwt, expires_at
+
+    def _evict(self, now: float) -> None:
+        for key, (expires_at, _) in list(self._tokens.items()):
+            if expires_at - now <= self.refresh_margin_seconds:
+                del self._tokens[key]
+        while len(self._tokens) >= self.max_entries:
+            del self._tokens[next(iter(self._tokens))]
+
+    def mint_role(self, room: str, role: str) -> tuple[str, float]:
+        identity, name = INCIDENT_ROLES[role]
+        return self.mint(room, identity, name)
@@ -0,0 +1,162 @@
+"""
+Content-addressed cache of synthesized speech for fixed agent utterances.
+
+Audio is keyed by (voice id, text), kept in a size-bounded in-memory LRU and
+optionally persisted as WAV files so it survives worker restarts. Cached
+phrases are played with AgentSession.say(audio=...), skipping both the LLM
+and the TTS round trip.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import wave
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Optional
+
+from livekit import rtc
+
+logger = logging.getLogger("vectr-agent")
+
+FRAME_MS = 20
+SAMPLE_WIDTH = 2  # 16-bit PCM
+
+
+class CachedAudio:
+    def __init__(self, pcm: bytes, sample_rate: int, num_channels: int):
+        self.pcm = pcm
+        self.sample_rate = sample_rate
+        self.num_channels = num_channels
+
+    def frames(self) -> list[rtc.AudioFrame]:
+        samples_per_frame = self.sample_rate * FRAME_MS // 1000
+        frame_bytes = samples_per_frame * self.num_channels * SAMPLE_WIDTH
+        view = memoryview(self.pcm)
+        frames = []
+        for offset in range(0, len(view), frame_bytes):
+            chunk = view[offset : offset + frame_bytes]
+            frames.append(
+                rtc.AudioFrame(
+                    data=chunk,
+                    sample_rate=self.sample_rate,
+                    num_channels=self.num_channels,
+                    samples_per_channel=len(chunk)
+                    // (self.num_channels * SAMPLE_WIDTH),
+                )
+            )
+        return frames
+
+
+def cache_key(text: str, voice_id: str) -> str:
+    return hashlib.sha256(f"{voice_id}\0{text.strip()}".encode()).hexdigest()
+
+
+class TTSAudioCache:
+    def __init__(
+        self, max_bytes: int = 64 * 1024 * 1024, disk_dir: Optional[str] = None
+    ):
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+        self._entries: OrderedDict[str, CachedAudio] = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text: str, voice_id: str) -> Optional[CachedAudio]:
+        key = cache_key(text, voice_id)
+        audio = self._entries.get(key)
+        if audio is not None:
+            self._entries.move_to_end(key)
+            return audio
+        audio = self._read_disk(key)
+        if audio is not None:
+            self._remember(key, audio)
+        return audio
+
+    def put(self, text: str, voice_id: str, audio: CachedAudio) -> None:
+        key = cache_key(text, voice_id)
+        self._remember(key, audio)
+        self._write_disk(key, audio)
+
+    def _remember(self, key: str, audio: CachedAudio) -> None:
+        if len(audio.pcm) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous.pcm)
+        self._entries[key] = audio
+        self._size += len(audio.pcm)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted.pcm)
+
+    def _read_disk(self, key: str) -> Optional[CachedAudio]:
+        if self.disk_dir is None:
+            return None
+        path = self.disk_dir / f"{key}.wav"
+        try:
+            with wave.open(str(path), "rb") as f:
+                return CachedAudio(
+                    f.readframes(f.getnframes()), f.getframerate(), f.getnchannels()
+                )
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Unreadable TTS cache entry {path}: {e}")
+            return None
+
+    def _write_disk(self, key: str, audio: CachedAudio) -> None:
+        if self.disk_dir is None:
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as raw, wave.open(raw, "wb") as f:
+                f.setnchannels(audio.num_channels)
+                f.setsampwidth(SAMPLE_WIDTH)
+                f.setframerate(audio.sample_rate)
+                f.writeframes(audio.pcm)
+            os.replace(tmp_path, self.disk_dir / f"{key}.wav")
+        except Exception as e:
+            logger.warning(f"Could not persist TTS cache entry: {e}")
+
+    async def synthesize(self, tts, text: str, voice_id: str) -> CachedAudio:
+        """Return cached audio for text, synthesizing it with `tts` on a miss."""
+        audio = self.get(text, voice_id)
+        if audio is not None:
+            self.hits += 1
+            return audio
+
+        self.misses += 1
+        pcm = bytearray()
+        sample_rate, num_channels = tts.sample_rate, tts.num_channels
+        async with tts.synthesize(text) as stream:
+            async for event in stream:
+                frame = event.frame
+                sample_rate, num_channels = frame.sample_rate, frame.num_channels
+                pcm.extend(frame.data.tobytes())
+        audio = CachedAudio(bytes(pcm), sample_rate, num_channels)
+        self.put(text, voice_id, audio)
+        return audio
+
+
+async def _play(frames: list[rtc.AudioFrame]) -> AsyncIterator[rtc.AudioFrame]:
+    for frame in frames:
+        yield frame
+
+
+async def say_cached(session, cache: TTSAudioCache, text: str, voice_id: str):
+    """
+    Speak text verbatim through the session, reusing cached audio.
+    Falls back to the session's normal TTS path if synthesis fails.
+    """
+    try:
+        audio = await cache.synthesize(session.tts, text, voice_id)
+    except Exception as e:
+        logger.warning(f"TTS cache synthesis failed, speaking live: {e}")
+        return session.say(text)
+    return session.say(text, audio=_play(audio.frames()))
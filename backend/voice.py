@@ -1,36 +1,101 @@
-import base64
+import asyncio
+import binascii
+import hashlib
+import json
+import logging
 import os
+import time
 from typing import Optional
 
+import aiohttp
 import requests
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from google import genai
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from livekit import api as livekit_api
 from livekit.agents import inference
 from livekit.agents.stt.stt import SpeechEventType
 from livekit.agents.utils.codecs import AudioStreamDecoder
 from pydantic import BaseModel
 
-from livekit import api as livekit_api
-import json
-import asyncio
-
+from compression import CompressionMiddleware
+from ems_reports import (
+    IncidentReport,
+    changed_sections,
+    describe_changes,
+    notes_delta,
+    patch_report_sections,
+    report_store,
+    split_report_sections,
+)
+from incident_store import create_incident_store
+from jobs import Job, JobContext, JobQueue, QueueFullError, create_job_backend
+from model_router import PREFETCH, model_router, model_urgency
+from payload_budget import (
+    PayloadBudgetError,
+    PayloadLimitMiddleware,
+    decoded_size,
+    iter_b64decode,
+    payload_budget,
+    rejection_headers,
+)
+from premise_notes import PremiseNote, create_notes_index, normalize_address
+from profiling import (
+    PROFILE_HEADER,
+    ProfilingMiddleware,
+    active_profile,
+    start_profile,
+    stop_profile,
+    token_matches,
+)
+from scene_cache import geocell
+from scene_intel import (
+    DEFAULT_PREFETCH_TARGETS,
+    GEMINI_API_KEY,
+    GOOGLE_API_KEY,
+    GOOGLE_MAPS_API_KEY,
+    PREFETCH_GETTERS,
+    PREFETCH_TARGETS,
+    TOKEN_COMPANY_API_KEY,
+    WISPR_API_KEY,
+    StructuredPOI,
+    UpstreamError,
+    compress_text_with_token_company,
+    gemini_client,
+    get_positioning_guidance,
+    get_scene_analysis,
+    get_structured_positioning,
+    scene_cache,
+)
+from tokens import INCIDENT_ROLES, TokenService
 
 load_dotenv()
 
-
-TOKEN_COMPANY_API_KEY = os.environ.get("TOKEN_COMPANY_API_KEY")
-GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
-GEMINI_API_KEY = GOOGLE_API_KEY
-WISPR_API_KEY = os.environ.get("WISPR_API_KEY")
-GOOGLE_MAPS_API_KEY = os.environ.get("GOOGLE_MAPS_API_KEY") or os.environ.get(
-    "VITE_GOOGLE_MAPS_API_KEY"
-)
+logger = logging.getLogger("vectr-api")
 
 
 app = FastAPI()
 
+token_service = TokenService()
+
+# Incident state shared by all API workers when VECTR_INCIDENT_STORE=sqlite.
+incident_store = create_incident_store()
+if incident_store.shared:
+    report_store.backend = incident_store
+    scene_cache.enable_store(incident_store)
+
+# Premise notes mirrored from Firestore for report prompts; shared through
+# the incident store when it is, otherwise per worker.
+notes_index = create_notes_index(incident_store)
+PREMISE_NOTES_LIMIT = int(os.environ.get("VECTR_PREMISE_NOTES_LIMIT", "10"))
+
+job_queue = JobQueue(
+    create_job_backend(),
+    workers=int(os.environ.get("VECTR_JOB_WORKERS", "4")),
+    max_pending=int(os.environ.get("VECTR_JOB_MAX_PENDING", "100")),
+)
+
 
 @app.on_event("startup")
 async def startup_event():
@@ -39,8 +104,44 @@ async def startup_event():
     print(f"GOOGLE_API_KEY: {'Set' if GOOGLE_API_KEY else 'Not Set'}")
     print(f"WISPR_API_KEY: {'Set' if WISPR_API_KEY else 'Not Set'}")
     print(f"GOOGLE_MAPS_API_KEY: {'Set' if GOOGLE_MAPS_API_KEY else 'Not Set'}")
+    job_queue.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await job_queue.stop()
+    await close_livekit_api()
+    incident_store.close()
+
+
+@app.exception_handler(UpstreamError)
+async def upstream_error_handler(request: Request, exc: UpstreamError):
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+
+
+@app.exception_handler(PayloadBudgetError)
+async def payload_budget_error_handler(request: Request, exc: PayloadBudgetError):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers=rejection_headers(exc),
+    )
+
+
+# Innermost, so its rejections still get CORS headers.
+app.add_middleware(PayloadLimitMiddleware, budget=payload_budget)
 
+# Opt-in profiling; without VECTR_PROFILE_TOKEN the middleware is a pass-through.
+PROFILE_TOKEN = os.environ.get("VECTR_PROFILE_TOKEN")
+app.add_middleware(ProfilingMiddleware, token=PROFILE_TOKEN)
 
+# Gemini text and POI lists are multi-KB; crews are on cellular links.
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.environ.get("VECTR_COMPRESSION_MIN_BYTES", "1000")),
+    compresslevel=int(os.environ.get("VECTR_GZIP_LEVEL", "6")),
+    brotli_quality=int(os.environ.get("VECTR_BROTLI_QUALITY", "5")),
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -55,6 +156,13 @@ class CreateIncidentRequest(BaseModel):
     lat: float
     lng: float
     caller_notes: str = ""
+    # Profile the agent session for this room (see profiling.py).
+    profile: bool = False
+
+
+class ProfilingToggleRequest(BaseModel):
+    enabled: bool
+    label: str = "admin"
 
 
 class CreateIncidentResponse(BaseModel):
@@ -66,9 +174,101 @@ class CreateIncidentResponse(BaseModel):
     ems_report: str
 
 
+class IncidentJobResponse(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+    events_url: str
+    room_name: str
+    token_dispatcher: str
+    token_emt: str
+
+
+class RefreshTokenRequest(BaseModel):
+    incident_id: str
+    role: str = "emt"
+
+
+class RefreshTokenResponse(BaseModel):
+    room_name: str
+    token: str
+    expires_at: float
+
+
+class IncidentResponse(BaseModel):
+    incident_id: str
+    room_name: str
+    address: str
+    lat: float
+    lng: float
+    caller_notes: str
+    scene_analysis: str
+    positioning_guidance: str
+    ems_report: str
+    report_version: int
+    # Pipeline stages with stored results (job-based incidents).
+    stages: list[str]
+    updated_at: float
+
+
+class UpdateNotesRequest(BaseModel):
+    caller_notes: str
+    # Treat caller_notes as new lines appended to the existing notes.
+    append: bool = False
+
+
+class UpdateNotesResponse(BaseModel):
+    incident_id: str
+    version: int
+    changed_sections: dict[str, str]
+    ems_report: str
+    delivered: bool
+
+
+class PremiseNoteRequest(BaseModel):
+    address: str
+    content: str
+    type: str = "general"
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    # Firestore document id, so the same note is never indexed twice.
+    id: Optional[str] = None
+
+
+class PremiseNoteResponse(BaseModel):
+    address_key: str
+    indexed: bool
+
+
 class TriggerBriefingRequest(BaseModel):
     room_name: str
     briefing_text: str
+    # Speak the text exactly as given (cached audio, no LLM rephrasing).
+    verbatim: bool = False
+    # Interrupt whatever the agent is currently announcing.
+    urgent: bool = False
+
+
+class BroadcastRequest(BaseModel):
+    briefing_text: str
+    # Explicit target rooms; when omitted, every active room matching the filter.
+    rooms: Optional[list[str]] = None
+    room_prefix: str = "incident-"
+    occupied_only: bool = True
+    verbatim: bool = False
+    urgent: bool = False
+
+
+class BroadcastDelivery(BaseModel):
+    room: str
+    status: str
+    error: Optional[str] = None
+
+
+class BroadcastResponse(BaseModel):
+    sent: int
+    failed: int
+    results: list[BroadcastDelivery]
 
 
 class EMSRequest(BaseModel):
@@ -96,66 +296,80 @@ class SceneAnalysisRequest(BaseModel):
     lat: float
     lng: float
     address: str
+    # Analyze a full 360-degree street view sweep instead of a single frame.
+    street_view_sweep: bool = False
+
+
+class BatchSceneLocation(SceneAnalysisRequest):
+    id: Optional[str] = None
+
+
+class BatchSceneAnalysisRequest(BaseModel):
+    locations: list[BatchSceneLocation]
 
 
 class SceneAnalysisResponse(BaseModel):
     analysis: str
     positioning_guidance: str
-    pois: list["StructuredPOI"] = []
+    pois: list[StructuredPOI] = []
     recommended_heading: int = 0
     approach_heading: int = 0
 
 
-def compress_text_with_token_company(text: str, aggressiveness: float) -> str:
-    if not TOKEN_COMPANY_API_KEY:
-        raise HTTPException(
-            status_code=500, detail="TOKEN_COMPANY_API_KEY is not configured"
-        )
+# One LiveKit client (and HTTP connection pool) is shared by all requests.
+LIVEKIT_MAX_CONNECTIONS = int(os.environ.get("VECTR_LIVEKIT_MAX_CONNECTIONS", "64"))
+BROADCAST_CONCURRENCY = int(os.environ.get("VECTR_BROADCAST_CONCURRENCY", "32"))
+BROADCAST_TIMEOUT_SECONDS = float(
+    os.environ.get("VECTR_BROADCAST_TIMEOUT_SECONDS", "5")
+)
 
-    url = "https://api.thetokencompany.com/v1/compress"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {TOKEN_COMPANY_API_KEY}",
-    }
-    payload = {
-        "model": "bear-1",
-        "compression_settings": {
-            "aggressiveness": aggressiveness,
-            "max_output_tokens": None,
-            "min_output_tokens": None,
-        },
-        "input": text,
-    }
+livekit_client: Optional[livekit_api.LiveKitAPI] = None
+livekit_http: Optional[aiohttp.ClientSession] = None
 
-    try:
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
-    except requests.RequestException as exc:
-        raise HTTPException(
-            status_code=502, detail="Error calling compression service"
-        ) from exc
 
-    if response.status_code != 200:
-        raise HTTPException(
-            status_code=502, detail="Compression service returned an error"
+def get_livekit_api() -> livekit_api.LiveKitAPI:
+    """Shared LiveKit API client; closed on app shutdown, not by callers."""
+    global livekit_client, livekit_http
+    if livekit_client is None:
+        livekit_http = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=LIVEKIT_MAX_CONNECTIONS)
         )
-
-    data = response.json()
-    output = data.get("output")
-    if not isinstance(output, str):
-        raise HTTPException(
-            status_code=502, detail="Invalid response from compression service"
+        livekit_client = livekit_api.LiveKitAPI(
+            url=os.getenv("LIVEKIT_URL"),
+            api_key=os.getenv("LIVEKIT_API_KEY"),
+            api_secret=os.getenv("LIVEKIT_API_SECRET"),
+            session=livekit_http,
         )
+    return livekit_client
 
-    return output
 
+async def close_livekit_api() -> None:
+    global livekit_client, livekit_http
+    if livekit_client is not None:
+        await livekit_client.aclose()
+        livekit_client = None
+    if livekit_http is not None:
+        await livekit_http.close()
+        livekit_http = None
 
-def get_livekit_api():
-    """Create LiveKit API client."""
-    return livekit_api.LiveKitAPI(
-        url=os.getenv("LIVEKIT_URL"),
-        api_key=os.getenv("LIVEKIT_API_KEY"),
-        api_secret=os.getenv("LIVEKIT_API_SECRET"),
-    )
+
+def briefing_packet(text: str, verbatim: bool = False, urgent: bool = False) -> bytes:
+    return json.dumps(
+        {
+            "type": "tactical_briefing",
+            "briefing": text,
+            "verbatim": verbatim,
+            "urgent": urgent,
+        }
+    ).encode()
+
+
+def premise_notes_for(address: str, lat: float, lng: float) -> str:
+    """Prior premise notes for the report prompt, from the notes index."""
+    address_key = normalize_address(address)
+    if address_key:
+        notes_index.locate(address_key, lat, lng)
+    return notes_index.prompt_block(address, lat, lng, limit=PREMISE_NOTES_LIMIT)
 
 
 def generate_comprehensive_ems_report(
@@ -163,21 +377,24 @@ def generate_comprehensive_ems_report(
     caller_notes: str,
     scene_analysis: str,
     positioning_guidance: str,
+    premise_notes: str = "",
 ) -> str:
     """
-    Generate a comprehensive EMS report combining caller notes,
-    satellite scene analysis, and street view positioning.
+    Generate a comprehensive EMS report combining caller notes, prior
+    premise notes, satellite scene analysis, and street view positioning.
     """
     if not GEMINI_API_KEY:
         return "Gemini API key missing, cannot generate report."
 
-    client = genai.Client(api_key=GEMINI_API_KEY)
+    client = gemini_client(GEMINI_API_KEY)
 
     prompt = (
         "You are an EMS Incident Commander. Generate a consolidated 'Tactical Scene Report' "
         "for responding crews based on the following intelligence:\n\n"
         f"LOCATION: {address}\n"
         f"CALLER NOTES/DISPATCH INFO: {caller_notes}\n\n"
+        f"PRIOR PREMISE NOTES (from earlier calls to this address):\n"
+        f"{premise_notes or 'None on file.'}\n\n"
         f"SATELLITE SCENE INTELLIGENCE:\n{scene_analysis}\n\n"
         f"STREET VIEW POSITIONING DATA:\n{positioning_guidance}\n\n"
         "OUTPUT FORMAT:\n"
@@ -191,11 +408,13 @@ def generate_comprehensive_ems_report(
         "Style: Telegraphic, tactical, suitable for radio read-back. No fluff."
     )
 
+    model = model_router.route("ems_report", len(prompt.encode()))
     try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash-lite",
-            contents=prompt,
-        )
+        with model_router.timed(model):
+            response = client.models.generate_content(
+                model=model,
+                contents=prompt,
+            )
         text = getattr(response, "text", None)
         if callable(text):
             text = response.text()
@@ -204,60 +423,129 @@ def generate_comprehensive_ems_report(
         return f"Failed to generate EMS report: {str(e)}"
 
 
-@app.post("/incident/create", response_model=CreateIncidentResponse)
-async def create_incident(payload: CreateIncidentRequest):
-    """
-    Create a new incident room with:
-    1. LiveKit room for voice communication
-    2. Pre-analyzed scene intelligence (satellite + street view)
-    3. Access tokens for dispatcher and EMT
-    4. Comprehensive EMS Report
+INCIDENT_JOB_STAGES = (
+    "scene_analysis",
+    "positioning_guidance",
+    "ems_report",
+    "compression",
+    "room",
+)
 
-    The VECTR agent will automatically join and speak the briefing.
-    """
-    room_name = f"incident-{payload.incident_id}"
 
-    # 1. Run scene analysis (reusing existing functions)
+async def run_scene_analysis(address: str, lat: float, lng: float) -> str:
+    """Satellite scene analysis, degrading to a notice on failure."""
     try:
-        satellite_bytes = fetch_static_satellite_image(payload.lat, payload.lng)
-        scene_analysis = analyze_scene_with_gemini(
-            payload.address, payload.lat, payload.lng, satellite_bytes
-        )
+        return await get_scene_analysis(address, lat, lng)
     except Exception as e:
-        scene_analysis = f"Scene analysis unavailable: {str(e)}"
+        return f"Scene analysis unavailable: {str(e)}"
 
+
+async def run_positioning_guidance(address: str, lat: float, lng: float) -> str:
+    """Street view positioning guidance, degrading to a notice on failure."""
     try:
-        street_view_bytes = fetch_street_view_image(payload.lat, payload.lng)
-        positioning_guidance = generate_positioning_guidance(
-            payload.address, payload.lat, payload.lng, street_view_bytes
-        )
+        return await get_positioning_guidance(address, lat, lng)
     except Exception as e:
-        positioning_guidance = f"Positioning guidance unavailable: {str(e)}"
+        return f"Positioning guidance unavailable: {str(e)}"
 
-    # 2. Generate Comprehensive EMS Report
-    ems_report = generate_comprehensive_ems_report(
-        payload.address, payload.caller_notes, scene_analysis, positioning_guidance
+
+def build_report(
+    payload: CreateIncidentRequest,
+    scene_analysis: str,
+    positioning_guidance: str,
+    ems_report: str,
+) -> IncidentReport:
+    preamble, sections = split_report_sections(ems_report)
+    return IncidentReport(
+        incident_id=payload.incident_id,
+        address=payload.address,
+        lat=payload.lat,
+        lng=payload.lng,
+        caller_notes=payload.caller_notes,
+        scene_analysis=scene_analysis,
+        positioning_guidance=positioning_guidance,
+        preamble=preamble,
+        sections=sections,
     )
 
-    # 3. Compress scene data for room metadata using Token Company
-    try:
-        compressed_scene = compress_text_with_token_company(
-            scene_analysis, aggressiveness=0.3
+
+def remember_report(
+    payload: CreateIncidentRequest,
+    scene_analysis: str,
+    positioning_guidance: str,
+    ems_report: str,
+) -> IncidentReport:
+    """Keep the incident's report sections so note updates can patch them."""
+    report = build_report(payload, scene_analysis, positioning_guidance, ems_report)
+    report_store.put(report)
+    return report
+
+
+async def store_generated_report(
+    payload: CreateIncidentRequest,
+    scene_analysis: str,
+    positioning_guidance: str,
+    ems_report: str,
+) -> None:
+    """
+    Merge the pipeline's generated fields into the stored report. Notes
+    updates that landed while the pipeline ran are kept and folded into the
+    new sections.
+    """
+    generated = build_report(payload, scene_analysis, positioning_guidance, ems_report)
+
+    def merge(current: Optional[IncidentReport]) -> IncidentReport:
+        if current is None:
+            return generated
+        return current.model_copy(
+            update=generated.model_dump(
+                include={
+                    "scene_analysis",
+                    "positioning_guidance",
+                    "preamble",
+                    "sections",
+                }
+            )
         )
-    except Exception:
-        compressed_scene = scene_analysis
 
-    try:
-        compressed_positioning = compress_text_with_token_company(
-            positioning_guidance, aggressiveness=0.3
+    report = report_store.update(payload.incident_id, merge)
+    if report.caller_notes == payload.caller_notes:
+        return
+    async with report_store.lock(payload.incident_id):
+        try:
+            preamble, sections, changes = await revise_report_sections(
+                report, payload.caller_notes, report.caller_notes
+            )
+        except Exception as e:
+            logger.warning(f"Could not fold notes into {payload.incident_id}: {e}")
+            return
+        updated = report.model_copy(
+            update={
+                "preamble": preamble,
+                "sections": sections,
+                "version": report.version + (1 if changes else 0),
+            }
         )
+        if not report_store.swap(report, updated):
+            logger.warning(
+                f"Report {payload.incident_id} changed while folding in notes"
+            )
+
+
+def compress_for_room_metadata(text: str) -> str:
+    """Compress scene text for LLM context packing, falling back to the original."""
+    try:
+        return compress_text_with_token_company(text, aggressiveness=0.3)
     except Exception:
-        compressed_positioning = positioning_guidance
+        return text
 
-    # 4. Create LiveKit room with incident metadata
-    lk = get_livekit_api()
 
-    room_metadata = json.dumps(
+def build_room_metadata(
+    payload: CreateIncidentRequest,
+    compressed_scene: str,
+    compressed_positioning: str,
+    ems_report: str,
+) -> str:
+    return json.dumps(
         {
             "incident_id": payload.incident_id,
             "address": payload.address,
@@ -268,9 +556,12 @@ async def create_incident(payload: CreateIncidentRequest):
             "scene_analysis": compressed_scene[:1000],
             "positioning_guidance": compressed_positioning[:1000],
             "ems_report": ems_report[:1000],
+            "profile": payload.profile,
         }
     )
 
+
+async def create_incident_room(lk, room_name: str, room_metadata: str) -> None:
     try:
         await lk.room.create_room(
             livekit_api.CreateRoomRequest(
@@ -283,47 +574,415 @@ async def create_incident(payload: CreateIncidentRequest):
         # Room might already exist
         logger.warning(f"Room creation note: {e}")
 
-    # 5. Generate access tokens
-    token_dispatcher = livekit_api.AccessToken(
-        api_key=os.getenv("LIVEKIT_API_KEY"),
-        api_secret=os.getenv("LIVEKIT_API_SECRET"),
-    )
-    token_dispatcher.with_identity("dispatcher").with_name("Dispatch")
-    token_dispatcher.with_grants(
-        livekit_api.VideoGrants(
-            room_join=True,
-            room=room_name,
-            can_publish=True,
-            can_subscribe=True,
+
+def generate_incident_tokens(room_name: str) -> tuple[str, str]:
+    """Dispatcher and EMT access tokens for an incident room (cached)."""
+    token_dispatcher, _ = token_service.mint_role(room_name, "dispatcher")
+    token_emt, _ = token_service.mint_role(room_name, "emt")
+    return token_dispatcher, token_emt
+
+
+@app.post("/incident/token", response_model=RefreshTokenResponse)
+def refresh_incident_token(payload: RefreshTokenRequest) -> RefreshTokenResponse:
+    """
+    Token for rejoining an incident room without re-running the incident
+    pipeline. Unknown incidents get a 404; cached tokens are reused until
+    they are close to expiry.
+    """
+    if payload.role not in INCIDENT_ROLES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"role must be one of {', '.join(INCIDENT_ROLES)}",
         )
+    if report_store.get(payload.incident_id) is None:
+        raise HTTPException(status_code=404, detail="Incident not found")
+    room_name = f"incident-{payload.incident_id}"
+    token, expires_at = token_service.mint_role(room_name, payload.role)
+    return RefreshTokenResponse(room_name=room_name, token=token, expires_at=expires_at)
+
+
+@app.post("/incident/create", response_model=CreateIncidentResponse)
+async def create_incident(payload: CreateIncidentRequest):
+    """
+    Create a new incident room with:
+    1. LiveKit room for voice communication
+    2. Pre-analyzed scene intelligence (satellite + street view)
+    3. Access tokens for dispatcher and EMT
+    4. Comprehensive EMS Report
+
+    The VECTR agent will automatically join and speak the briefing.
+    """
+    room_name = f"incident-{payload.incident_id}"
+
+    # 1. Run scene analysis (served from the scene cache when prefetched)
+    scene_analysis, positioning_guidance = await asyncio.gather(
+        run_scene_analysis(payload.address, payload.lat, payload.lng),
+        run_positioning_guidance(payload.address, payload.lat, payload.lng),
     )
 
-    token_emt = livekit_api.AccessToken(
-        api_key=os.getenv("LIVEKIT_API_KEY"),
-        api_secret=os.getenv("LIVEKIT_API_SECRET"),
+    # 2. Generate Comprehensive EMS Report
+    ems_report = generate_comprehensive_ems_report(
+        payload.address,
+        payload.caller_notes,
+        scene_analysis,
+        positioning_guidance,
+        premise_notes_for(payload.address, payload.lat, payload.lng),
     )
-    token_emt.with_identity("emt-crew").with_name("EMT Crew")
-    token_emt.with_grants(
-        livekit_api.VideoGrants(
-            room_join=True,
-            room=room_name,
-            can_publish=True,
-            can_subscribe=True,
-        )
+    remember_report(payload, scene_analysis, positioning_guidance, ems_report)
+
+    # 3. Compress scene data for room metadata using Token Company
+    compressed_scene = compress_for_room_metadata(scene_analysis)
+    compressed_positioning = compress_for_room_metadata(positioning_guidance)
+
+    # 4. Create LiveKit room with incident metadata
+    lk = get_livekit_api()
+    room_metadata = build_room_metadata(
+        payload, compressed_scene, compressed_positioning, ems_report
     )
+    await create_incident_room(lk, room_name, room_metadata)
 
-    await lk.aclose()
+    # 5. Generate access tokens
+    token_dispatcher, token_emt = generate_incident_tokens(room_name)
 
     return CreateIncidentResponse(
         room_name=room_name,
-        token_dispatcher=token_dispatcher.to_jwt(),
-        token_emt=token_emt.to_jwt(),
+        token_dispatcher=token_dispatcher,
+        token_emt=token_emt,
         scene_analysis=scene_analysis,
         positioning_guidance=positioning_guidance,
         ems_report=ems_report,
     )
 
 
+async def run_incident_job(payload: CreateIncidentRequest, ctx: JobContext) -> None:
+    """Incident pipeline executed by the job queue, one stage at a time."""
+    room_name = f"incident-{payload.incident_id}"
+    # Visible to GET /incident/{id} on any worker while the pipeline runs.
+    remember_report(payload, "", "", "")
+
+    async def scene_stage() -> str:
+        async with ctx.stage("scene_analysis"):
+            result = await run_scene_analysis(payload.address, payload.lat, payload.lng)
+        ctx.set_result(scene_analysis=result)
+        incident_store.save_stage(payload.incident_id, "scene_analysis", result)
+        return result
+
+    async def positioning_stage() -> str:
+        async with ctx.stage("positioning_guidance"):
+            result = await run_positioning_guidance(
+                payload.address, payload.lat, payload.lng
+            )
+        ctx.set_result(positioning_guidance=result)
+        incident_store.save_stage(payload.incident_id, "positioning_guidance", result)
+        return result
+
+    # Satellite and street view analyses are independent; run them side by side.
+    scene_analysis, positioning_guidance = await asyncio.gather(
+        scene_stage(), positioning_stage()
+    )
+
+    async with ctx.stage("ems_report"):
+        ems_report = await asyncio.to_thread(
+            generate_comprehensive_ems_report,
+            payload.address,
+            payload.caller_notes,
+            scene_analysis,
+            positioning_guidance,
+            premise_notes_for(payload.address, payload.lat, payload.lng),
+        )
+    ctx.set_result(ems_report=ems_report)
+    incident_store.save_stage(payload.incident_id, "ems_report", ems_report)
+    await store_generated_report(
+        payload, scene_analysis, positioning_guidance, ems_report
+    )
+
+    async with ctx.stage("compression"):
+        compressed_scene, compressed_positioning = await asyncio.gather(
+            asyncio.to_thread(compress_for_room_metadata, scene_analysis),
+            asyncio.to_thread(compress_for_room_metadata, positioning_guidance),
+        )
+
+    async with ctx.stage("room"):
+        room_metadata = build_room_metadata(
+            payload, compressed_scene, compressed_positioning, ems_report
+        )
+        lk = get_livekit_api()
+        await create_incident_room(lk, room_name, room_metadata)
+        # Clients may have joined (and auto-created the room) with the early
+        # tokens, so make sure the metadata lands either way and tell the agent.
+        await lk.room.update_room_metadata(
+            livekit_api.UpdateRoomMetadataRequest(
+                room=room_name, metadata=room_metadata
+            )
+        )
+        await lk.room.send_data(
+            livekit_api.SendDataRequest(
+                room=room_name,
+                data=json.dumps(
+                    {
+                        "type": "scene_update",
+                        "data": {"summary": ems_report[:1000]},
+                    }
+                ).encode(),
+                kind=livekit_api.DataPacket.Kind.RELIABLE,
+            )
+        )
+    ctx.set_result(room_name=room_name)
+
+
+@app.post("/incident/jobs", status_code=202, response_model=IncidentJobResponse)
+async def create_incident_job(payload: CreateIncidentRequest):
+    """
+    Job-based variant of /incident/create.
+
+    Returns immediately with a job id and the LiveKit tokens; the scene
+    pipeline runs on the background worker pool. Progress is available via
+    GET /incident/jobs/{job_id} or the SSE stream at /incident/jobs/{job_id}/events.
+    """
+    room_name = f"incident-{payload.incident_id}"
+
+    token_dispatcher, token_emt = generate_incident_tokens(room_name)
+
+    async def runner(ctx: JobContext) -> None:
+        await run_incident_job(payload, ctx)
+
+    try:
+        job = await job_queue.submit("incident", runner, stages=INCIDENT_JOB_STAGES)
+    except QueueFullError as exc:
+        raise HTTPException(
+            status_code=503, detail="Incident queue is full, retry shortly"
+        ) from exc
+
+    return IncidentJobResponse(
+        job_id=job.job_id,
+        status=job.status,
+        status_url=f"/incident/jobs/{job.job_id}",
+        events_url=f"/incident/jobs/{job.job_id}/events",
+        room_name=room_name,
+        token_dispatcher=token_dispatcher,
+        token_emt=token_emt,
+    )
+
+
+@app.get("/incident/jobs/{job_id}", response_model=Job)
+async def get_incident_job(job_id: str):
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/incident/jobs/{job_id}/events")
+async def stream_incident_job(job_id: str):
+    """Server-sent events with per-stage progress until the job finishes."""
+    if await job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        async for event in job_queue.events(job_id):
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/incident/{incident_id}", response_model=IncidentResponse)
+def get_incident(incident_id: str) -> IncidentResponse:
+    """Incident intel from the shared store, including in-progress stages."""
+    report = report_store.get(incident_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Incident not found")
+    stages = incident_store.get_stages(incident_id)
+    return IncidentResponse(
+        incident_id=incident_id,
+        room_name=f"incident-{incident_id}",
+        address=report.address,
+        lat=report.lat,
+        lng=report.lng,
+        caller_notes=report.caller_notes,
+        scene_analysis=report.scene_analysis or stages.get("scene_analysis", ""),
+        positioning_guidance=report.positioning_guidance
+        or stages.get("positioning_guidance", ""),
+        ems_report=report.text if report.sections else stages.get("ems_report", ""),
+        report_version=report.version,
+        stages=sorted(stages),
+        updated_at=report.updated_at,
+    )
+
+
+NOTE_UPDATE_ATTEMPTS = 3
+
+
+async def revise_report_sections(
+    report: IncidentReport, reflected_notes: str, caller_notes: str
+) -> tuple[str, dict[str, str], dict[str, str]]:
+    """
+    Bring the report's sections, written from `reflected_notes`, up to date
+    with `caller_notes`. Returns (preamble, sections, changed sections).
+    """
+    delta = notes_delta(reflected_notes, caller_notes)
+    if not delta:
+        return report.preamble, report.sections, {}
+    if len(report.sections) >= 2:
+        changes = await asyncio.to_thread(
+            patch_report_sections,
+            report,
+            delta,
+            premise_notes_for(report.address, report.lat, report.lng),
+        )
+        return report.preamble, {**report.sections, **changes}, changes
+    # The stored report could not be split into sections; rebuild it.
+    full_report = await asyncio.to_thread(
+        generate_comprehensive_ems_report,
+        report.address,
+        caller_notes,
+        report.scene_analysis,
+        report.positioning_guidance,
+        premise_notes_for(report.address, report.lat, report.lng),
+    )
+    preamble, sections = split_report_sections(full_report)
+    return preamble, sections, changed_sections(report.sections, sections)
+
+
+@app.post("/incident/{incident_id}/notes", response_model=UpdateNotesResponse)
+async def update_incident_notes(
+    incident_id: str, payload: UpdateNotesRequest
+) -> UpdateNotesResponse:
+    """
+    Patch the incident's EMS report with new caller notes.
+
+    Only the new note lines and the prior sections go to the model, and only
+    the sections it changes are rewritten. The changes are pushed to the room
+    as a scene_update so the crew hears just what is new.
+    """
+    if report_store.get(incident_id) is None:
+        raise HTTPException(status_code=404, detail="Incident report not found")
+
+    async with report_store.lock(incident_id):
+        for _ in range(NOTE_UPDATE_ATTEMPTS):
+            report = report_store.get(incident_id)
+            if payload.append:
+                caller_notes = "\n".join(
+                    part for part in (report.caller_notes, payload.caller_notes) if part
+                )
+            else:
+                caller_notes = payload.caller_notes
+            if not notes_delta(report.caller_notes, caller_notes):
+                return UpdateNotesResponse(
+                    incident_id=incident_id,
+                    version=report.version,
+                    changed_sections={},
+                    ems_report=report.text,
+                    delivered=False,
+                )
+
+            preamble, sections, changes = await revise_report_sections(
+                report, report.caller_notes, caller_notes
+            )
+            updated = report.model_copy(
+                update={
+                    "caller_notes": caller_notes,
+                    "preamble": preamble,
+                    "sections": sections,
+                    "version": report.version + (1 if changes else 0),
+                }
+            )
+            # Another worker may have written the report while the model ran.
+            if report_store.swap(report, updated):
+                break
+        else:
+            raise HTTPException(
+                status_code=409, detail="Incident report kept changing; retry"
+            )
+
+    delivered = False
+    if changes:
+        packet = {
+            "type": "scene_update",
+            "data": {
+                "summary": describe_changes(changes),
+                "changed_sections": changes,
+                "version": updated.version,
+            },
+        }
+        try:
+            await get_livekit_api().room.send_data(
+                livekit_api.SendDataRequest(
+                    room=f"incident-{incident_id}",
+                    data=json.dumps(packet).encode(),
+                    kind=livekit_api.DataPacket.Kind.RELIABLE,
+                )
+            )
+            delivered = True
+        except Exception as e:
+            logger.warning(f"Could not push report update for {incident_id}: {e}")
+
+    return UpdateNotesResponse(
+        incident_id=incident_id,
+        version=updated.version,
+        changed_sections=changes,
+        ems_report=updated.text,
+        delivered=delivered,
+    )
+
+
+@app.post("/notes", status_code=201, response_model=PremiseNoteResponse)
+def add_premise_note(payload: PremiseNoteRequest) -> PremiseNoteResponse:
+    """Incrementally index a premise note saved by the dispatcher UI."""
+    address_key = normalize_address(payload.address)
+    if not address_key or not payload.content.strip():
+        raise HTTPException(status_code=400, detail="address and content are required")
+    note = PremiseNote(
+        address=payload.address,
+        address_key=address_key,
+        type=payload.type,
+        content=payload.content.strip(),
+        created_at=time.time(),
+        lat=payload.lat,
+        lng=payload.lng,
+        id=payload.id,
+    )
+    added = notes_index.add(note)
+    return PremiseNoteResponse(address_key=address_key, indexed=added)
+
+
+@app.post("/admin/profiling")
+async def toggle_profiling(payload: ProfilingToggleRequest, request: Request):
+    """
+    Start or stop a process-wide profile. Requires the X-Vectr-Profile
+    header to carry VECTR_PROFILE_TOKEN.
+    """
+    if not token_matches(PROFILE_TOKEN, request.headers.get(PROFILE_HEADER)):
+        raise HTTPException(status_code=403, detail="Profiling is not authorized")
+
+    if payload.enabled:
+        profiler = start_profile(payload.label)
+        if profiler is None:
+            raise HTTPException(status_code=409, detail="A profile is already running")
+        return {"status": "profiling", "profile_id": profiler.profile_id}
+
+    profiler = active_profile()
+    if profiler is None:
+        raise HTTPException(status_code=409, detail="No profile is running")
+    paths = await asyncio.to_thread(stop_profile, profiler)
+    return {"status": "stopped", "profile_id": profiler.profile_id, "files": paths}
+
+
+@app.get("/admin/stats")
+async def admin_stats(request: Request):
+    """Scene cache, payload budget and model latency counters; same token as profiling."""
+    if not token_matches(PROFILE_TOKEN, request.headers.get(PROFILE_HEADER)):
+        raise HTTPException(status_code=403, detail="Stats are not authorized")
+    return {
+        "scene_cache": scene_cache.stats(),
+        "payloads": payload_budget.stats(),
+        "models": model_router.stats(),
+    }
+
+
 @app.post("/incident/briefing")
 async def trigger_briefing(payload: TriggerBriefingRequest):
     """
@@ -331,36 +990,89 @@ async def trigger_briefing(payload: TriggerBriefingRequest):
     The agent will speak this to all participants in the room.
     """
     lk = get_livekit_api()
-
-    data = json.dumps(
-        {
-            "type": "tactical_briefing",
-            "briefing": payload.briefing_text,
-        }
-    ).encode()
+    data = briefing_packet(payload.briefing_text, payload.verbatim, payload.urgent)
 
     try:
         await lk.room.send_data(
             livekit_api.SendDataRequest(
                 room=payload.room_name,
                 data=data,
-                kind=livekit_api.DataPacketKind.RELIABLE,
+                kind=livekit_api.DataPacket.Kind.RELIABLE,
             )
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to send briefing: {e}")
 
-    await lk.aclose()
-
     return {"status": "briefing_sent", "room": payload.room_name}
 
 
+async def broadcast_to_rooms(lk, room_names: list[str], data: bytes) -> list[dict]:
+    """Send one packet to many rooms concurrently; never raises per room."""
+    slots = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+
+    async def deliver(room_name: str) -> dict:
+        async with slots:
+            try:
+                await asyncio.wait_for(
+                    lk.room.send_data(
+                        livekit_api.SendDataRequest(
+                            room=room_name,
+                            data=data,
+                            kind=livekit_api.DataPacket.Kind.RELIABLE,
+                        )
+                    ),
+                    timeout=BROADCAST_TIMEOUT_SECONDS,
+                )
+            except Exception as e:
+                logger.warning(f"Broadcast to {room_name} failed: {e!r}")
+                return {"room": room_name, "status": "failed", "error": repr(e)}
+        return {"room": room_name, "status": "sent", "error": None}
+
+    return await asyncio.gather(*(deliver(name) for name in room_names))
+
+
+@app.post("/incident/broadcast", response_model=BroadcastResponse)
+async def broadcast_briefing(payload: BroadcastRequest) -> BroadcastResponse:
+    """
+    Send one briefing (road closure, hospital diversion, ...) to many rooms.
+
+    Targets the listed rooms, or every active room whose name starts with
+    `room_prefix`. Delivery is concurrent over the shared LiveKit client and
+    reported per room.
+    """
+    lk = get_livekit_api()
+    if payload.rooms is not None:
+        room_names = list(dict.fromkeys(payload.rooms))
+    else:
+        try:
+            listing = await lk.room.list_rooms(livekit_api.ListRoomsRequest())
+        except Exception as e:
+            raise HTTPException(
+                status_code=502, detail=f"Failed to list rooms: {e}"
+            ) from e
+        room_names = [
+            room.name
+            for room in listing.rooms
+            if room.name.startswith(payload.room_prefix)
+            and (room.num_participants > 0 or not payload.occupied_only)
+        ]
+
+    data = briefing_packet(payload.briefing_text, payload.verbatim, payload.urgent)
+    results = await broadcast_to_rooms(lk, room_names, data)
+    sent = sum(1 for result in results if result["status"] == "sent")
+    return BroadcastResponse(
+        sent=sent,
+        failed=len(results) - sent,
+        results=[BroadcastDelivery(**result) for result in results],
+    )
+
+
 def generate_ems_report_with_gemini(compressed_text: str) -> str:
     if not GEMINI_API_KEY:
         raise HTTPException(status_code=500, detail="GEMINI_API_KEY is not configured")
 
     # Pass API key explicitly
-    client = genai.Client(api_key=GEMINI_API_KEY)
+    client = gemini_client(GEMINI_API_KEY)
 
     # Alongside this prompt, use the text compressed_text to generate the report, which should come from the text box.
 
@@ -381,11 +1093,13 @@ def generate_ems_report_with_gemini(compressed_text: str) -> str:
         f"Compressed 911 call text:\n{compressed_text}"
     )
 
+    model = model_router.route("intake_report", len(prompt.encode()))
     try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash-lite",
-            contents=prompt,
-        )
+        with model_router.timed(model):
+            response = client.models.generate_content(
+                model=model,
+                contents=prompt,
+            )
     except Exception as exc:
         raise HTTPException(status_code=502, detail="Error calling Gemini API") from exc
 
@@ -447,16 +1161,18 @@ async def transcribe_with_livekit(audio_base64: str) -> str:
     if not audio_base64 or not audio_base64.strip():
         raise HTTPException(status_code=400, detail="audio_base64 is required")
 
+    # Decoded slice by slice straight into the decoder, so the request never
+    # holds the whole decoded clip alongside its base64 form.
+    decoder = AudioStreamDecoder(sample_rate=16000, num_channels=1)
     try:
-        audio_bytes = base64.b64decode(audio_base64)
-    except Exception as exc:
+        for chunk in iter_b64decode(audio_base64):
+            decoder.push(chunk)
+    except binascii.Error as exc:
+        await decoder.aclose()
         raise HTTPException(status_code=400, detail="Invalid audio_base64") from exc
+    decoder.end_input()
 
     stt = inference.STT(model="assemblyai/universal-streaming", language="en")
-    decoder = AudioStreamDecoder(sample_rate=16000, num_channels=1)
-
-    decoder.push(audio_bytes)
-    decoder.end_input()
 
     stream = stt.stream(language="en")
 
@@ -483,257 +1199,6 @@ async def transcribe_with_livekit(audio_base64: str) -> str:
     return transcription
 
 
-def fetch_static_satellite_image(lat: float, lng: float) -> bytes:
-    api_key = GOOGLE_MAPS_API_KEY
-    if not api_key:
-        raise HTTPException(
-            status_code=500, detail="GOOGLE_MAPS_API_KEY is not configured"
-        )
-    url = (
-        "https://maps.googleapis.com/maps/api/staticmap"
-        f"?center={lat},{lng}&zoom=19&size=640x640&maptype=satellite&key={api_key}"
-    )
-    try:
-        response = requests.get(url, timeout=30)
-    except requests.RequestException as exc:
-        raise HTTPException(
-            status_code=502, detail="Error fetching static map image"
-        ) from exc
-    if response.status_code != 200:
-        raise HTTPException(status_code=502, detail="Failed to fetch static map image")
-    return response.content
-
-
-def fetch_street_view_image(lat: float, lng: float) -> bytes:
-    """Fetch street view image for positioning analysis."""
-    api_key = GOOGLE_MAPS_API_KEY
-    if not api_key:
-        raise HTTPException(
-            status_code=500, detail="GOOGLE_MAPS_API_KEY is not configured"
-        )
-    url = (
-        "https://maps.googleapis.com/maps/api/streetview"
-        f"?size=640x480&location={lat},{lng}&fov=120&key={api_key}"
-    )
-    try:
-        response = requests.get(url, timeout=30)
-    except requests.RequestException as exc:
-        raise HTTPException(
-            status_code=502, detail="Error fetching street view image"
-        ) from exc
-    if response.status_code != 200:
-        raise HTTPException(status_code=502, detail="Failed to fetch street view image")
-    return response.content
-
-
-def analyze_scene_with_gemini(
-    address: str, lat: float, lng: float, image_bytes: bytes
-) -> str:
-    if not GEMINI_API_KEY:
-        raise HTTPException(status_code=500, detail="GEMINI_API_KEY is not configured")
-
-    # Pass API key explicitly
-    client = genai.Client(api_key=GEMINI_API_KEY)
-
-    prompt = (
-        "You are helping Emergency Medical Services (EMS). "
-        f"Address: {address}. "
-        f"Coordinates: {lat}, {lng}. "
-        "Analyze this satellite image and identify:\n"
-        "- Best approach route for emergency vehicles\n"
-        "- Parking locations for ambulances and fire apparatus\n"
-        "- Potential hazards that could affect access or safety\n"
-        "- Likely building access points and entrances\n"
-        "- Yard or driveway obstacles that may slow access\n"
-        "Respond with concise, tactical bullet-style guidance."
-    )
-    image_b64 = base64.b64encode(image_bytes).decode("utf-8")
-    contents = [
-        {
-            "parts": [
-                {"text": prompt},
-                {
-                    "inline_data": {
-                        "mime_type": "image/png",
-                        "data": image_b64,
-                    }
-                },
-            ]
-        }
-    ]
-    try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash-lite",
-            contents=contents,
-        )
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail="Error calling Gemini API") from exc
-    text = getattr(response, "text", None)
-    if callable(text):
-        text = response.text()
-    if not isinstance(text, str) or not text.strip():
-        raise HTTPException(status_code=502, detail="Invalid response from Gemini API")
-    return text
-
-
-def generate_positioning_guidance(
-    address: str, lat: float, lng: float, street_view_bytes: bytes
-) -> str:
-    """Analyze street view to provide ambulance positioning guidance."""
-    if not GEMINI_API_KEY:
-        raise HTTPException(status_code=500, detail="GEMINI_API_KEY is not configured")
-
-    client = genai.Client(api_key=GEMINI_API_KEY)
-
-    prompt = (
-        "You are an EMS positioning expert helping ambulance crews. "
-        f"Address: {address}. "
-        "Analyze this street-level view and provide specific ambulance positioning guidance:\n\n"
-        "1. OPTIMAL PARKING POSITION:\n"
-        "   - Exactly where should the ambulance stop (e.g., 'Park 20ft past the driveway on the right')\n"
-        "   - Which direction should it face for fastest departure\n"
-        "   - Distance from the likely patient pickup point\n\n"
-        "2. STRETCHER PATH:\n"
-        "   - Best route from ambulance to building entrance\n"
-        "   - Surface conditions (grass, concrete, gravel, stairs)\n"
-        "   - Width constraints for stretcher navigation\n\n"
-        "3. EGRESS STRATEGY:\n"
-        "   - Recommended departure direction\n"
-        "   - Turn-around options if needed\n"
-        "   - Traffic/visibility concerns for pulling out\n\n"
-        "4. VISUAL MARKERS:\n"
-        "   - Key landmarks to identify the exact location\n"
-        "   - House numbers, mailboxes, distinctive features\n\n"
-        "Be SPECIFIC with distances and directions. Use clock positions (12 o'clock = straight ahead) "
-        "and cardinal directions. Keep it concise - crews read this while driving."
-    )
-
-    image_b64 = base64.b64encode(street_view_bytes).decode("utf-8")
-    contents = [
-        {
-            "parts": [
-                {"text": prompt},
-                {
-                    "inline_data": {
-                        "mime_type": "image/jpeg",
-                        "data": image_b64,
-                    }
-                },
-            ]
-        }
-    ]
-
-    try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash-lite",
-            contents=contents,
-        )
-    except Exception as exc:
-        raise HTTPException(
-            status_code=502, detail="Error calling Gemini API for positioning"
-        ) from exc
-
-    text = getattr(response, "text", None)
-    if callable(text):
-        text = response.text()
-    if not isinstance(text, str) or not text.strip():
-        raise HTTPException(status_code=502, detail="Invalid response from Gemini API")
-    return text
-
-
-class StructuredPOI(BaseModel):
-    type: str
-    description: str
-    heading: int
-    priority: int
-
-
-class StructuredPositioningResponse(BaseModel):
-    pois: list[StructuredPOI]
-    recommended_heading: int
-    approach_heading: int
-    raw_guidance: str
-
-
-def generate_structured_positioning(
-    address: str, lat: float, lng: float, street_view_bytes: bytes
-) -> StructuredPositioningResponse:
-    if not GEMINI_API_KEY:
-        raise HTTPException(status_code=500, detail="GEMINI_API_KEY not configured")
-
-    client = genai.Client(api_key=GEMINI_API_KEY)
-
-    prompt = f"""You are analyzing a street view for EMS ambulance positioning at {address}.
-
-CRITICAL: Respond ONLY with valid JSON matching this exact schema:
-{{
-  "pois": [
-    {{
-      "type": "entrance|parking|hazard|approach",
-      "description": "brief description",
-      "heading": 0-360,
-      "priority": 1-5
-    }}
-  ],
-  "recommended_heading": 0-360,
-  "approach_heading": 0-360,
-  "raw_guidance": "2-3 sentence summary for display"
-}}
-
-Heading is compass direction from camera position (0=North, 90=East, 180=South, 270=West).
-Analyze:
-1. Where should the ambulance park? (recommended_heading = direction truck faces)
-2. Where is the main entrance? (POI with type "entrance")
-3. Best approach direction? (approach_heading)
-4. Any hazards to flag? (POI with type "hazard")
-
-Return ONLY the JSON, no markdown, no explanation."""
-
-    image_b64 = base64.b64encode(street_view_bytes).decode("utf-8")
-    contents = [
-        {
-            "parts": [
-                {"text": prompt},
-                {
-                    "inline_data": {
-                        "mime_type": "image/jpeg",
-                        "data": image_b64,
-                    }
-                },
-            ]
-        }
-    ]
-
-    try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash-lite",
-            contents=contents,
-        )
-        text = response.text if hasattr(response, "text") else str(response)
-
-        text = text.strip()
-        if text.startswith("```"):
-            text = text.split("\n", 1)[1].rsplit("```", 1)[0]
-
-        data = json.loads(text)
-        return StructuredPositioningResponse(
-            pois=[StructuredPOI(**p) for p in data.get("pois", [])],
-            recommended_heading=data.get("recommended_heading", 0),
-            approach_heading=data.get("approach_heading", 0),
-            raw_guidance=data.get("raw_guidance", ""),
-        )
-    except Exception as e:
-        return StructuredPositioningResponse(
-            pois=[],
-            recommended_heading=0,
-            approach_heading=0,
-            raw_guidance=f"Analysis unavailable: {str(e)}",
-        )
-
-
-SceneAnalysisResponse.model_rebuild()
-
-
 @app.post("/ems/report", response_model=EMSReportResponse)
 def create_ems_report(payload: EMSRequest) -> EMSReportResponse:
     if not payload.call_text or not payload.call_text.strip():
@@ -763,6 +1228,9 @@ async def create_ems_report_from_audio(
     if not payload.audio_base64 or not payload.audio_base64.strip():
         raise HTTPException(status_code=400, detail="audio_base64 is required")
 
+    # Reserved outside the demo fallback below so a rejection reaches the client.
+    audio_size = decoded_size(payload.audio_base64)
+    payload_budget.acquire(audio_size, "intake_audio")
     try:
         transcription = await transcribe_with_livekit(payload.audio_base64)
 
@@ -807,17 +1275,55 @@ async def create_ems_report_from_audio(
             compressed_text=demo_compressed,
             ai_response=demo_report,
         )
+    finally:
+        payload_budget.release(audio_size)
 
 
 @app.post("/ems/scene-analysis", response_model=SceneAnalysisResponse)
 async def scene_analysis(request: SceneAnalysisRequest) -> SceneAnalysisResponse:
-    lat, lng, address = request.lat, request.lng, request.address
+    return await analyze_location(
+        request.address, request.lat, request.lng, request.street_view_sweep
+    )
 
-    satellite_bytes = fetch_static_satellite_image(lat, lng)
-    analysis = analyze_scene_with_gemini(address, lat, lng, satellite_bytes)
 
-    street_view_bytes = fetch_street_view_image(lat, lng)
-    structured = generate_structured_positioning(address, lat, lng, street_view_bytes)
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison, as required for If-None-Match.
+    opaque = etag.removeprefix("W/")
+    return "*" in candidates or opaque in (tag.removeprefix("W/") for tag in candidates)
+
+
+@app.get("/ems/scene-analysis", response_model=SceneAnalysisResponse)
+async def get_scene_analysis_cached(
+    request: Request,
+    lat: float,
+    lng: float,
+    address: str = "",
+    street_view_sweep: bool = False,
+) -> Response:
+    """
+    Cacheable variant of POST /ems/scene-analysis. Results carry an ETag;
+    revalidating with If-None-Match returns 304 while the intel is unchanged.
+    The ETag is weak because CompressionMiddleware may re-encode the body.
+    """
+    result = await analyze_location(address, lat, lng, street_view_sweep)
+    body = result.model_dump_json().encode()
+    etag = f'W/"{hashlib.sha256(body).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def analyze_location(
+    address: str, lat: float, lng: float, sweep: bool = False
+) -> SceneAnalysisResponse:
+    analysis, structured = await asyncio.gather(
+        get_scene_analysis(address, lat, lng),
+        get_structured_positioning(address, lat, lng, sweep=sweep),
+    )
 
     return SceneAnalysisResponse(
         analysis=analysis,
@@ -828,6 +1334,198 @@ async def scene_analysis(request: SceneAnalysisRequest) -> SceneAnalysisResponse
     )
 
 
+BATCH_MAX_LOCATIONS = int(os.environ.get("VECTR_BATCH_MAX_LOCATIONS", "100"))
+BATCH_CONCURRENCY = int(os.environ.get("VECTR_BATCH_CONCURRENCY", "4"))
+
+
+def cluster_locations(locations: list[BatchSceneLocation]) -> list[int]:
+    """
+    Map each location to the index of the first location in the same
+    geocell; those share imagery through the scene cache. Nearby but
+    distinct cells are not merged: imagery from a few meters away points
+    street view headings and POIs at the wrong spot.
+    """
+    first_in_cell: dict[str, int] = {}
+    return [
+        first_in_cell.setdefault(geocell(location.lat, location.lng), index)
+        for index, location in enumerate(locations)
+    ]
+
+
+@app.post("/ems/scene-analysis/batch")
+async def batch_scene_analysis(request: BatchSceneAnalysisRequest):
+    """
+    Scene analysis for many locations at once (storms, multi-vehicle events).
+
+    Locations in the same geocell share imagery, work runs with
+    bounded concurrency, and results stream back as NDJSON in completion
+    order, one line per location.
+    """
+    locations = request.locations
+    if not locations:
+        raise HTTPException(status_code=400, detail="locations is required")
+    if len(locations) > BATCH_MAX_LOCATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {BATCH_MAX_LOCATIONS} locations per batch",
+        )
+
+    assignment = cluster_locations(locations)
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def analyze(index: int) -> dict:
+        location = locations[index]
+        line = {
+            "index": index,
+            "id": location.id,
+            "shared_imagery_with": (
+                assignment[index] if assignment[index] != index else None
+            ),
+        }
+        try:
+            async with slots:
+                result = await analyze_location(
+                    location.address,
+                    location.lat,
+                    location.lng,
+                    location.street_view_sweep,
+                )
+        except Exception as e:
+            detail = (
+                e.detail
+                if isinstance(e, (HTTPException, UpstreamError, PayloadBudgetError))
+                else str(e)
+            )
+            return {**line, "status": "error", "error": detail}
+        return {**line, "status": "ok", "result": result.model_dump()}
+
+    async def stream():
+        tasks = [asyncio.create_task(analyze(i)) for i in range(len(locations))]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done) + "\n"
+        finally:
+            # Client went away: stop work that nobody will read.
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+# Prefetch runs at low priority: only a few upstream calls at a time, while
+# live create/analysis requests go straight to the cache.
+prefetch_slots = asyncio.Semaphore(
+    int(os.environ.get("VECTR_PREFETCH_CONCURRENCY", "2"))
+)
+prefetch_tasks: dict[str, asyncio.Task] = {}
+prefetch_clients: dict[str, str] = {}
+
+
+class PrefetchRequest(BaseModel):
+    lat: float
+    lng: float
+    address: str = ""
+    client_id: Optional[str] = None
+    targets: list[str] = list(DEFAULT_PREFETCH_TARGETS)
+
+
+class PrefetchResponse(BaseModel):
+    prefetch_id: str
+    status: str
+    targets: list[str]
+
+
+async def run_prefetch(address: str, lat: float, lng: float, targets: list[str]):
+    async def warm(target: str) -> None:
+        async with prefetch_slots:
+            with model_urgency(PREFETCH):
+                await PREFETCH_GETTERS[target](address, lat, lng)
+
+    results = await asyncio.gather(
+        *(warm(target) for target in targets), return_exceptions=True
+    )
+    for target, result in zip(targets, results):
+        if isinstance(result, Exception):
+            logger.info(f"Prefetch {target} failed for {address}: {result}")
+
+
+def forget_prefetch(prefetch_id: str, task: asyncio.Task) -> None:
+    if prefetch_tasks.get(prefetch_id) is task:
+        del prefetch_tasks[prefetch_id]
+    for client_id in [c for c, p in prefetch_clients.items() if p == prefetch_id]:
+        del prefetch_clients[client_id]
+
+
+def cancel_prefetch_task(prefetch_id: str) -> bool:
+    task = prefetch_tasks.pop(prefetch_id, None)
+    if task is None:
+        return False
+    task.cancel()
+    return True
+
+
+@app.post("/prefetch", status_code=202, response_model=PrefetchResponse)
+async def prefetch_scene(payload: PrefetchRequest) -> PrefetchResponse:
+    """
+    Speculatively warm the scene cache for a location the dispatcher has
+    selected but not yet dispatched. Later /incident/create and
+    /ems/scene-analysis calls for the same location reuse the results.
+    """
+    unknown = [t for t in payload.targets if t not in PREFETCH_TARGETS]
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown prefetch targets: {unknown}"
+        )
+
+    cell = geocell(payload.lat, payload.lng)
+    prefetch_id = hashlib.sha1(
+        f"{cell}|{payload.address}|{sorted(payload.targets)}".encode()
+    ).hexdigest()[:16]
+
+    # A client that moved on to a different address no longer needs the old one.
+    if payload.client_id:
+        previous = prefetch_clients.get(payload.client_id)
+        if previous and previous != prefetch_id:
+            cancel_prefetch_task(previous)
+
+    pending = [
+        t
+        for t in payload.targets
+        if not scene_cache.contains((t, cell, payload.address))
+    ]
+    if not pending:
+        return PrefetchResponse(
+            prefetch_id=prefetch_id, status="cached", targets=payload.targets
+        )
+    if prefetch_id in prefetch_tasks:
+        return PrefetchResponse(
+            prefetch_id=prefetch_id, status="deduplicated", targets=payload.targets
+        )
+
+    task = asyncio.create_task(
+        run_prefetch(payload.address, payload.lat, payload.lng, pending)
+    )
+    prefetch_tasks[prefetch_id] = task
+    if payload.client_id:
+        prefetch_clients[payload.client_id] = prefetch_id
+    task.add_done_callback(lambda t: forget_prefetch(prefetch_id, t))
+
+    return PrefetchResponse(
+        prefetch_id=prefetch_id, status="started", targets=payload.targets
+    )
+
+
+@app.delete("/prefetch/{prefetch_id}")
+async def cancel_prefetch(prefetch_id: str):
+    """
+    Cancel a pending prefetch.
+    Upstream calls already in flight still complete and land in the cache.
+    """
+    if not cancel_prefetch_task(prefetch_id):
+        raise HTTPException(status_code=404, detail="Prefetch not found")
+    return {"status": "cancelled", "prefetch_id": prefetch_id}
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,190 @@
+"""
+Capacity model for agent workers hosting many incident rooms.
+
+Each session process runs a LoopLagMonitor that samples how late its event
+loop wakes up, logs stalls, and publishes its recent worst lag to a small
+per-process report file under its worker's directory. The worker's load
+function combines the active session count, the worst lag reported by its
+own sessions and CPU usage (averaged by a CPUSampler thread) into the 0..1
+load LiveKit uses to route new rooms to less-loaded workers.
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Optional, Protocol
+
+logger = logging.getLogger("vectr-agent")
+
+LAG_REPORT_DIR = Path(
+    os.environ.get(
+        "VECTR_LAG_REPORT_DIR", Path(tempfile.gettempdir()) / "vectr-loop-lag"
+    )
+)
+
+# Set by the worker process on import; session processes it spawns inherit
+# it, so every worker on the host reads only its own sessions' reports.
+WORKER_ID = os.environ.setdefault("VECTR_WORKER_ID", str(os.getpid()))
+WORKER_LAG_REPORT_DIR = LAG_REPORT_DIR / WORKER_ID
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag by sleeping for `interval` and timing the overshoot.
+    Stalls at or above `stall_threshold` seconds are logged.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.25,
+        stall_threshold: float = 0.1,
+        window: int = 20,
+        report_dir: Optional[Path] = WORKER_LAG_REPORT_DIR,
+        report_interval: float = 1.0,
+    ):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.report_interval = report_interval
+        self.report_path = report_dir / str(os.getpid()) if report_dir else None
+        self._samples: deque[float] = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+        self.stalls = 0
+        self.max_lag = 0.0
+
+    @property
+    def recent_lag(self) -> float:
+        """Worst lag in seconds over the last `window` samples."""
+        return max(self._samples, default=0.0)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="vectr-loop-lag")
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self.report_path is not None:
+            with contextlib.suppress(OSError):
+                self.report_path.unlink()
+
+    def record(self, lag: float) -> None:
+        self._samples.append(lag)
+        self.max_lag = max(self.max_lag, lag)
+        if lag >= self.stall_threshold:
+            self.stalls += 1
+            logger.warning(f"Event loop stalled for {lag * 1000:.0f} ms")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        last_report = 0.0
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, loop.time() - started - self.interval))
+            if loop.time() - last_report >= self.report_interval:
+                last_report = loop.time()
+                self._report()
+
+    def _report(self) -> None:
+        if self.report_path is None:
+            return
+        try:
+            self.report_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.report_path.with_suffix(".tmp")
+            tmp_path.write_text(f"{self.recent_lag:.6f}")
+            os.replace(tmp_path, self.report_path)
+        except OSError as e:
+            logger.debug(f"Could not report loop lag: {e}")
+
+
+class CPUMonitor(Protocol):
+    def cpu_percent(self, interval: float) -> float: ...
+
+
+class CPUSampler:
+    """
+    Averages CPU usage over the last `window` samples from a background
+    thread, so the load function reads a cached value instead of blocking
+    for a sampling interval on every job offer.
+    """
+
+    def __init__(self, monitor: CPUMonitor, interval: float = 0.5, window: int = 5):
+        self.monitor = monitor
+        self.interval = interval
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def value(self) -> float:
+        """Average CPU usage in [0, 1]; 0 until the first sample lands."""
+        self.start()
+        with self._lock:
+            return sum(self._samples) / len(self._samples) if self._samples else 0.0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, daemon=True, name="vectr-cpu-sampler"
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                sample = self.monitor.cpu_percent(interval=self.interval)
+            except Exception as e:
+                logger.debug(f"Could not sample CPU usage: {e}")
+                time.sleep(self.interval)
+                continue
+            with self._lock:
+                self._samples.append(sample)
+
+
+def read_reported_lag(
+    report_dir: Path = WORKER_LAG_REPORT_DIR, max_age: float = 5.0
+) -> float:
+    """Worst lag reported by this worker's sessions; stale reports are removed."""
+    worst = 0.0
+    now = time.time()
+    try:
+        paths = list(report_dir.iterdir())
+    except FileNotFoundError:
+        return 0.0
+    for path in paths:
+        if path.suffix:
+            continue
+        try:
+            if now - path.stat().st_mtime > max_age:
+                path.unlink()
+                continue
+            worst = max(worst, float(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return worst
+
+
+def compute_load(
+    active_sessions: int,
+    max_sessions: int,
+    lag: float,
+    lag_budget: float,
+    cpu: float = 0.0,
+) -> float:
+    """
+    Worker load in [0, 1]: the most constrained of session slots, loop lag
+    against its budget and CPU. Reaching 1 on any axis marks the worker full.
+    """
+    session_load = active_sessions / max_sessions if max_sessions > 0 else 0.0
+    lag_load = lag / lag_budget if lag_budget > 0 else 0.0
+    return min(1.0, max(session_load, lag_load, cpu))
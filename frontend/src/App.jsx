@@ -1,7 +1,7 @@
 import { useEffect, useState } from "react";
 import { EmergencyLayout } from "./components/layout/EmergencyLayout";
 import { useNotes } from "./hooks/useNotes.js";
-import { analyzeSceneFromSatellite } from "./services/ems.js";
+import { analyzeSceneFromSatellite, prefetchScene } from "./services/ems.js";
 
 const LIVEKIT_URL = import.meta.env.VITE_LIVEKIT_URL;
 
@@ -39,6 +39,14 @@ export default function App() {
     setSceneError(null);
     setSceneLoading(false);
     setShowPositioning(false);
+
+    if (
+      location &&
+      typeof location.lat === "number" &&
+      typeof location.lng === "number"
+    ) {
+      prefetchScene(location.lat, location.lng, location.address);
+    }
   }, [location ? location.address : null]);
 
   const handleOpenGoogleMaps = () => {
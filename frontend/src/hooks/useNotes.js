@@ -9,7 +9,9 @@ import {
   where,
 } from "firebase/firestore";
 import { db } from "../services/firebase.js";
+import { indexPremiseNote } from "../services/ems.js";
 
+// Mirrored by normalize_address() in backend/premise_notes.py; keep in sync.
 function normalizeAddress(address) {
   if (!address) {
     return null;
@@ -81,7 +83,13 @@ export function useNotes(address) {
       createdBy: "dispatch",
     };
     const notesRef = collection(db, "notes");
-    await addDoc(notesRef, docData);
+    const docRef = await addDoc(notesRef, docData);
+    indexPremiseNote({
+      id: docRef.id,
+      address,
+      type: docData.type,
+      content,
+    });
   };
 
   const refreshNotes = () => {
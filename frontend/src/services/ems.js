@@ -1,6 +1,12 @@
 // src/services/ems.js
 const API_BASE = import.meta.env.VITE_EMS_API_BASE || "http://localhost:8000";
 
+// Identifies this tab so a newer prefetch supersedes the previous address.
+const PREFETCH_CLIENT_ID =
+  typeof crypto !== "undefined" && crypto.randomUUID
+    ? crypto.randomUUID()
+    : `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+
 export async function createEmsReportFromAudioBase64(
   audioBase64,
   aggressiveness,
@@ -35,13 +41,11 @@ export async function createEmsReportFromAudioBase64(
 }
 
 export async function analyzeSceneFromSatellite(lat, lng, address) {
-  const payload = { lat, lng, address: address || "" };
+  // GET so the browser cache revalidates with the ETag; unchanged intel
+  // comes back as an empty 304 instead of the full analysis.
+  const params = new URLSearchParams({ lat, lng, address: address || "" });
 
-  const response = await fetch(`${API_BASE}/ems/scene-analysis`, {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify(payload),
-  });
+  const response = await fetch(`${API_BASE}/ems/scene-analysis?${params}`);
 
   if (!response.ok) {
     throw new Error("Scene analysis request failed");
@@ -57,3 +61,53 @@ export async function analyzeSceneFromSatellite(lat, lng, address) {
     approachHeading: data.approach_heading || 0,
   };
 }
+
+// Fire-and-forget: warms the backend scene cache while the dispatcher is
+// still filling in the incident, so analysis/create return faster later.
+export async function prefetchScene(lat, lng, address) {
+  try {
+    await fetch(`${API_BASE}/prefetch`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({
+        lat,
+        lng,
+        address: address || "",
+        client_id: PREFETCH_CLIENT_ID,
+      }),
+    });
+  } catch (error) {
+    console.warn("Scene prefetch failed", error);
+  }
+}
+
+// Fresh (or still-valid cached) room token for rejoining an incident without
+// re-running the incident pipeline. role: "dispatcher" | "emt".
+export async function refreshIncidentToken(incidentId, role = "dispatcher") {
+  const response = await fetch(`${API_BASE}/incident/token`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ incident_id: incidentId, role }),
+  });
+
+  if (!response.ok) {
+    throw new Error(`Token refresh failed: ${response.status}`);
+  }
+
+  const data = await response.json();
+  return { token: data.token, expiresAt: data.expires_at };
+}
+
+// Mirror a premise note saved to Firestore into the backend notes index so
+// the next report for this address includes it. Best-effort.
+export async function indexPremiseNote(note) {
+  try {
+    await fetch(`${API_BASE}/notes`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(note),
+    });
+  } catch (error) {
+    console.warn("Premise note indexing failed", error);
+  }
+}